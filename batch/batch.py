@@ -0,0 +1,252 @@
+# -*- coding:utf8 -*-
+'''
+    File name: batch.py
+    Author   : Jim00000
+    Created  : 10/18/2026
+'''
+
+__author__    = "Jim00000"
+__copyright__ = "Copyright 2017, the python-mosaic project"
+__license__   = "GNU General Public License v3.0"
+__version__   = "1.0.0"
+
+import glob
+import json
+import multiprocessing
+import os
+import os.path
+import sys
+import time
+import traceback
+import cv2
+from pipeline.pipeline import load_image
+
+# Extensions of the images found in directories
+IMAGE_EXTENSIONS = ['.png', '.jpg', '.jpeg', '.bmp', '.tif', '.tiff', '.webp', '.ppm', '.pgm']
+
+def collect_inputs(sources, stream = None):
+    """Expand sources into image files
+
+    Keyword arguments:
+    sources -- directories, glob patterns or files, '-' reads a manifest of
+               one file per line
+    stream  -- the manifest given as '-' (default : None, standard input)
+
+    Return:
+    filenames -- image files in the order they are given, without duplicates
+    """
+    filenames = []
+    for source in sources:
+        if source == '-':
+            manifest = sys.stdin if stream is None else stream
+            found = [line.strip() for line in manifest if len(line.strip()) > 0]
+        elif os.path.isdir(source) is True:
+            found = sorted(os.path.join(source, name) for name in os.listdir(source)
+                if os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS)
+        elif glob.has_magic(source) is True:
+            found = sorted(glob.glob(source))
+        else:
+            found = [source]
+        filenames.extend(found)
+    # Keep the first occurrence of every file
+    return list(dict.fromkeys(filenames))
+
+def plan_outputs(filenames, output_dir, extension = '.jpg'):
+    """Name an output file for every input, in output_dir.
+    Inputs with the same name in different directories get a numbered suffix.
+
+    Keyword arguments:
+    filenames  -- input image files
+    output_dir -- directory of the outputs
+    extension  -- extension of the outputs, it picks the writer (default : '.jpg')
+
+    Return:
+    outputs -- output files, in the order of filenames
+    """
+    outputs = []
+    used = set()
+    for filename in filenames:
+        stem = os.path.splitext(os.path.basename(filename))[0]
+        name = stem
+        count = 1
+        while name in used:
+            name = '%s_%d' %(stem, count)
+            count += 1
+        used.add(name)
+        outputs.append(os.path.join(output_dir, name + extension))
+    return outputs
+
+def split_cores(count, jobs = None, threads = None, cores = None):
+    """Split cores between worker processes and the threads of every worker.
+    Images are independent, so processes come first and threads get the rest.
+
+    Keyword arguments:
+    count   -- number of images
+    jobs    -- number of worker processes (default : None, one per core)
+    threads -- threads of every worker (default : None, cores left per worker)
+    cores   -- number of cores (default : None, os.cpu_count())
+
+    Return:
+    jobs    -- number of worker processes
+    threads -- threads of every worker
+    """
+    if cores is None:
+        cores = os.cpu_count() or 1
+    if jobs is None:
+        jobs = cores
+    jobs = max(1, min(jobs, count))
+    if threads is None:
+        threads = max(1, cores // jobs)
+    return jobs, threads
+
+def run_batch(pipeline, filenames, outputs, jobs = None, threads = None, report = None):
+    """Run a pipeline over images with a process pool.
+    Workers are started once, with the pipeline and their thread count, and a
+    failing image is reported without stopping the others.
+
+    Keyword arguments:
+    pipeline  -- the MosaicPipeline run on every image
+    filenames -- input image files
+    outputs   -- output files given by plan_outputs
+    jobs      -- number of worker processes (default : None, one per core)
+    threads   -- threads of every worker (default : None, cores left per worker)
+    report    -- file receiving one JSON line per image (default : None)
+
+    Return:
+    results -- dictionaries of input, output, ok, seconds, error and traceback, in the order of filenames
+    """
+    results = []
+    if len(filenames) == 0:
+        return results
+    jobs, threads = split_cores(len(filenames), jobs, threads)
+    print('Batch : %d images, %d processes, %d threads each' %(len(filenames), jobs, threads) )
+
+    report_file = open(report, 'w') if report is not None else None
+    try:
+        def collect(result):
+            results.append(result)
+            status = 'done' if result['ok'] is True else 'failed : %s' %result['error']
+            print('[%d/%d] %s %.2fs %s' %(len(results), len(filenames), result['input'], result['seconds'], status) )
+            if report_file is not None:
+                report_file.write(json.dumps(result) + '\n')
+                report_file.flush()
+
+        if jobs == 1:
+            __init_worker__(pipeline, threads)
+            for filename, output in zip(filenames, outputs):
+                collect(__process__(filename, output))
+        else:
+            __run_pool__(pipeline, filenames, outputs, jobs, threads, collect)
+    finally:
+        if report_file is not None:
+            report_file.close()
+
+    order = {filename : i for i, filename in enumerate(filenames)}
+    return sorted(results, key=lambda result: order[result['input']])
+
+def __run_pool__(pipeline, filenames, outputs, jobs, threads, collect):
+    """Run the images on worker processes, results are collected as they finish.
+    When a worker dies, the pool breaks and the images it had not started go
+    to a fresh pool. The images that were running are run again one at a
+    time, so that only the image killing its worker is reported as failed.
+    """
+    # OpenMP reads its thread count once loaded, workers inherit it from the environment.
+    # Workers are spawned rather than forked, since the OpenMP runtime of this process may be running
+    previous = os.environ.get('OMP_NUM_THREADS')
+    os.environ['OMP_NUM_THREADS'] = str(threads)
+    try:
+        pending = list(zip(filenames, outputs))
+        suspects = []
+        while len(pending) > 0 or len(suspects) > 0:
+            isolated = len(suspects) > 0
+            tasks = suspects if isolated is True else pending
+            running, left, error = __run_round__(pipeline, tasks, 1 if isolated is True else jobs, threads, collect)
+            if error is not None and len(running) == 0:
+                # Workers died before taking any image, e.g. while starting
+                for filename, output in left:
+                    collect(__failed__(filename, output, error))
+                left = []
+            elif error is not None and (isolated is True or len(running) == 1):
+                # A worker died while running this image alone
+                for filename, output in running:
+                    collect(__failed__(filename, output, error))
+                running = []
+            elif error is not None:
+                print('Batch : a worker died, %d images are run again one at a time' %len(running) )
+            if isolated is True:
+                suspects = left
+            else:
+                suspects, pending = running, left
+    finally:
+        if previous is None:
+            del os.environ['OMP_NUM_THREADS']
+        else:
+            os.environ['OMP_NUM_THREADS'] = previous
+
+def __run_round__(pipeline, tasks, jobs, threads, collect):
+    """Run images on a fresh pool until they are done or the pool breaks
+
+    Return:
+    running -- (input, output) of the images started but not finished when the pool broke
+    left    -- (input, output) of the images not started
+    error   -- the BrokenProcessPool, or None if the pool did not break
+    """
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+    from concurrent.futures.process import BrokenProcessPool
+
+    context = multiprocessing.get_context('spawn')
+    # Workers put every image they start here, to find the ones lost with a worker
+    started = context.SimpleQueue()
+    broken = []
+    error = None
+    with ProcessPoolExecutor(max_workers=jobs, mp_context=context,
+            initializer=__init_worker__, initargs=(pipeline, threads, started)) as executor:
+        futures = {executor.submit(__process__, filename, output) : (filename, output) for filename, output in tasks}
+        for future in as_completed(futures):
+            filename, output = futures[future]
+            try:
+                collect(future.result())
+            except BrokenProcessPool as exception:
+                broken.append((filename, output))
+                error = exception
+            except Exception as exception:
+                collect(__failed__(filename, output, exception))
+    names = set()
+    while started.empty() is False:
+        names.add(started.get())
+    started.close()
+    running = [task for task in broken if task[0] in names]
+    left = [task for task in broken if task[0] not in names]
+    return running, left, error
+
+# Pipeline of a worker, set once by __init_worker__
+worker_pipeline = None
+# Queue receiving the images a worker starts, set once by __init_worker__
+worker_started = None
+
+def __init_worker__(pipeline, threads, started = None):
+    """Set up a worker : its pipeline, thread count and started queue, imports are done by now """
+    global worker_pipeline, worker_started
+    worker_pipeline = pipeline
+    worker_started = started
+    cv2.setNumThreads(threads)
+
+def __failed__(filename, output, error):
+    """Get the result of an image lost with its worker or with the pool """
+    return {'input' : filename, 'output' : output, 'ok' : False, 'error' : '%s: %s' %(type(error).__name__, error),
+        'traceback' : None, 'seconds' : 0.0}
+
+def __process__(filename, output):
+    """Turn one image into a mosaic, errors are returned rather than raised """
+    start = time.perf_counter()
+    result = {'input' : filename, 'output' : output, 'ok' : True, 'error' : None, 'traceback' : None}
+    if worker_started is not None:
+        worker_started.put(filename)
+    try:
+        worker_pipeline.run_to_file(load_image(filename), output)
+    except Exception as error:
+        result['ok'] = False
+        result['error'] = '%s: %s' %(type(error).__name__, error)
+        result['traceback'] = traceback.format_exc()
+    result['seconds'] = time.perf_counter() - start
+    return result
@@ -0,0 +1,381 @@
+# -*- coding:utf8 -*-
+'''
+    File name: stages.py
+    Author   : Jim00000
+    Created  : 10/18/2026
+'''
+
+__author__    = "Jim00000"
+__copyright__ = "Copyright 2017, the python-mosaic project"
+__license__   = "GNU General Public License v3.0"
+__version__   = "1.0.0"
+
+import argparse
+import json
+import os
+import os.path
+import platform
+import resource
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+import cv2
+from quad.options import ERROR_ENGINES
+from quad.quadtree import QuadTree
+from quad.integral import create_error_engine
+from voronoi.voronoi import assign_labels, update_positions
+from voronoi.backend import REGISTRY
+from plot.plot import average_plot, centroidal_plot, plot_mosaic_edge
+from plot.writer import create_writer
+
+BENCHMARK_VERSION = 1
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Backends run by default, the python loop takes minutes and numpy grows with the seeds
+DEFAULT_BACKENDS = ['cpp', 'kdtree', 'jfa']
+# Fields identifying a record, records of a baseline are matched on them
+KEY_FIELDS = ['image', 'width', 'height', 'min_area', 'backend', 'stage']
+
+def synthetic_image(side, detail, seed = 0):
+    """Create an image of a smooth gradient, partly covered by random 4 pixel blocks.
+    Blocks fill random 32 pixel tiles, detail is the share of covered tiles, so
+    the number of seeds grows with it : 0 gives a few seeds, 1 the most min_area allows.
+
+    Keyword arguments:
+    side   -- width and height of the image
+    detail -- share of the image covered by blocks, between 0 and 1
+    seed   -- seed of the random blocks and tiles (default : 0)
+
+    Return:
+    img -- three-dimensions uint8 array represents rgb of an image
+    """
+    rng = np.random.RandomState(seed)
+    ys, xs = np.mgrid[0:side, 0:side] / float(side)
+    base = (np.stack((xs, ys, 1 - xs), axis=2) * 255).astype(np.uint8)
+    blocks = rng.randint(0, 256, (side // 4 + 1, side // 4 + 1, 3)).astype(np.uint8)
+    blocks = np.repeat(np.repeat(blocks, 4, axis=0), 4, axis=1)[:side, :side]
+    tiles = rng.random_sample((side // 32 + 1, side // 32 + 1)) < detail
+    covered = np.repeat(np.repeat(tiles, 32, axis=0), 32, axis=1)[:side, :side]
+    return np.where(covered[:, :, np.newaxis], blocks, base)
+
+def load_benchmark_image(name, side):
+    """Get an image of the benchmark matrix
+
+    Keyword arguments:
+    name -- 'lenna' for demo/Lenna.png rescaled, or 'synthetic:<detail>'
+    side -- width and height of the image
+
+    Return:
+    img -- three-dimensions uint8 array represents rgb of an image
+
+    Exceptions:
+    ValueError -- if the name is not one of both
+    """
+    if name == 'lenna':
+        img = cv2.cvtColor(cv2.imread(os.path.join(ROOT, 'demo', 'Lenna.png')), cv2.COLOR_BGR2RGB)
+        interpolation = cv2.INTER_AREA if side <= img.shape[0] else cv2.INTER_CUBIC
+        return cv2.resize(img, (side, side), interpolation=interpolation)
+    if name.startswith('synthetic:') is True:
+        return synthetic_image(side, float(name[len('synthetic:'):]))
+    raise ValueError('Unknown benchmark image \'%s\', expect lenna or synthetic:<detail>' %name )
+
+def time_stage(function, repeat = 3):
+    """Run a stage several times
+
+    Keyword arguments:
+    function -- function () running the stage
+    repeat   -- number of runs (default : 3)
+
+    Return:
+    seconds -- time of the fastest run, like timeit the others are slowed down by the machine
+    noise   -- median time minus the fastest one, how much the machine moves timings (0 for one run)
+    result  -- what the last run returned
+    """
+    times = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        times.append(time.perf_counter() - start)
+    return min(times), statistics.median(times) - min(times), result
+
+def peak_memory(function):
+    """Run a stage once under tracemalloc, Python and NumPy allocations are traced
+
+    Keyword arguments:
+    function -- function () running the stage
+
+    Return:
+    peak -- bytes allocated at the peak of the stage
+    """
+    tracemalloc.start()
+    try:
+        function()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def benchmark_case(image, img, min_area, backends, iteration = 3, error_engine = 'slice', error_rate = 0.5,
+        repeat = 3, directory = None):
+    """Time every stage of one image and min_area, with every backend.
+    Quadtree, seeds, plot and save stages do not depend on the backend, they
+    are run once, plot and save with the labels of the first backend.
+
+    Keyword arguments:
+    image        -- name of the image in the records
+    img          -- three-dimensions uint8 array represents rgb of an image
+    min_area     -- minimal pixels for each block
+    backends     -- names of the backends labelling pixels
+    iteration    -- iterations of Lloyd's algorithm, each one is timed (default : 3)
+    error_engine -- one of ERROR_ENGINES (default : 'slice')
+    error_rate   -- error rate (default : 0.5)
+    repeat       -- runs of every stage, the fastest is kept (default : 3)
+    directory    -- directory of the saved files (default : None, the temporary directory of the system)
+
+    Return:
+    records -- list of dictionaries, one per stage
+    """
+    height = img.shape[0]
+    width = img.shape[1]
+    pixels = width * height
+    records = []
+
+    def record(stage, function, backend = None, seconds = None, noise = None, seeds = None):
+        if seconds is None:
+            seconds, noise = time_stage(function, repeat)[:2]
+        records.append({
+            'image' : image,
+            'width' : width,
+            'height' : height,
+            'min_area' : min_area,
+            'backend' : backend,
+            'stage' : stage,
+            'seeds' : seeds,
+            'seconds' : seconds,
+            'noise' : noise,
+            'mpps' : pixels / seconds * 1e-6 if seconds > 0 else None,
+            'peak_mb' : peak_memory(function) / (1 << 20)
+        })
+
+    def build():
+        engine = create_error_engine(error_engine, img, min_area = min_area)
+        return QuadTree(img, min_area = min_area, error_rate = error_rate, error_engine = engine)
+
+    seconds, noise, tree = time_stage(build, repeat)
+    record('quad', build, seconds = seconds, noise = noise)
+    seconds, noise, (point_x, point_y) = time_stage(tree.generate_seeds, repeat)
+    seeds = point_x.size
+    record('seeds', tree.generate_seeds, seconds = seconds, noise = noise, seeds = seeds)
+
+    # Every iteration starts from the seeds the previous one moved
+    plotted = None
+    for backend in backends:
+        xs = [np.array(point_x, dtype=np.float64)]
+        ys = [np.array(point_y, dtype=np.float64)]
+        labels = None
+        for i in range(iteration):
+            x = xs[-1].copy()
+            y = ys[-1].copy()
+
+            def assign():
+                return assign_labels(backend, width, height, x, y)
+
+            def update():
+                update_positions(labels, x.copy(), y.copy())
+
+            seconds, noise, labels = time_stage(assign, repeat)
+            record('voronoi[%d]' %(i + 1), assign, backend = backend, seconds = seconds, noise = noise, seeds = seeds)
+            record('centroid[%d]' %(i + 1), update, backend = backend, seeds = seeds)
+            update_positions(labels, x, y)
+            xs.append(x)
+            ys.append(y)
+        if plotted is None:
+            plotted = (xs[-2], ys[-2], labels)
+
+    point_x, point_y, labels = plotted
+    output = np.empty_like(img)
+    record('plot_average', lambda: average_plot(img, point_x, point_y, labels, out = output), seeds = seeds)
+    record('plot_centroidal', lambda: centroidal_plot(img, point_x, point_y, labels, out = output), seeds = seeds)
+    mosaic = average_plot(img, point_x, point_y, labels)
+    record('edge', lambda: plot_mosaic_edge(mosaic, point_x, point_y, labels, out = output), seeds = seeds)
+    record('edge_bold', lambda: plot_mosaic_edge(mosaic, point_x, point_y, labels, bold_edge = True,
+        edge_width = 3, out = output), seeds = seeds)
+
+    for extension in ('.png', '.jpg'):
+        filename = os.path.join(tempfile.gettempdir() if directory is None else directory, 'benchmark' + extension)
+
+        def save():
+            with create_writer(filename, width, height, bgr = False, background = False) as sink:
+                sink.write(mosaic)
+
+        record('save[%s]' %extension, save, seeds = seeds)
+    return records
+
+def warm_up(backends):
+    """Run every backend and writer once on a small image, so that lazy imports
+    and thread pools are not timed with the first stage using them
+
+    Keyword arguments:
+    backends -- names of the backends labelling pixels
+    """
+    point_x = np.array([8.0, 40.0, 24.0])
+    point_y = np.array([8.0, 16.0, 48.0])
+    for backend in backends:
+        labels = assign_labels(backend, 64, 64, point_x, point_y)
+    img = np.zeros((64, 64, 3), dtype=np.uint8)
+    plot_mosaic_edge(average_plot(img, point_x, point_y, labels), point_x, point_y, labels)
+    for extension in ('.png', '.jpg'):
+        with tempfile.TemporaryDirectory() as directory:
+            with create_writer(os.path.join(directory, 'warm' + extension), 64, 64, background = False) as sink:
+                sink.write(img)
+
+def compare_baseline(records, baseline, threshold = 0.2, floor = 0.03, noise_factor = 3):
+    """Compare records with the records of a former run.
+    A stage regresses when it is slower by more than threshold, and slower
+    by more than both floor and noise_factor times the noise of its repeats
+    in either run, so the jitter of fast stages is not counted.
+
+    Keyword arguments:
+    records      -- records of this run
+    baseline     -- records of the former run
+    threshold    -- relative slowdown counted as a regression (default : 0.2)
+    floor        -- seconds a stage has to lose before it counts (default : 0.03)
+    noise_factor -- times the noise a stage has to lose before it counts (default : 3)
+
+    Return:
+    comparisons -- list of (record, baseline seconds, ratio, regressed) for matched records
+    """
+    former = {tuple(entry[field] for field in KEY_FIELDS) : entry for entry in baseline}
+    comparisons = []
+    for entry in records:
+        key = tuple(entry[field] for field in KEY_FIELDS)
+        if key not in former:
+            continue
+        seconds = former[key]['seconds']
+        ratio = entry['seconds'] / seconds if seconds > 0 else float('inf')
+        # Records without repeats, or from an older version, have no noise
+        noise = max(entry.get('noise') or 0.0, former[key].get('noise') or 0.0)
+        regressed = (entry['seconds'] > seconds * (1 + threshold) and
+            entry['seconds'] - seconds > max(floor, noise_factor * noise))
+        comparisons.append((entry, seconds, ratio, regressed))
+    return comparisons
+
+def environment():
+    """Describe the machine and libraries, a baseline is only comparable on the same one """
+    return {
+        'python' : platform.python_version(),
+        'numpy' : np.__version__,
+        'opencv' : cv2.__version__,
+        'machine' : platform.machine(),
+        'processor' : platform.processor(),
+        'cpu_count' : os.cpu_count(),
+        'omp_num_threads' : os.environ.get('OMP_NUM_THREADS')
+    }
+
+def main(argv):
+    # Arguments parsing
+    parser = argparse.ArgumentParser(description='Benchmark of every stage over images, min_area and backends')
+    parser.add_argument("--sizes", default=[256, 512, 1024], type=int, nargs="+",
+                        help="Sides of the images in pixels (default:256 512 1024)")
+    parser.add_argument("--images", default=['lenna', 'synthetic:0.1', 'synthetic:0.5'], nargs="+",
+                        help="lenna for demo/Lenna.png rescaled, synthetic:<detail> for a gradient with a share between "
+                        "0 and 1 covered by random blocks (default:lenna synthetic:0.1 synthetic:0.5)")
+    parser.add_argument("--min-area", default=[64, 256], type=int, nargs="+",
+                        help="Values of min_area (default:64 256)")
+    parser.add_argument("--backends", default=DEFAULT_BACKENDS, nargs="+", choices=list(REGISTRY),
+                        help="Voronoi backends, unavailable ones are skipped (default:%s)" %' '.join(DEFAULT_BACKENDS))
+    parser.add_argument("-t", "--iter", default=3, type=int, help="Lloyd iterations, each one is timed (default:3)")
+    parser.add_argument("--error-engine", default='slice', choices=ERROR_ENGINES,
+                        help="engine computing block errors (default:slice)")
+    parser.add_argument("-n", "--repeat", default=5, type=int, help="Runs of every stage, the fastest is kept (default:5)")
+    parser.add_argument("-o", "--output", default="benchmark.json", type=str,
+                        help="File receiving the results as JSON (default:benchmark.json)")
+    parser.add_argument("--baseline", type=str, help="Results of a former run to compare with")
+    parser.add_argument("--threshold", default=0.2, type=float,
+                        help="Relative slowdown against the baseline counted as a regression (default:0.2)")
+    parser.add_argument("--floor", default=0.03, type=float,
+                        help="Seconds a stage has to lose against the baseline before it counts, on top of "
+                        "3 times the noise of its repeats (default:0.03)")
+    args = parser.parse_args(argv[1:])
+
+    # Assign arguments
+    sizes = args.sizes
+    images = args.images
+    min_areas = args.min_area
+    iteration = args.iter
+    error_engine = args.error_engine
+    repeat = args.repeat
+    output_file = args.output
+    baseline_file = args.baseline
+    threshold = args.threshold
+    floor = args.floor
+
+    backends = []
+    for name in args.backends:
+        if REGISTRY[name].is_available() is True:
+            backends.append(name)
+        else:
+            print('Skip backend %s : %s' %(name, REGISTRY[name].error) )
+    if len(backends) == 0:
+        parser.error('no backend is available')
+
+    # Check the baseline before spending minutes on the matrix
+    baseline = None
+    if baseline_file is not None:
+        with open(baseline_file) as f:
+            baseline = json.load(f)
+        if baseline.get('version') != BENCHMARK_VERSION:
+            parser.error('baseline \'%s\' is written by another version' %baseline_file)
+
+    warm_up(backends)
+    records = []
+    with tempfile.TemporaryDirectory() as directory:
+        for image in images:
+            for side in sizes:
+                img = load_benchmark_image(image, side)
+                for min_area in min_areas:
+                    start = time.perf_counter()
+                    records.extend(benchmark_case(image, img, min_area, backends, iteration = iteration,
+                        error_engine = error_engine, repeat = repeat, directory = directory))
+                    print('%s %dx%d min_area %d : %d seeds, %.1fs' %(image, side, side, min_area,
+                        records[-1]['seeds'], time.perf_counter() - start) )
+
+    print('%-14s %-11s %5s %-7s %-16s %9s %8s %8s' %('image', 'size', 'area', 'backend', 'stage', 'seconds',
+        'MP/s', 'peak MB') )
+    for entry in records:
+        print('%-14s %-11s %5d %-7s %-16s %9.4f %8.1f %8.1f' %(entry['image'],
+            '%dx%d' %(entry['width'], entry['height']), entry['min_area'], entry['backend'] or '-', entry['stage'],
+            entry['seconds'], entry['mpps'] or 0, entry['peak_mb']) )
+
+    result = {
+        'version' : BENCHMARK_VERSION,
+        'environment' : environment(),
+        'settings' : {'iteration' : iteration, 'error_engine' : error_engine, 'repeat' : repeat,
+            'backends' : backends},
+        'max_rss_mb' : resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        'records' : records
+    }
+    with open(output_file, 'w') as f:
+        json.dump(result, f, indent=1)
+    print('Results dumped as file \'%s\'' %output_file )
+
+    if baseline is None:
+        return
+    if baseline['environment'] != result['environment']:
+        print('Warning: the baseline comes from another machine or library versions')
+    comparisons = compare_baseline(records, baseline['records'], threshold, floor)
+    regressions = [comparison for comparison in comparisons if comparison[3] is True]
+    print('Baseline : %d of %d stages matched, %d regressions above %.0f%%' %(len(comparisons), len(records),
+        len(regressions), threshold * 100) )
+    for entry, seconds, ratio, _ in sorted(regressions, key=lambda comparison: -comparison[2]):
+        print('  %s %dx%d min_area %d %s %s : %.4fs -> %.4fs (x%.2f)' %(entry['image'], entry['width'],
+            entry['height'], entry['min_area'], entry['backend'] or '-', entry['stage'], seconds, entry['seconds'],
+            ratio) )
+    if len(regressions) > 0:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    """main function """
+    main(sys.argv)
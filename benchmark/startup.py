@@ -0,0 +1,160 @@
+# -*- coding:utf8 -*-
+'''
+    File name: startup.py
+    Author   : Jim00000
+    Created  : 10/18/2026
+'''
+
+__author__    = "Jim00000"
+__copyright__ = "Copyright 2017, the python-mosaic project"
+__license__   = "GNU General Public License v3.0"
+__version__   = "1.0.0"
+
+import argparse
+import json
+import os
+import os.path
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Packages a case must not import, they belong to features it does not use
+FORBIDDEN = {
+    'help' : ['numpy', 'cv2', 'scipy', 'matplotlib', 'cppvoronoi'],
+    'small' : ['scipy', 'matplotlib']
+}
+
+def parse_importtime(text):
+    """Parse the report of python -X importtime
+
+    Keyword arguments:
+    text -- standard error of the process
+
+    Return:
+    imports -- list of (module, self microseconds, cumulative microseconds, depth)
+    """
+    imports = []
+    for line in text.splitlines():
+        if line.startswith('import time:') is False:
+            continue
+        fields = line[len('import time:'):].split('|')
+        if len(fields) != 3 or fields[0].strip().isdigit() is False:
+            continue
+        name = fields[2].rstrip()
+        depth = (len(name) - len(name.lstrip())) // 2
+        imports.append((name.strip(), int(fields[0]), int(fields[1]), depth))
+    return imports
+
+def measure(argv, cwd = None):
+    """Run a program once under python -X importtime
+
+    Keyword arguments:
+    argv -- the program and its arguments
+    cwd  -- working directory (default : None, the current one)
+
+    Return:
+    seconds -- wall time of the process
+    imports -- list given by parse_importtime
+    """
+    env = dict(os.environ)
+    env['PYTHONPATH'] = ROOT + os.pathsep + env.get('PYTHONPATH', '')
+    start = time.perf_counter()
+    process = subprocess.run([sys.executable, '-X', 'importtime'] + argv, cwd=cwd, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, universal_newlines=True)
+    seconds = time.perf_counter() - start
+    if process.returncode != 0:
+        raise RuntimeError('%s exited with %d :\n%s' %(' '.join(argv), process.returncode, process.stderr[-2000:]) )
+    return seconds, parse_importtime(process.stderr)
+
+def benchmark_case(name, argv, repeat = 5, cwd = None):
+    """Measure a case several times
+
+    Keyword arguments:
+    name   -- name of the case, a key of FORBIDDEN
+    argv   -- the program and its arguments
+    repeat -- number of runs, medians are reported (default : 5)
+    cwd    -- working directory (default : None, the current one)
+
+    Return:
+    result -- dictionary of wall and import seconds, the slowest imports and forbidden imports
+    """
+    walls = []
+    totals = []
+    imports = None
+    for _ in range(repeat):
+        seconds, imports = measure(argv, cwd)
+        walls.append(seconds)
+        totals.append(sum(cumulative for _, _, cumulative, depth in imports if depth == 0) * 1e-6)
+    modules = set(module for module, _, _, _ in imports)
+    forbidden = sorted(package for package in FORBIDDEN.get(name, [])
+        if any(module == package or module.startswith(package + '.') for module in modules))
+    slowest = sorted((entry for entry in imports if entry[3] == 0), key=lambda entry: -entry[2])[:5]
+    return {
+        'case' : name,
+        'argv' : argv,
+        'wall' : statistics.median(walls),
+        'imports' : statistics.median(totals),
+        'modules' : len(modules),
+        'slowest' : [[module, cumulative * 1e-6] for module, _, cumulative, _ in slowest],
+        'forbidden' : forbidden
+    }
+
+def small_image(filename, size = 128):
+    """Write the demo image rescaled to size x size """
+    import cv2
+    img = cv2.imread(os.path.join(ROOT, 'demo', 'Lenna.png'))
+    cv2.imwrite(filename, cv2.resize(img, (size, size), interpolation=cv2.INTER_AREA))
+
+def main(argv):
+    # Arguments parsing
+    parser = argparse.ArgumentParser(description='Start-up benchmark of mosaic.py with python -X importtime')
+    parser.add_argument("-n", "--repeat", default=5, type=int, help="Runs of every case, medians are reported (default:5)")
+    parser.add_argument("--size", default=128, type=int, help="Side of the small image in pixels (default:128)")
+    parser.add_argument("--max-help", default=0.5, type=float,
+                        help="Wall seconds mosaic.py --help may take (default:0.5)")
+    parser.add_argument("--max-small", default=1.5, type=float,
+                        help="Wall seconds a run on the small image may take (default:1.5)")
+    parser.add_argument("--json", type=str, help="File receiving the results as JSON")
+    args = parser.parse_args(argv[1:])
+
+    # Assign arguments
+    repeat = args.repeat
+    size = args.size
+    budgets = {'help' : args.max_help, 'small' : args.max_small}
+    json_file = args.json
+
+    mosaic = os.path.join(ROOT, 'mosaic.py')
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        image = os.path.join(directory, 'small.png')
+        small_image(image, size)
+        results.append(benchmark_case('help', [mosaic, '--help'], repeat))
+        # Without the stage cache, every run computes all the stages
+        results.append(benchmark_case('small', [mosaic, image, '-o', os.path.join(directory, 'output.png'),
+            '--no-cache'], repeat, cwd=directory))
+
+    failed = False
+    for result in results:
+        print('%-6s wall %.3fs, imports %.3fs, %d modules' %(result['case'], result['wall'], result['imports'],
+            result['modules']) )
+        for module, seconds in result['slowest']:
+            print('         %-28s %.3fs' %(module, seconds) )
+        if len(result['forbidden']) > 0:
+            print('  FAIL : imports %s' %', '.join(result['forbidden']) )
+            failed = True
+        if result['wall'] > budgets[result['case']]:
+            print('  FAIL : slower than %.3fs' %budgets[result['case']] )
+            failed = True
+
+    if json_file is not None:
+        with open(json_file, 'w') as f:
+            json.dump(results, f, indent=1)
+    if failed is True:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    """main function """
+    main(sys.argv)
@@ -0,0 +1,133 @@
+# -*- coding:utf8 -*-
+'''
+    File name: tiled.py
+    Author   : Jim00000
+    Created  : 10/18/2026
+'''
+
+__author__    = "Jim00000"
+__copyright__ = "Copyright 2017, the python-mosaic project"
+__license__   = "GNU General Public License v3.0"
+__version__   = "1.0.0"
+
+import argparse
+import os.path
+import sys
+import tempfile
+import time
+import numpy as np
+from pipeline.pipeline import MosaicPipeline
+from voronoi.voronoi import generate_voronoi_diagram
+from tile.tile import TILE_PIXEL_BYTES, TileGrid, tiled_mosaic, tiled_seeds, tiled_relaxation
+from benchmark.stages import load_benchmark_image
+
+def check_one_tile(img, directory, iteration = 3, backend = 'kdtree', halo = 16, centroidal = False):
+    """Run the tiled mode with a single tile and the whole image pipeline, both write .npy outputs
+
+    Keyword arguments:
+    img        -- three-dimensions uint8 array represents rgb of an image
+    directory  -- directory receiving the input and the outputs
+    iteration  -- Lloyd iterations (default : 3)
+    backend    -- one of BACKENDS except 'auto' (default : 'kdtree')
+    halo       -- halo of the tile (default : 16)
+    centroidal -- use the color of the seed instead of the average color (default : False)
+
+    Return:
+    pixels -- number of pixels which differ between both outputs, 0 if the files are identical
+    """
+    source = os.path.join(directory, 'source.npy')
+    tiled = os.path.join(directory, 'tiled.npy')
+    whole = os.path.join(directory, 'whole.npy')
+    np.save(source, img)
+    # The budget of a window covering the image
+    side = max(img.shape[0], img.shape[1]) + 2 * halo
+    tiled_mosaic(source, tiled, memory_budget=side * side * TILE_PIXEL_BYTES, halo=halo,
+        iteration=iteration, backend=backend, centroidal=centroidal)
+    MosaicPipeline(iteration=iteration, backend=backend, centroidal=centroidal).run_to_file(img, whole)
+    with open(tiled, 'rb') as f, open(whole, 'rb') as g:
+        if f.read() == g.read():
+            return 0
+    return int(np.count_nonzero(np.any(np.load(tiled) != np.load(whole), axis=2)))
+
+def check_tiles(img, directory, size, halo, iteration = 3, backend = 'kdtree'):
+    """Relax the seeds of a tile grid tile by tile and on the whole image
+
+    Keyword arguments:
+    img       -- three-dimensions uint8 array represents rgb of an image
+    directory -- directory receiving the memory maps
+    size      -- side of the tiles
+    halo      -- halo of the tiles
+    iteration -- Lloyd iterations (default : 3)
+    backend   -- one of BACKENDS except 'auto' (default : 'kdtree')
+
+    Return:
+    seeds   -- number of seeds
+    moved   -- number of seeds whose final position differs
+    pixels  -- number of pixels whose label differs
+    seconds -- (tiled, whole) seconds of the relaxation
+    """
+    height = img.shape[0]
+    width = img.shape[1]
+    grid = TileGrid(width, height, size, halo)
+    point_x, point_y = tiled_seeds(img, grid, directory)
+    whole_x = np.array(point_x)
+    whole_y = np.array(point_y)
+
+    start = time.perf_counter()
+    labels = tiled_relaxation(grid, point_x, point_y, directory, iteration=iteration, backend=backend)
+    tiled_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    whole_labels = generate_voronoi_diagram(width, height, whole_x, whole_y, iteration=iteration, backend=backend)
+    whole_seconds = time.perf_counter() - start
+
+    moved = int(np.count_nonzero((point_x != whole_x) | (point_y != whole_y)))
+    pixels = int(np.count_nonzero(labels != whole_labels))
+    return point_x.size, moved, pixels, (tiled_seconds, whole_seconds)
+
+def main(argv):
+    # Arguments parsing
+    parser = argparse.ArgumentParser(description='Check the tiled mode against the whole image pipeline')
+    parser.add_argument("--size", default=512, type=int, help="Side of the images in pixels (default:512)")
+    parser.add_argument("--images", default=['lenna', 'synthetic:0.5'], nargs="+",
+                        help="lenna for demo/Lenna.png rescaled, synthetic:<detail> for a gradient with a share between "
+                        "0 and 1 covered by random blocks (default:lenna synthetic:0.5)")
+    parser.add_argument("--tiles", default=[37, 64, 100, 256], type=int, nargs="+",
+                        help="Sides of the tiles of the multi-tile runs (default:37 64 100 256)")
+    parser.add_argument("--halo", default=16, type=int, help="Halo of the tiles, at most their side (default:16)")
+    parser.add_argument("-t", "--iter", default=3, type=int, help="Lloyd iterations (default:3)")
+    parser.add_argument("--voronoi-backend", default='kdtree', type=str, help="Voronoi backend (default:kdtree)")
+    args = parser.parse_args(argv[1:])
+
+    # Assign arguments
+    side = args.size
+    images = args.images
+    tiles = args.tiles
+    halo = args.halo
+    iteration = args.iter
+    backend = args.voronoi_backend
+
+    failures = 0
+    with tempfile.TemporaryDirectory() as directory:
+        for image in images:
+            img = load_benchmark_image(image, side)
+            # A single tile gives the output of the whole image pipeline byte for byte
+            for centroidal in (False, True):
+                pixels = check_one_tile(img, directory, iteration=iteration, backend=backend, halo=halo,
+                    centroidal=centroidal)
+                print('%s %dx%d one tile %s : %d pixels differ%s' %(image, side, side,
+                    'centroidal' if centroidal is True else 'average', pixels, ' FAIL' if pixels > 0 else '') )
+                failures += pixels > 0
+            # Tiles seed their own quadtree, from the same seeds relaxation gives the whole image result
+            for size in tiles:
+                seeds, moved, pixels, seconds = check_tiles(img, directory, size, min(halo, size),
+                    iteration=iteration, backend=backend)
+                print('%s %dx%d tiles of %d : %d seeds, %d moved elsewhere, %d labels differ, '
+                    'tiled %.2fs whole %.2fs%s' %(image, side, side, size, seeds, moved, pixels, seconds[0],
+                    seconds[1], ' FAIL' if moved + pixels > 0 else '') )
+                failures += moved + pixels > 0
+    if failures > 0:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    """main function """
+    main(sys.argv)
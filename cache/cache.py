@@ -0,0 +1,267 @@
+# -*- coding:utf8 -*-
+'''
+    File name: cache.py
+    Author   : Jim00000
+    Created  : 10/18/2026
+'''
+
+__author__    = "Jim00000"
+__copyright__ = "Copyright 2017, the python-mosaic project"
+__license__   = "GNU General Public License v3.0"
+__version__   = "1.0.0"
+
+import functools
+import glob
+import hashlib
+import json
+import os
+import os.path
+import numpy as np
+from cache.options import DEFAULT_CACHE_DIR, DEFAULT_CACHE_BYTES
+from container.container import Container, save_container
+from quad.index import image_digest
+from voronoi.voronoi import generate_voronoi_diagram
+from voronoi.backend import select_backend
+
+CACHE_VERSION = 1
+# Sources a stage depends on, entries are dropped once they change
+STAGE_SOURCES = {
+    'seeds' : ['quad'],
+    'voronoi' : ['voronoi', 'cppvoronoi']
+}
+
+class StageCache:
+
+    def __init__(self, directory = DEFAULT_CACHE_DIR, max_bytes = DEFAULT_CACHE_BYTES):
+        """Cache of stage outputs, keyed by the digest of the stage inputs, its
+        parameters and its source code. Every entry is a container file, the
+        least recently used entries are removed once the directory gets larger
+        than max_bytes.
+
+        Keyword arguments:
+        directory -- directory of the entries (default : DEFAULT_CACHE_DIR)
+        max_bytes -- size bound of the directory in bytes (default : DEFAULT_CACHE_BYTES)
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, stage, *parameters):
+        """Get the key of a stage output
+
+        Keyword arguments:
+        stage      -- one of STAGE_SOURCES
+        parameters -- values the output depends on, digests of arrays and JSON values
+
+        Return:
+        key -- hexadecimal digest
+        """
+        description = [CACHE_VERSION, stage, code_version(stage)] + list(parameters)
+        return hashlib.sha1(json.dumps(description).encode()).hexdigest()
+
+    def get(self, key):
+        """Look up an entry and mark it as recently used
+
+        Keyword arguments:
+        key -- key given by key()
+
+        Return:
+        entry -- the Container, None if there is no such entry
+        """
+        filename = self.__path__(key)
+        try:
+            entry = Container(filename)
+            os.utime(filename)
+        except (FileNotFoundError, ValueError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry
+
+    def put(self, key, kind, arrays, meta = None, compressed = ()):
+        """Store an entry, then evict the least recently used ones beyond the size bound.
+        Arguments are the ones of save_container.
+        """
+        filename = self.__path__(key)
+        # Readers never see a partial entry
+        temporary = filename + '.%d.tmp' %os.getpid()
+        save_container(temporary, kind, arrays, meta = meta, compressed = compressed)
+        os.replace(temporary, filename)
+        self.stores += 1
+        self.evict()
+
+    def evict(self):
+        """Remove the least recently used entries until the directory fits the size bound """
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for filename, size, _ in sorted(entries, key=lambda entry: entry[2]):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(filename)
+            except FileNotFoundError:
+                pass
+            total -= size
+            self.evictions += 1
+
+    def entries(self):
+        """Get (file name, size, last use time) of every entry """
+        entries = []
+        for filename in glob.glob(os.path.join(self.directory, '*.npz')):
+            try:
+                stat = os.stat(filename)
+            except FileNotFoundError:
+                continue
+            entries.append((filename, stat.st_size, stat.st_mtime))
+        return entries
+
+    def statistics(self):
+        """Get a line describing hits and misses of this run and the directory """
+        entries = self.entries()
+        return ('Stage cache : %d hits, %d misses, %d stored, %d evicted, %d entries, %.1f of %.1f MB in \'%s\''
+            %(self.hits, self.misses, self.stores, self.evictions, len(entries),
+            sum(size for _, size, _ in entries) / (1 << 20), self.max_bytes / (1 << 20), self.directory) )
+
+    def __path__(self, key):
+        return os.path.join(self.directory, key + '.npz')
+
+@functools.lru_cache(maxsize=None)
+def code_version(stage):
+    """Get the digest of the sources of a stage """
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    h = hashlib.sha1()
+    for package in STAGE_SOURCES[stage]:
+        for pattern in ('*.py', '*.pyx', '*.cpp', '*.h'):
+            for filename in sorted(glob.glob(os.path.join(root, package, pattern))):
+                h.update(os.path.basename(filename).encode())
+                with open(filename, 'rb') as f:
+                    h.update(f.read())
+    return h.hexdigest()
+
+def seed_digest(point_x, point_y):
+    """Get the digest of seed positions """
+    h = hashlib.sha1()
+    h.update(np.ascontiguousarray(point_x, dtype=np.float64).data)
+    h.update(np.ascontiguousarray(point_y, dtype=np.float64).data)
+    return h.hexdigest()
+
+def cached_seeds(cache, img, generate, min_area = 64, error_rate = 0.5, error_engine = 'slice'):
+    """Generate seeds of an image, or reuse them from the cache
+
+    Keyword arguments:
+    cache        -- the StageCache, None to always generate
+    img          -- three-dimensions array represents rgb of an image, after the blur
+    generate     -- function () -> (point_x, point_y) computing the seeds
+    min_area     -- minimal pixels for each block (default : 64)
+    error_rate   -- error rate (default : 0.5)
+    error_engine -- name of the error engine (default : 'slice')
+
+    Return:
+    point_x -- collections of x position of seeds in one-dimension array
+    point_y -- collections of y position of seeds in one-dimension array
+    """
+    if cache is None:
+        return generate()
+
+    key = cache.key('seeds', image_digest(img), min_area, error_rate, error_engine)
+    entry = cache.get(key)
+    if entry is not None:
+        print('Stage cache : seeds reused')
+        with entry:
+            return np.array(entry.array('x')), np.array(entry.array('y'))
+
+    point_x, point_y = generate()
+    cache.put(key, 'seeds', {'x' : point_x, 'y' : point_y})
+    return point_x, point_y
+
+def cached_voronoi_diagram(cache, width, height, point_x, point_y, iteration = 3, backend = 'auto', report_jfa = False,
+        tolerance = None, convergence = 'max', displacements = None, incremental = False, revisit_moved = False,
+        coarse_scale = 1, fine_iteration = 1, report_backend = False):
+    """Run generate_voronoi_diagram, reusing iterations from the cache.
+    Every full resolution iteration is stored, keyed by the initial seeds and its
+    number, so a run with more iterations resumes from the last stored one.
+    Incremental and multi-resolution runs depend on more than the seeds, only their
+    final result is stored. Runs reporting jfa errors are not cached.
+    Seeds are updated in place, like generate_voronoi_diagram does.
+
+    Keyword arguments:
+    cache -- the StageCache, None to always compute
+    Other arguments are the ones of generate_voronoi_diagram.
+
+    Return:
+    labels -- two-dimensions int32 array, index of the seed owning every pixel
+    """
+    def generate(point_x, point_y, iteration, on_iteration = None):
+        return generate_voronoi_diagram(width, height, point_x, point_y, iteration = iteration, backend = backend,
+            report_jfa = report_jfa, tolerance = tolerance, convergence = convergence, displacements = displacements,
+            incremental = incremental, revisit_moved = revisit_moved, coarse_scale = coarse_scale,
+            fine_iteration = fine_iteration, on_iteration = on_iteration, report_backend = report_backend)
+
+    if cache is None or report_jfa is True:
+        return generate(point_x, point_y, iteration)
+
+    # Exact backends may break ties differently, so the backend is part of the key
+    if backend == 'auto':
+        backend = select_backend(width, height, point_x.size).name
+    digest = seed_digest(point_x, point_y)
+
+    def load(entry):
+        with entry:
+            point_x[:] = entry.array('x')
+            point_y[:] = entry.array('y')
+            return np.array(entry.array('labels')), entry.meta['displacement']
+
+    def store(key, labels, measure):
+        cache.put(key, 'vordig', {'x' : point_x, 'y' : point_y, 'labels' : labels},
+            meta = {'displacement' : measure}, compressed = ('labels',))
+
+    # Results of incremental and multi-resolution runs are stored as a whole
+    if incremental is True or coarse_scale > 1:
+        key = cache.key('voronoi', digest, width, height, backend, iteration, tolerance, convergence,
+            incremental, revisit_moved, coarse_scale, fine_iteration)
+        entry = cache.get(key)
+        if entry is not None:
+            print('Stage cache : voronoi diagram reused')
+            return load(entry)[0]
+        labels = generate(point_x, point_y, iteration)
+        store(key, labels, None)
+        return labels
+
+    def iteration_key(i):
+        return cache.key('voronoi', digest, width, height, backend, i)
+
+    # Replay stored iterations, they stop at the tolerance like computed ones
+    labels = None
+    done = 0
+    converged = False
+    while done < iteration and converged is False:
+        entry = cache.get(iteration_key(done + 1))
+        if entry is None:
+            break
+        with entry:
+            point_x[:] = entry.array('x')
+            point_y[:] = entry.array('y')
+            measure = entry.meta['displacement']
+            done += 1
+            if displacements is not None:
+                displacements.append((measure['max'], measure['mean'], measure['moved']))
+            if tolerance is not None:
+                print('Iteration %d : max displacement %.3f, mean displacement %.3f, %d seeds moved'
+                    %(done, measure['max'], measure['mean'], measure['moved']) )
+                converged = measure[convergence] <= tolerance
+            # Only the labels of the last iteration are returned, the others are never decompressed
+            if done == iteration or converged is True:
+                labels = np.array(entry.array('labels'))
+    if done > 0:
+        print('Stage cache : %d voronoi iterations reused' %done )
+    if done == iteration or converged is True:
+        return labels
+
+    def on_iteration(i, point_x, point_y, labels, measure):
+        store(iteration_key(done + i + 1), labels, measure)
+
+    return generate(point_x, point_y, iteration - done, on_iteration)
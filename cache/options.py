@@ -0,0 +1,18 @@
+# -*- coding:utf8 -*-
+'''
+    File name: options.py
+    Author   : Jim00000
+    Created  : 10/18/2026
+'''
+
+__author__    = "Jim00000"
+__copyright__ = "Copyright 2017, the python-mosaic project"
+__license__   = "GNU General Public License v3.0"
+__version__   = "1.0.0"
+
+import os.path
+
+# Defaults of --cache-dir and --cache-size, kept apart from the cache so command
+# lines are parsed without loading NumPy
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'python-mosaic')
+DEFAULT_CACHE_BYTES = 1 << 30
@@ -0,0 +1,204 @@
+# -*- coding:utf8 -*-
+'''
+    File name: container.py
+    Author   : Jim00000
+    Created  : 10/18/2026
+'''
+
+__author__    = "Jim00000"
+__copyright__ = "Copyright 2017, the python-mosaic project"
+__license__   = "GNU General Public License v3.0"
+__version__   = "1.0.0"
+
+import json
+import os.path
+import pickle
+import struct
+import zipfile
+import numpy as np
+import cv2
+from quad.index import image_digest
+
+CONTAINER_VERSION = 1
+# Size of the fixed part of a zip local file header
+LOCAL_HEADER_SIZE = 30
+
+class Container:
+
+    def __init__(self, filename):
+        """Read a container written by save_container.
+        Arrays are read on demand : arrays stored without compression are
+        memory mapped from the file, compressed ones are decompressed.
+
+        Keyword arguments:
+        filename -- the container file
+
+        Attributes:
+        kind -- what the container holds, e.g. 'seeds' or 'vordig'
+        meta -- dictionary of the values stored next to the arrays
+
+        Exceptions:
+        FileNotFoundError -- if argument 'filename' file does not exist
+        ValueError        -- if the file is not a container or is written by another version
+        """
+        # Check existence of files
+        if os.path.isfile(filename) is False:
+            raise FileNotFoundError('File \'%s\' does not exist' %filename )
+        if zipfile.is_zipfile(filename) is False:
+            raise ValueError('File \'%s\' is not a mosaic container' %filename )
+
+        self.filename = filename
+        self.zip = zipfile.ZipFile(filename, 'r')
+        if 'meta.json' not in self.zip.namelist():
+            self.zip.close()
+            raise ValueError('File \'%s\' is not a mosaic container' %filename )
+        meta = json.loads(self.zip.read('meta.json').decode('utf8'))
+        if meta.get('version') != CONTAINER_VERSION:
+            self.zip.close()
+            raise ValueError('Unsupported container version %s' %meta.get('version') )
+        self.kind = meta['kind']
+        self.meta = meta['meta']
+
+    def names(self):
+        """Get names of the stored arrays """
+        return [name[:-4] for name in self.zip.namelist() if name.endswith('.npy')]
+
+    def array(self, name):
+        """Get a stored array, read-only
+
+        Keyword arguments:
+        name -- name of the array
+
+        Return:
+        data -- the array, memory mapped if it is stored without compression
+
+        Exceptions:
+        KeyError -- if there is no such array
+        """
+        info = self.zip.getinfo(name + '.npy')
+        if info.compress_type == zipfile.ZIP_STORED:
+            data = self.__memmap__(info)
+            if data is not None:
+                return data
+        with self.zip.open(info) as f:
+            data = np.lib.format.read_array(f, allow_pickle=False)
+        data.flags.writeable = False
+        return data
+
+    def close(self):
+        """Close the file, memory mapped arrays stay valid """
+        self.zip.close()
+
+    def __memmap__(self, info):
+        """Map an array stored without compression, None if it is empty """
+        with open(self.filename, 'rb') as f:
+            f.seek(info.header_offset)
+            header = f.read(LOCAL_HEADER_SIZE)
+            name_length, extra_length = struct.unpack('<HH', header[26:30])
+            f.seek(info.header_offset + LOCAL_HEADER_SIZE + name_length + extra_length)
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+            offset = f.tell()
+        if int(np.prod(shape)) == 0:
+            return None
+        return np.memmap(self.filename, dtype=dtype, mode='r', offset=offset, shape=shape,
+            order='F' if fortran_order is True else 'C')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+def save_container(filename, kind, arrays, meta = None, compressed = ()):
+    """Dump arrays and values into a container, a zip file of .npy arrays and
+    a JSON description. Arrays are stored as given, without pickles.
+
+    Keyword arguments:
+    filename   -- file name that will be saved
+    kind       -- what the container holds, e.g. 'seeds' or 'vordig'
+    arrays     -- dictionary of name -> array
+    meta       -- dictionary of JSON values stored next to the arrays (default : None)
+    compressed -- names of the arrays compressed with deflate, others can be
+                  memory mapped on load (default : ())
+    """
+    description = {
+        'version' : CONTAINER_VERSION,
+        'kind' : kind,
+        'meta' : {} if meta is None else meta
+    }
+    with zipfile.ZipFile(filename, 'w') as zf:
+        zf.writestr('meta.json', json.dumps(description, indent=1))
+        for name in arrays:
+            info = zipfile.ZipInfo(name + '.npy')
+            info.compress_type = zipfile.ZIP_DEFLATED if name in compressed else zipfile.ZIP_STORED
+            with zf.open(info, 'w', force_zip64=True) as f:
+                np.lib.format.write_array(f, np.ascontiguousarray(arrays[name]), allow_pickle=False)
+
+def image_reference(filename, img, gaussian_blur = False):
+    """Describe the image a stage works on, instead of storing a copy of it
+
+    Keyword arguments:
+    filename      -- input image file
+    img           -- the image as the stage sees it, after the blur
+    gaussian_blur -- True if the 5x5 gaussian blur was applied (default : False)
+
+    Return:
+    reference -- dictionary of the path, shape, blur and digest of the image
+    """
+    return {
+        'path' : os.path.abspath(filename),
+        'shape' : list(img.shape),
+        'gaussian_blur' : gaussian_blur,
+        'digest' : image_digest(img)
+    }
+
+def load_reference_image(reference):
+    """Load the image described by image_reference, as the stage saw it
+
+    Keyword arguments:
+    reference -- dictionary given by image_reference
+
+    Return:
+    img -- three-dimensions array represents rgb of an image
+
+    Exceptions:
+    FileNotFoundError -- if the image file does not exist any more
+    ValueError        -- if the image changed since it was referenced
+    """
+    path = reference['path']
+    if os.path.isfile(path) is False:
+        raise FileNotFoundError('File \'%s\' does not exist' %path )
+    img = cv2.cvtColor(cv2.imread(path), cv2.COLOR_BGR2RGB)
+    if reference['gaussian_blur'] is True:
+        img = cv2.GaussianBlur(img, (5, 5), 0)
+    if image_digest(img) != reference['digest']:
+        raise ValueError('Image \'%s\' changed since it was referenced' %path )
+    return img
+
+def is_container(filename):
+    """Check whether a file is a container rather than a pickle of a former version """
+    return zipfile.is_zipfile(filename)
+
+def load_pickle(filename, allow_pickle = False):
+    """Load a pickle file written by a former version of the programs
+
+    Keyword arguments:
+    filename     -- the pickle file
+    allow_pickle -- True if the file is trusted (default : False)
+
+    Return:
+    data -- the unpickled dictionary
+
+    Exceptions:
+    ValueError -- if argument 'allow_pickle' is False, unpickling runs arbitrary code
+    """
+    if allow_pickle is False:
+        raise ValueError('File \'%s\' is a pickle of a former version, loading it can run arbitrary code, '
+            'pass --allow-pickle if the file is trusted' %filename )
+    with open(filename, 'rb') as f:
+        return pickle.load(f)
@@ -58,3 +58,38 @@ Voronoi::diagram(
     }
 
 }
+
+void
+Voronoi::labels(
+    int width,
+    int height,
+    const double *point_x,
+    const double *point_y,
+    int sz,
+    int *labels
+)
+{
+    // Every thread writes its own rows, so no lock is needed
+    #pragma omp parallel for schedule(dynamic)
+    for(int y = 0; y < height; y++) {
+        int *row = labels + (long)y * width;
+        for(int x = 0; x < width; x++) {
+
+            // Compare squared Euclidean distance and find its index
+            double min = INFINITY;
+            int minarg = -1;
+            for(int i = 0; i < sz; i++) {
+                double dx = point_x[i] - x;
+                double dy = point_y[i] - y;
+                double dist = dx * dx + dy * dy;
+                if(dist < min) {
+                    min = dist;
+                    minarg = i;
+                }
+            }
+
+            row[x] = minarg;
+        }
+    }
+
+}
@@ -12,5 +12,13 @@ namespace cpp {
             std::vector<int>,
             std::map<int,std::vector<std::pair<int,int>>>*
         );
+        void labels(
+            int,
+            int,
+            const double*,
+            const double*,
+            int,
+            int*
+        );
     };
 }
\ No newline at end of file
@@ -0,0 +1,58 @@
+from libcpp.map cimport map
+from libcpp.vector cimport vector
+from libcpp.pair cimport pair
+from cpython cimport array
+cimport openmp
+import numpy as np
+
+cdef extern from "Voronoi.h" namespace "cpp":
+    cdef cppclass Voronoi:
+        void diagram(int, int, vector[int], vector[int], map[int,vector[pair[int,int]]]*);
+        void labels(int, int, const double*, const double*, int, int*) nogil;
+
+def cpp_voronoi_diagram(width, height, point_x, point_y):
+    cdef map[int,vector[pair[int,int]]] *m = new map[int,vector[pair[int,int]]]();
+    cdef Voronoi *vor = new Voronoi();
+    vor.diagram(width, height, point_x, point_y, m);
+
+    # Label every pixel with its cell, skip the dummy data pair (-1, -1)
+    labels = np.full((height, width), -1, dtype=np.int32)
+    cdef int[:, ::1] view = labels
+    cdef pair[int,vector[pair[int,int]]] cell
+    cdef pair[int,int] p
+    for cell in m[0]:
+        for p in cell.second:
+            if p.first >= 0:
+                view[p.second, p.first] = cell.first
+
+    del vor;
+    del m;
+
+    return labels
+
+
+def cpp_voronoi_labels(int width, int height, point_x, point_y, int[:, ::1] labels):
+    """Label every pixel with the index of its nearest seed.
+    Labels are written straight into the caller's int32 buffer of shape
+    (height, width), and the GIL is released while computing.
+    """
+    if labels.shape[0] != height or labels.shape[1] != width:
+        raise ValueError('Labels buffer must be of shape (%d, %d)' %(height, width))
+
+    cdef double[::1] px = np.ascontiguousarray(point_x, dtype=np.float64)
+    cdef double[::1] py = np.ascontiguousarray(point_y, dtype=np.float64)
+    cdef int size = px.shape[0]
+    cdef Voronoi vor
+    if size == 0 or width == 0 or height == 0:
+        labels[:, :] = -1
+        return labels.base
+
+    with nogil:
+        vor.labels(width, height, &px[0], &py[0], size, &labels[0, 0])
+
+    return labels.base
+
+
+def cpp_thread_count():
+    """Get the number of OpenMP threads labelling pixels """
+    return openmp.omp_get_max_threads()
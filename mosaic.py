@@ -13,17 +13,21 @@ __version__ = "1.0.0"
 import os.path
 import sys
 import argparse
-import cv2
-from quad.quad import Quad
-from voronoi.voronoi import generate_voronoi_diagram
-from plot.plot import save_img, average_plot, centroidal_plot, plot_mosaic_edge, adjust_gamma
+# Only option names are loaded up front, every mode imports its stages when it runs
+from quad.options import ERROR_ENGINES
+from voronoi.options import BACKENDS, CONVERGENCE
+from cache.options import DEFAULT_CACHE_DIR
 
 
-def main(argv):
-    # Arguments parsing
+def build_parser():
+    """Build the parser of the command line arguments, shared with the service
+
+    Return:
+    parser -- the ArgumentParser
+    """
     parser = argparse.ArgumentParser(
         description='A tool to add mosaic effect to images')
-    parser.add_argument("filename", help="Input image file", type=str)
+    parser.add_argument("filename", nargs="?", help="Input image file", type=str)
     parser.add_argument("-o", "--output-file", default="output.jpg",
                         type=str, help="The output file for mosaic effect images")
     group = parser.add_argument_group(title='mosaic seed generator')
@@ -33,9 +37,27 @@ def main(argv):
                        help="minimal pixels for each block (default:64)")
     group.add_argument("--enable-gaussian-blur", default=False,
                        action="store_true", help="Apply Gaussian blur")
+    group.add_argument("--error-engine", default='slice', choices=ERROR_ENGINES,
+                       help="engine computing block errors (default:slice)")
     group = parser.add_argument_group(title='mosaic voronoi graph generator')
     group.add_argument("-t", "--iter", default=5, type=int,
                        help="Iteration time for Lloyd’s algorithm (default:5)")
+    group.add_argument("--tolerance", type=float,
+                       help="Stop iterating once the seed displacement is not above it, -t is the upper bound")
+    group.add_argument("--convergence", default='max', choices=CONVERGENCE,
+                       help="Seed displacement compared with the tolerance (default:max)")
+    group.add_argument("--incremental", default=False, action="store_true",
+                       help="After the first iteration, reassign pixels among the previous owner and its Delaunay neighbors only")
+    group.add_argument("--revisit-moved", default=False, action="store_true",
+                       help="With --incremental, revisit only pixels near seeds that moved")
+    group.add_argument("--coarse-scale", default=1, type=int,
+                       help="Run the first iterations on the image downsampled by this factor (default:1)")
+    group.add_argument("--fine-iter", default=1, type=int,
+                       help="Iterations at full resolution with --coarse-scale (default:1)")
+    group.add_argument("--voronoi-backend", default='auto', choices=BACKENDS,
+                       help="Engine assigning pixels to seeds (default:auto)")
+    group.add_argument("--report-jfa", default=False, action="store_true",
+                       help="Report pixels the jfa backend assigns to a seed other than the nearest one")
     group = parser.add_mutually_exclusive_group()
     group.add_argument("-pc", "--plot-centroidal", default=False,
                        action="store_true", help="Use centroidal point as the color of the cell (default:False)")
@@ -46,13 +68,98 @@ def main(argv):
                        action="store_true", help="Plot edge for all cells")
     group.add_argument("--bold-edge", default=False,
                        action="store_true", help="Plot edge with bold line style")
+    group.add_argument("--edge-width", default=1, type=int,
+                       help="Width of edges in pixels (default:1)")
     group.add_argument("-rgb", type=int, nargs=3,
                        default=[0, 0, 0], help="Set rgb for edge (default : [0, 0, 0])")
     group.add_argument("--enable-gamma-correction", default=False,
                        action="store_true", help="Enable gamma correction to adjust image")
     group.add_argument("-gamma", type=float, default=1.0,
                        help="Set gamma value (default : 1.0)")
-    args = parser.parse_args()
+    group = parser.add_argument_group(title='tiled mode')
+    group.add_argument("--tile", default=False, action="store_true",
+                       help="Process the image tile by tile with memory maps, for images larger than memory")
+    group.add_argument("--memory-budget", default=512, type=int,
+                       help="Working memory of a tile in MB (default:512)")
+    group.add_argument("--tile-halo", default=64, type=int,
+                       help="Pixels added around every tile, a tile whose cells reach past them is done again over "
+                       "a window larger by a ring of tiles (default:64)")
+    group.add_argument("--spill-dir", type=str,
+                       help="Directory receiving the memory maps (default: a temporary directory)")
+    group = parser.add_argument_group(title='batch mode')
+    group.add_argument("--batch", nargs="+", metavar="SOURCE",
+                       help="Process directories, glob patterns or files instead of filename, '-' reads one file per line from stdin")
+    group.add_argument("--output-dir", default="mosaic_output", type=str,
+                       help="Directory of the batch outputs (default:mosaic_output)")
+    group.add_argument("--output-ext", default=".jpg", type=str,
+                       help="Extension of the batch outputs (default:.jpg)")
+    group.add_argument("--jobs", type=int,
+                       help="Worker processes of the batch (default: one per core)")
+    group.add_argument("--threads", type=int,
+                       help="Threads of every batch worker (default: cores left per worker)")
+    group.add_argument("--report", type=str,
+                       help="File receiving one JSON line per image (default: report.jsonl in the output directory)")
+    group = parser.add_argument_group(title='video mode')
+    group.add_argument("--video", default=False, action="store_true",
+                       help="Read filename as a video or an image sequence like frames/%%04d.png, and write a video")
+    group.add_argument("--change-threshold", default=8.0, type=float,
+                       help="Mean absolute difference of a block above which its seeds are rebuilt (default:8.0)")
+    group.add_argument("--change-block", default=64, type=int,
+                       help="Side of the blocks compared between frames in pixels (default:64)")
+    group.add_argument("--fourcc", default="mp4v", type=str,
+                       help="Codec of the output video (default:mp4v)")
+    group = parser.add_argument_group(title='stage cache')
+    group.add_argument("--no-cache", default=False, action="store_true",
+                       help="Always compute seeds and the voronoi diagram, without the stage cache")
+    group.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, type=str,
+                       help="Directory of the stage cache (default:%s)" % DEFAULT_CACHE_DIR)
+    group.add_argument("--cache-size", default=1024, type=int,
+                       help="Size bound of the stage cache in MB (default:1024)")
+    group.add_argument("--cache-stats", default=False, action="store_true",
+                       help="Print stage cache statistics")
+    return parser
+
+
+def create_pipeline(args, report_backend = False):
+    """Create the pipeline and its stage cache for parsed arguments
+
+    Keyword arguments:
+    args           -- arguments given by the parser of build_parser
+    report_backend -- print the Voronoi backend of every diagram computed (default : False)
+
+    Return:
+    pipeline -- the MosaicPipeline
+    """
+    from cache.cache import StageCache
+    from pipeline.pipeline import MosaicPipeline
+
+    # Stage outputs are reused when only plot options change
+    cache = None if args.no_cache is True else StageCache(args.cache_dir, args.cache_size << 20)
+    return MosaicPipeline(min_area=args.min_area, error_rate=args.error_rate, error_engine=args.error_engine,
+        gaussian_blur=args.enable_gaussian_blur, iteration=args.iter, backend=args.voronoi_backend,
+        report_jfa=args.report_jfa, tolerance=args.tolerance, convergence=args.convergence,
+        incremental=args.incremental, revisit_moved=args.revisit_moved,
+        coarse_scale=args.coarse_scale, fine_iteration=args.fine_iter,
+        centroidal=args.plot_centroidal, plot_edge=args.plot_mosaic_edge, rgb=args.rgb, bold_edge=args.bold_edge,
+        edge_width=args.edge_width, gamma=args.gamma if args.enable_gamma_correction is True else None,
+        cache=cache, report_backend=report_backend)
+
+
+def main(argv):
+    # Arguments parsing
+    parser = build_parser()
+    args = parser.parse_args(argv[1:])
+
+    if (args.filename is None) == (args.batch is None):
+        parser.error('give either filename or --batch')
+    if args.batch is not None and args.tile is True:
+        parser.error('--batch can not be used with --tile')
+    if args.video is True and (args.batch is not None or args.tile is True):
+        parser.error('--video can not be used with --batch or --tile')
+
+    # Options relying on the whole image at once
+    if args.tile is True and (args.incremental or args.coarse_scale > 1 or args.report_jfa) is True:
+        parser.error('--tile can not be used with --incremental, --coarse-scale or --report-jfa')
 
     # [DEBUG] Show arguments
     print(args)
@@ -63,17 +170,37 @@ def main(argv):
     error_rate = args.error_rate
     min_area = args.min_area
     is_gaussian_blur = args.enable_gaussian_blur
+    error_engine = args.error_engine
     iteration = args.iter
+    backend = args.voronoi_backend
+    tolerance = args.tolerance
+    convergence = args.convergence
     is_average_plot = args.plot_average
     is_centroidal_plot = args.plot_centroidal
     is_plot_mosaic_edge = args.plot_mosaic_edge
     is_bold_edge = args.bold_edge
+    edge_width = args.edge_width
     is_enable_gamma_correction = args.enable_gamma_correction
     gamma = args.gamma
     rgb = args.rgb
+    is_tiled = args.tile
+    memory_budget = args.memory_budget << 20
+    tile_halo = args.tile_halo
+    spill_dir = args.spill_dir
+    is_cache_stats = args.cache_stats
+    batch_sources = args.batch
+    output_dir = args.output_dir
+    output_ext = args.output_ext
+    jobs = args.jobs
+    threads = args.threads
+    report = args.report
+    is_video = args.video
+    change_threshold = args.change_threshold
+    change_block = args.change_block
+    fourcc = args.fourcc
 
-    # Check the existence of the image file
-    if os.path.isfile(imgfile) is False:
+    # Check the existence of the image file, image sequences are patterns
+    if batch_sources is None and is_video is False and os.path.isfile(imgfile) is False:
         raise FileNotFoundError('File \'%s\' does not exist' % imgfile)
 
     # If no one plot method is selected
@@ -82,48 +209,60 @@ def main(argv):
         print('Type -h or --help for more information')
         sys.exit()
 
-    # Load image and store as array (convert to RGB)
-    img = cv2.imread(imgfile)
-    img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-
-    # Apply gaussian blur
-    if is_gaussian_blur is True:
-        img = cv2.GaussianBlur(img, (5, 5), 0)
-
-    # Compute regional quadrature tree
-    quad_root = Quad(img, min_area=min_area,
-                     error_rate=error_rate, is_root=True)
-
-    # Generate seeds
-    points_x, points_y = quad_root.generate_seeds()
-
-    # Generate voronoi diagram
-    height = img.shape[0]
-    width = img.shape[1]
-    dic = generate_voronoi_diagram(
-        width, height, points_x, points_y, iteration=iteration)
-
-    # Gamma adjustment
-    if is_enable_gamma_correction is True:
-        img = adjust_gamma(img, gamma)
-
-    # Plot pixel
-    if is_average_plot is True:
-        img = average_plot(img, points_x, points_y, dic)
-    elif is_centroidal_plot is True:
-        img = centroidal_plot(img, points_x, points_y, dic)
-    else:
-        print('Warning: No drawing mehtod is selected, please choose one and restart this program')
-        print('Type -h or --help for more information')
-        sys.exit()
+    # Process the image tile by tile
+    if is_tiled is True:
+        from tile.tile import tiled_mosaic
+        tiled_mosaic(imgfile, output_file, memory_budget=memory_budget, halo=tile_halo, spill_dir=spill_dir,
+            min_area=min_area, error_rate=error_rate, error_engine=error_engine, gaussian_blur=is_gaussian_blur,
+            iteration=iteration, backend=backend,
+            tolerance=tolerance, convergence=convergence, centroidal=is_centroidal_plot,
+            plot_edge=is_plot_mosaic_edge, rgb=rgb, bold_edge=is_bold_edge, edge_width=edge_width,
+            gamma=gamma if is_enable_gamma_correction is True else None)
+        print('Done!')
+        return
+
+    # Seeds, voronoi diagram and rendering in this process, strips are encoded as they are rendered
+    # The backend is reported once, not for every image of a batch
+    pipeline = create_pipeline(args, report_backend=batch_sources is None)
+    cache = pipeline.cache
+
+    # Process many images with a pool of workers, failing images do not stop the others
+    if batch_sources is not None:
+        from batch.batch import collect_inputs, plan_outputs, run_batch
+        filenames = collect_inputs(batch_sources)
+        os.makedirs(output_dir, exist_ok=True)
+        results = run_batch(pipeline, filenames, plan_outputs(filenames, output_dir, output_ext),
+            jobs=jobs, threads=threads,
+            report=report if report is not None else os.path.join(output_dir, 'report.jsonl'))
+        failures = [result for result in results if result['ok'] is False]
+        print('Batch : %d done, %d failed' % (len(results) - len(failures), len(failures)))
+        if cache is not None and is_cache_stats is True:
+            print(cache.statistics())
+        if len(failures) > 0:
+            sys.exit(1)
+        print('Done!')
+        return
+
+    # Warm-start every frame from the previous one, frames stop iterating once seeds are still
+    if is_video is True:
+        from video.video import video_mosaic
+        if tolerance is None:
+            count = video_mosaic(imgfile, output_file, pipeline, block=change_block,
+                change_threshold=change_threshold, fourcc=fourcc)
+        else:
+            count = video_mosaic(imgfile, output_file, pipeline, block=change_block,
+                change_threshold=change_threshold, tolerance=tolerance, convergence=convergence,
+                fourcc=fourcc)
+        print('Frames : %d' % count)
+        print('Done!')
+        return
 
-    # Plot mosaic edge
-    if is_plot_mosaic_edge is True:
-        img = plot_mosaic_edge(img, points_x, points_y,
-                               dic, rgb=rgb, bold_edge=is_bold_edge)
+    # Turn the single image into a mosaic
+    from pipeline.pipeline import load_image
+    pipeline.run_to_file(load_image(imgfile), output_file)
 
-    # Output image
-    save_img(img, filename=output_file)
+    if cache is not None and is_cache_stats is True:
+        print(cache.statistics())
 
     # Show done message
     print('Done!')
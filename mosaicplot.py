@@ -14,41 +14,60 @@ __version__   = "1.0.0"
 import argparse
 import sys
 import os.path
-import pickle
 import numpy as np
 # import matplotlib.pyplot as plt
 import cv2
-from plot.plot import save_img, average_plot, centroidal_plot, plot_mosaic_edge, adjust_gamma
+from voronoi.labels import dic_to_labels
+from plot.plot import render_to_sink
+from plot.writer import create_writer
+from container.container import Container, is_container, load_pickle, load_reference_image
 
-def load_vordig(filename):
+def load_vordig(filename, allow_pickle = False):
     """Load Voronoi diagram
 
     Keyword arguments:
-    filename -- pickle file containing seeds data
+    filename     -- container file containing voronoi diagram data
+    allow_pickle -- load pickle files of former versions, only for trusted files (default : False)
 
     Return:
     img      -- raw input image
     points_x -- collections of x position of seeds in one-dimension array
     points_y -- collections of y position of seeds in one-dimension array
-    dic      -- a dictionary contaning cell points -> pixel data
+    labels   -- two-dimensions array, index of the seed owning every pixel
 
     Exceptions:
-    FileNotFoundError -- if argument 'filename' file does not exist 
+    FileNotFoundError -- if argument 'filename' file or the image it refers to does not exist 
+    ValueError        -- if the file is a pickle and argument 'allow_pickle' is False, 
+                         or if the image changed since the seeds were generated
     """
     # Check existence of files
     if os.path.isfile(filename) is False:
         raise FileNotFoundError('File \'%s\' does not exist' %filename )
 
-    # Load seeds data
-    with open(filename, 'rb') as f:
-        data = pickle.load(f)
-        
-    points_x = data['x']
-    points_y = data['y']
-    img = data['img']
-    dic = data['dict']
-
-    return img, points_x, points_y, dic
+    # Files written by former versions are pickles storing the image
+    if is_container(filename) is False:
+        data = load_pickle(filename, allow_pickle)
+        points_x = data['x']
+        points_y = data['y']
+        img = data['img']
+        # Even older files store a dictionary of cells
+        if 'labels' in data:
+            labels = data['labels']
+        else:
+            labels = dic_to_labels(data['dict'], img.shape[1], img.shape[0])
+        return img, points_x, points_y, labels
+
+    # Load voronoi diagram data, the image is read back from its file
+    with Container(filename) as container:
+        points_x = container.array('x')
+        points_y = container.array('y')
+        labels = container.array('labels')
+        if 'image' in container.meta:
+            img = load_reference_image(container.meta['image'])
+        else:
+            img = container.array('img')
+
+    return img, points_x, points_y, labels
 
 def main(argv):
     """The entry for this program.
@@ -58,7 +77,8 @@ def main(argv):
     """
     # Arguments parsing
     parser = argparse.ArgumentParser(description='mosaic polt program')
-    parser.add_argument("-input", "--input-vordig-file", default='vordig.pickle', type=str, help="input voronoi diagram pickle file (default : vordig.pickle) ")
+    parser.add_argument("-input", "--input-vordig-file", default='vordig.npz', type=str, help="input voronoi diagram container file (default : vordig.npz) ")
+    parser.add_argument("--allow-pickle", action="store_true", help="Load a voronoi diagram pickle file of a former version, only for trusted files")
     parser.add_argument("-o", "--output-file", default='output.jpg', type=str, help="output image file (default : output.jpg) ")
     group = parser.add_mutually_exclusive_group()
     group.add_argument("-pc", "--plot-centroidal", default=False, action="store_true", help="Use centroidal point as the color of the cell")
@@ -66,6 +86,7 @@ def main(argv):
     group = parser.add_argument_group(title='mosaic edge options')
     group.add_argument("-pme", "--plot-mosaic-edge", default=False, action="store_true", help="Plot edge for all cells")
     group.add_argument("--bold-edge", default=False, action="store_true", help="Plot edge with bold line style")
+    group.add_argument("--edge-width", default=1, type=int, help="Width of edges in pixels (default : 1)")
     group.add_argument("-rgb", type=int, nargs=3, default=[0, 0, 0], help="Set rgb for edge (default : [0, 0, 0])")
     group.add_argument("--enable-gamma-correction", default=False, action="store_true", help="Enable gamma correction to adjust image")
     group.add_argument("-gamma", type=float, default=1.0, help="Set gamma value (default : 1.0)")
@@ -81,9 +102,11 @@ def main(argv):
     is_centroidal_plot = args.plot_centroidal
     is_plot_mosaic_edge = args.plot_mosaic_edge
     is_bold_edge = args.bold_edge
+    edge_width = args.edge_width
     is_enable_gamma_correction = args.enable_gamma_correction
     gamma = args.gamma
     rgb = args.rgb
+    is_allow_pickle = args.allow_pickle
 
     # If no one plot method is selected
     if (is_average_plot or is_centroidal_plot) is False:
@@ -92,28 +115,13 @@ def main(argv):
         sys.exit()
 
     # Load data from voronoi diagram 
-    img, points_x, points_y, dic = load_vordig(vor_dig_data)
-
-    # Gamma adjustment
-    if is_enable_gamma_correction is True:
-        img = adjust_gamma(img, gamma)
-
-    # Plot pixel
-    if is_average_plot is True:
-        img = average_plot(img, points_x, points_y, dic)
-    elif is_centroidal_plot is True:
-        img = centroidal_plot(img, points_x, points_y, dic)
-    else:
-        print('Warning: No drawing mehtod is selected, please choose one and restart this program')
-        print('Type -h or --help for more information')
-        sys.exit()
-
-    # Plot mosaic edge
-    if is_plot_mosaic_edge is True:
-        img = plot_mosaic_edge(img, points_x, points_y, dic, rgb = rgb, bold_edge = is_bold_edge)
+    img, points_x, points_y, labels = load_vordig(vor_dig_data, is_allow_pickle)
 
-    # Output image
-    save_img(img, filename = output_filename)
+    # Color cells, adjust gamma and plot edges, strips are encoded as they are rendered
+    with create_writer(output_filename, labels.shape[1], labels.shape[0]) as sink:
+        render_to_sink(img, points_x, points_y, labels, sink, centroidal = is_centroidal_plot,
+            gamma = gamma if is_enable_gamma_correction is True else None,
+            plot_edge = is_plot_mosaic_edge, rgb = rgb, bold_edge = is_bold_edge, edge_width = edge_width)
 
     # Show done message
     print('Done!')
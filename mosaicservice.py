@@ -0,0 +1,71 @@
+# -*- coding:utf8 -*-
+'''
+    File name: mosaicservice.py
+    Author   : Jim00000
+    Created  : 10/18/2026
+'''
+
+__author__    = "Jim00000"
+__copyright__ = "Copyright 2017, the python-mosaic project"
+__license__   = "GNU General Public License v3.0"
+__version__   = "1.0.0"
+
+import argparse
+import asyncio
+import signal
+import sys
+from cache.options import DEFAULT_CACHE_DIR
+from service.service import MosaicService
+
+def __terminate__(signum, frame):
+    """Stop the service on SIGTERM like on Ctrl-C """
+    raise KeyboardInterrupt
+
+def main(argv):
+    # Arguments parsing
+    parser = argparse.ArgumentParser(description='Serve the mosaic effect over HTTP with warm workers')
+    parser.add_argument("--host", default="127.0.0.1", type=str,
+                        help="Address to listen on (default:127.0.0.1)")
+    parser.add_argument("--port", default=8080, type=int,
+                        help="TCP port to listen on (default:8080)")
+    parser.add_argument("--unix-socket", type=str,
+                        help="Listen on this Unix socket instead of host and port")
+    parser.add_argument("--jobs", type=int,
+                        help="Worker processes, jobs run at once (default: one per core)")
+    parser.add_argument("--threads", type=int,
+                        help="Threads of every job (default: cores left per worker)")
+    parser.add_argument("--queue-size", default=16, type=int,
+                        help="Jobs waiting for a worker, beyond it requests are answered 503 (default:16)")
+    parser.add_argument("--max-body", default=64, type=int,
+                        help="Size bound of an uploaded image in MB (default:64)")
+    parser.add_argument("--no-cache", default=False, action="store_true",
+                        help="Always compute seeds and the voronoi diagram, without the stage cache")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, type=str,
+                        help="Directory of the stage cache (default:%s)" %DEFAULT_CACHE_DIR)
+    parser.add_argument("--cache-size", default=1024, type=int,
+                        help="Size bound of the stage cache in MB (default:1024)")
+    args = parser.parse_args(argv[1:])
+
+    # Assign arguments
+    host = args.host
+    port = args.port
+    unix_socket = args.unix_socket
+    jobs = args.jobs
+    threads = args.threads
+    queue_size = args.queue_size
+    max_body = args.max_body << 20
+    is_no_cache = args.no_cache
+    cache_dir = args.cache_dir
+    cache_size = args.cache_size
+
+    service = MosaicService(jobs=jobs, threads=threads, queue_size=queue_size, max_body=max_body,
+        no_cache=is_no_cache, cache_dir=cache_dir, cache_size=cache_size)
+    signal.signal(signal.SIGTERM, __terminate__)
+    try:
+        asyncio.run(service.serve(host=host, port=port, unix_socket=unix_socket))
+    except KeyboardInterrupt:
+        print('Service : stopped')
+
+if __name__ == "__main__":
+    """main function """
+    main(sys.argv)
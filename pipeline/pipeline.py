@@ -0,0 +1,219 @@
+# -*- coding:utf8 -*-
+'''
+    File name: pipeline.py
+    Author   : Jim00000
+    Created  : 10/18/2026
+'''
+
+__author__    = "Jim00000"
+__copyright__ = "Copyright 2017, the python-mosaic project"
+__license__   = "GNU General Public License v3.0"
+__version__   = "1.0.0"
+
+import os.path
+import cv2
+from quad.quadtree import QuadTree
+from quad.integral import create_error_engine
+from quad.index import build_index, load_index, image_digest
+from plot.plot import render, render_to_sink
+from plot.writer import create_writer
+from cache.cache import cached_seeds, cached_voronoi_diagram
+
+class MosaicPipeline:
+
+    def __init__(self, min_area = 64, error_rate = 0.5, error_engine = 'slice', gaussian_blur = False,
+            index_file = None, index_min_area = 4,
+            iteration = 5, backend = 'auto', report_jfa = False, tolerance = None, convergence = 'max',
+            incremental = False, revisit_moved = False, coarse_scale = 1, fine_iteration = 1,
+            centroidal = False, plot_edge = False, rgb = [0, 0, 0], bold_edge = False, edge_width = 1,
+            gamma = None, cache = None, report_backend = False):
+        """Seeds, Voronoi diagram and rendering in one process, arrays stay in memory
+        between stages. Arguments are the ones of the command line programs.
+
+        Keyword arguments:
+        min_area       -- minimal pixels for each block (default : 64)
+        error_rate     -- error rate (default : 0.5)
+        error_engine   -- name of the error engine (default : 'slice')
+        gaussian_blur  -- apply the 5x5 gaussian blur to the input (default : False)
+        index_file     -- quadtree index file, reused by later runs with other
+                          thresholds (default : None, no index)
+        index_min_area -- minimal pixels for each block of the index (default : 4)
+        iteration      -- iteration of Lloyd's algorithm (default : 5)
+        backend        -- one of BACKENDS (default : 'auto')
+        report_jfa     -- report pixels the jfa backend assigns to a seed other than the nearest one (default : False)
+        tolerance      -- stop iterating once the seed displacement is not above it (default : None)
+        convergence    -- one of CONVERGENCE (default : 'max')
+        incremental    -- reassign pixels among Delaunay neighbors after the first iteration (default : False)
+        revisit_moved  -- with incremental, revisit only pixels near seeds that moved (default : False)
+        coarse_scale   -- run the first iterations on the image downsampled by this factor (default : 1)
+        fine_iteration -- with coarse_scale, iterations at full resolution (default : 1)
+        centroidal     -- use the color at the seed instead of the average color (default : False)
+        plot_edge      -- plot edges of cells (default : False)
+        rgb            -- color of edges (default : [0, 0, 0])
+        bold_edge      -- plot edges with bold line style (default : False)
+        edge_width     -- width of edges in pixels (default : 1)
+        gamma          -- gamma value, None for no gamma correction (default : None)
+        cache          -- the StageCache, None to always compute (default : None)
+        report_backend -- print the Voronoi backend of every diagram computed (default : False)
+        """
+        self.min_area = min_area
+        self.error_rate = error_rate
+        self.error_engine = error_engine
+        self.gaussian_blur = gaussian_blur
+        self.index_file = index_file
+        self.index_min_area = min(index_min_area, min_area)
+        self.iteration = iteration
+        self.backend = backend
+        self.report_jfa = report_jfa
+        self.tolerance = tolerance
+        self.convergence = convergence
+        self.incremental = incremental
+        self.revisit_moved = revisit_moved
+        self.coarse_scale = coarse_scale
+        self.fine_iteration = fine_iteration
+        self.centroidal = centroidal
+        self.plot_edge = plot_edge
+        self.rgb = rgb
+        self.bold_edge = bold_edge
+        self.edge_width = edge_width
+        self.gamma = gamma
+        self.cache = cache
+        self.report_backend = report_backend
+
+    def prepare(self, img):
+        """Get the image the stages work on, blurred if gaussian_blur is set
+
+        Keyword arguments:
+        img -- three-dimensions array represents rgb of an image
+
+        Return:
+        img -- three-dimensions array represents rgb of an image
+        """
+        if self.gaussian_blur is True:
+            img = cv2.GaussianBlur(img, (5, 5), 0)
+        return img
+
+    def seeds(self, img):
+        """Generate seeds of a prepared image, from the quadtree or its index
+
+        Keyword arguments:
+        img -- three-dimensions array given by prepare
+
+        Return:
+        point_x -- collections of x position of seeds in one-dimension array
+        point_y -- collections of y position of seeds in one-dimension array
+        """
+        def generate():
+            if self.index_file is None:
+                engine = create_error_engine(self.error_engine, img, min_area = self.min_area)
+                tree = QuadTree(img, min_area = self.min_area, error_rate = self.error_rate, error_engine = engine)
+                return tree.generate_seeds()
+
+            # Reuse the index if it is built from the same image and engine
+            index = None
+            if os.path.isfile(self.index_file) is True:
+                index = load_index(self.index_file)
+                if (index.digest != image_digest(img) or index.engine != self.error_engine or
+                    index.min_area > self.min_area):
+                    index = None
+            if index is None:
+                engine = create_error_engine(self.error_engine, img, min_area = self.index_min_area)
+                index = build_index(img, min_area = self.index_min_area, error_engine = engine, engine = self.error_engine)
+                index.save(self.index_file)
+            return index.cut(error_rate = self.error_rate, min_area = self.min_area)
+
+        return cached_seeds(self.cache, img, generate, min_area = self.min_area, error_rate = self.error_rate,
+            error_engine = self.error_engine)
+
+    def voronoi(self, width, height, point_x, point_y):
+        """Relax seeds with Lloyd's algorithm, seeds are updated in place
+
+        Keyword arguments:
+        width   -- width of input image
+        height  -- height of input image
+        point_x -- collections of x position of seeds in one-dimension array
+        point_y -- collections of y position of seeds in one-dimension array
+
+        Return:
+        labels -- two-dimensions int32 array, index of the seed owning every pixel
+        """
+        return cached_voronoi_diagram(self.cache, width, height, point_x, point_y, iteration = self.iteration,
+            backend = self.backend, report_jfa = self.report_jfa, tolerance = self.tolerance,
+            convergence = self.convergence, incremental = self.incremental, revisit_moved = self.revisit_moved,
+            coarse_scale = self.coarse_scale, fine_iteration = self.fine_iteration,
+            report_backend = self.report_backend)
+
+    def labels(self, img, progress = None):
+        """Run the seed and Voronoi stages
+
+        Keyword arguments:
+        img      -- three-dimensions array represents rgb of an image
+        progress -- function (percent) called after every stage (default : None)
+
+        Return:
+        img     -- the prepared image
+        point_x -- collections of x position of seeds in one-dimension array
+        point_y -- collections of y position of seeds in one-dimension array
+        labels  -- two-dimensions int32 array, index of the seed owning every pixel
+        """
+        img = self.prepare(img)
+        point_x, point_y = self.seeds(img)
+        if progress is not None:
+            progress(34)
+        labels = self.voronoi(img.shape[1], img.shape[0], point_x, point_y)
+        if progress is not None:
+            progress(67)
+        return img, point_x, point_y, labels
+
+    def run(self, img, progress = None):
+        """Turn an image into a mosaic
+
+        Keyword arguments:
+        img      -- three-dimensions array represents rgb of an image
+        progress -- function (percent) called after every stage (default : None)
+
+        Return:
+        output -- three-dimensions uint8 array represents rgb of the mosaic
+        """
+        img, point_x, point_y, labels = self.labels(img, progress)
+        output = render(img, point_x, point_y, labels, centroidal = self.centroidal, gamma = self.gamma,
+            plot_edge = self.plot_edge, rgb = self.rgb, bold_edge = self.bold_edge, edge_width = self.edge_width,
+            bgr = False)
+        if progress is not None:
+            progress(100)
+        return output
+
+    def run_to_file(self, img, filename, progress = None):
+        """Turn an image into a mosaic written strip by strip into a file
+
+        Keyword arguments:
+        img      -- three-dimensions array represents rgb of an image
+        filename -- the output file
+        progress -- function (percent) called after every stage (default : None)
+        """
+        img, point_x, point_y, labels = self.labels(img, progress)
+        with create_writer(filename, labels.shape[1], labels.shape[0]) as sink:
+            render_to_sink(img, point_x, point_y, labels, sink, centroidal = self.centroidal, gamma = self.gamma,
+                plot_edge = self.plot_edge, rgb = self.rgb, bold_edge = self.bold_edge, edge_width = self.edge_width)
+        if progress is not None:
+            progress(100)
+
+def load_image(filename):
+    """Load an image file as an RGB array
+
+    Keyword arguments:
+    filename -- the image file
+
+    Return:
+    img -- three-dimensions array represents rgb of an image
+
+    Exceptions:
+    FileNotFoundError -- if argument 'filename' file does not exist
+    ValueError        -- if OpenCV can not decode the file
+    """
+    if os.path.isfile(filename) is False:
+        raise FileNotFoundError('File \'%s\' does not exist' %filename )
+    img = cv2.imread(filename)
+    if img is None:
+        raise ValueError('File \'%s\' is not an image OpenCV can read' %filename )
+    return cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
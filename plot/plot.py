@@ -10,22 +10,131 @@ __copyright__ = "Copyright 2017, the python-mosaic project"
 __license__   = "GNU General Public License v3.0"
 __version__   = "1.0.0"
 
+import functools
 import numpy as np
 import cv2
 
-def save_img(img, filename='output.jpg'):
+# Rows rendered at once when streaming to a writer
+STRIP_ROWS = 256
+
+def save_img(img, filename='output.jpg', bgr=False):
     """Save image
 
     Keyword arguments:
     img      -- the image 
     filename -- file name that will be saved
+    bgr      -- True if the image is already in BGR order, like render gives (default : False)
     """
     # Convert to BGR format
-    output_img = cv2.cvtColor(img, cv2.COLOR_RGB2BGR)
+    output_img = img if bgr is True else cv2.cvtColor(img, cv2.COLOR_RGB2BGR)
     # Save image
     cv2.imwrite(filename, output_img)
 
-def average_plot(img, points_x, points_y, dic):
+def render(img, points_x, points_y, labels, centroidal = False, gamma = None, plot_edge = False,
+        rgb = [0, 0, 0], bold_edge = False, edge_width = 1, mask = None, bgr = True, out = None):
+    """Color cells, adjust gamma and plot edges in one output buffer.
+    Gamma is applied through the lookup table to cell colors, or to the pixel
+    values summed per cell, never to a copy of the image. It gives the same
+    image as adjust_gamma, then average_plot or centroidal_plot, then
+    plot_mosaic_edge, with a single full-size buffer.
+
+    Keyword arguments:
+    img        -- input image
+    points_x   -- collections of x position of seeds in one-dimension array
+    points_y   -- collections of y position of seeds in one-dimension array
+    labels     -- two-dimensions array, index of the seed owning every pixel
+    centroidal -- use the color of the seed instead of the average color (default : False)
+    gamma      -- gamma value, or None to leave colors as they are (default : None)
+    plot_edge  -- plot edge for all cells (default : False)
+    rgb        -- color of edges (default : rgb(0, 0, 0) black )
+    bold_edge  -- plot edge with bold line style (default : False)
+    edge_width -- width of edges in pixels (default : 1)
+    mask       -- edge mask computed by edge_mask (default : None, computed from labels)
+    bgr        -- write the output in BGR order, ready for save_img (default : True)
+    out        -- uint8 image buffer receiving the output, may be img (default : None, a new one)
+
+    Return:
+    output_img -- image that has been colored
+    """
+    colors = cell_colors(img, points_x, points_y, labels, centroidal, gamma)
+    if bgr is True:
+        colors = colors[:, ::-1]
+        rgb = rgb[::-1]
+
+    out = fill_cells(colors, labels, out)
+    if plot_edge is True:
+        if mask is None:
+            mask = edge_mask(labels, bold_edge, edge_width)
+        out[mask] = rgb
+    return out
+
+def render_to_sink(img, points_x, points_y, labels, sink, centroidal = False, gamma = None, plot_edge = False,
+        rgb = [0, 0, 0], bold_edge = False, edge_width = 1, strip_rows = STRIP_ROWS):
+    """Render like render does, but emit the output to a writer as BGR strips.
+    Only a few strips are held at once, and the writer encodes a strip while
+    the next one is rendered.
+
+    Keyword arguments:
+    img        -- input image
+    points_x   -- collections of x position of seeds in one-dimension array
+    points_y   -- collections of y position of seeds in one-dimension array
+    labels     -- two-dimensions array, index of the seed owning every pixel
+    sink       -- writer receiving BGR strips, e.g. from create_writer
+    centroidal -- use the color of the seed instead of the average color (default : False)
+    gamma      -- gamma value, or None to leave colors as they are (default : None)
+    plot_edge  -- plot edge for all cells (default : False)
+    rgb        -- color of edges (default : rgb(0, 0, 0) black )
+    bold_edge  -- plot edge with bold line style (default : False)
+    edge_width -- width of edges in pixels (default : 1)
+    strip_rows -- rows of every strip (default : STRIP_ROWS)
+    """
+    colors = cell_colors(img, points_x, points_y, labels, centroidal, gamma)
+    paint_strips(colors[:, ::-1], labels, sink, plot_edge, rgb[::-1], bold_edge, edge_width, strip_rows)
+
+def paint_strips(colors, labels, sink, plot_edge = False, rgb = [0, 0, 0], bold_edge = False, edge_width = 1,
+        strip_rows = STRIP_ROWS):
+    """Fill cells and plot edges strip by strip into a writer
+
+    Keyword arguments:
+    colors     -- two-dimensions uint8 array, color of every cell in the order of the writer
+    labels     -- two-dimensions array or memory map, index of the seed owning every pixel
+    sink       -- writer receiving strips
+    plot_edge  -- plot edge for all cells (default : False)
+    rgb        -- color of edges in the order of the writer (default : (0, 0, 0) black )
+    bold_edge  -- plot edge with bold line style (default : False)
+    edge_width -- width of edges in pixels (default : 1)
+    strip_rows -- rows of every strip (default : STRIP_ROWS)
+    """
+    height = labels.shape[0]
+    width = labels.shape[1]
+    buffer = np.empty((min(strip_rows, height), width, colors.shape[1]), dtype=np.uint8)
+    for y0 in range(0, height, strip_rows):
+        y1 = min(height, y0 + strip_rows)
+        strip = fill_cells(colors, np.asarray(labels[y0:y1]), buffer[:y1 - y0])
+        if plot_edge is True:
+            strip[window_edge_mask(labels, 0, y0, width, y1, bold_edge, edge_width)] = rgb
+        sink.write(strip)
+
+def cell_colors(img, points_x, points_y, labels, centroidal = False, gamma = None):
+    """Get the color of every cell in RGB order
+
+    Keyword arguments:
+    img        -- input image
+    points_x   -- collections of x position of seeds in one-dimension array
+    points_y   -- collections of y position of seeds in one-dimension array
+    labels     -- two-dimensions array, index of the seed owning every pixel
+    centroidal -- use the color of the seed instead of the average color (default : False)
+    gamma      -- gamma value, or None to leave colors as they are (default : None)
+
+    Return:
+    colors -- two-dimensions uint8 array, color of every cell
+    """
+    table = None if gamma is None else gamma_table(gamma)
+    if centroidal is True:
+        return centroidal_colors(img, points_x, points_y, table)
+    return average_colors(img, labels, points_x.size, table)
+
+def average_plot(img, points_x, points_y, labels, out = None):
     """ Draw pixel in input image using following method.
     Take the cell and compute average rgb values for every pixel
 
@@ -33,48 +142,16 @@ def average_plot(img, points_x, points_y, dic):
     img      -- input image
     points_x -- collections of x position of seeds in one-dimension array
     points_y -- collections of y position of seeds in one-dimension array
-    dic      -- a dictionary contaning cell points -> pixel data
+    labels   -- two-dimensions array, index of the seed owning every pixel
+    out      -- uint8 image buffer receiving the output, may be img (default : None, a new one)
 
     Return:
     output_img -- image that has been colored
     """
-    # Create an image buffer 
-    output_img = np.full(img.size, 255).reshape(img.shape).astype(np.uint8)
-
-    # For every cell
-    for i in range(points_x.size):
-        x = int(round(points_x[i]))
-        y = int(round(points_y[i]))
-        data = dic[i][:,1:]
-        # Retrieve rbg value of raw image
-        r = int(img[y,x,0])
-        g = int(img[y,x,1])
-        b = int(img[y,x,2])
-
-        # For every pixel in the cell
-        for j in range(data[0].size):
-            tx = data[0][j]
-            ty = data[1][j]
-            r += img[ty,tx,0]
-            g += img[ty,tx,1]
-            b += img[ty,tx,2]
-
-        # Compute average rgb value    
-        r /= (data[0].size + 1)
-        g /= (data[0].size + 1)
-        b /= (data[0].size + 1)
-        
-        # Copy rbg value to centroidal point
-        output_img[y, x, :] = np.array([r, g, b])
-        # Copy rbg value to every pixel
-        for j in range(data[0].size):
-            tx = data[0][j]
-            ty = data[1][j]
-            output_img[ty, tx, :] = np.array([r, g, b])
-        
-    return output_img
-
-def centroidal_plot(img, points_x, points_y, dic):
+    colors = average_colors(img, labels, points_x.size)
+    return fill_cells(colors, labels, out)
+
+def centroidal_plot(img, points_x, points_y, labels, out = None):
     """ Draw pixel in input image using following method.
     Take rgb values of centroidal point and fill to other pixels inside the cell
 
@@ -82,86 +159,194 @@ def centroidal_plot(img, points_x, points_y, dic):
     img      -- input image
     points_x -- collections of x position of seeds in one-dimension array
     points_y -- collections of y position of seeds in one-dimension array
-    dic      -- a dictionary contaning cell points -> pixel data
+    labels   -- two-dimensions array, index of the seed owning every pixel
+    out      -- uint8 image buffer receiving the output, may be img (default : None, a new one)
 
     Return:
     output_img -- image that has been colored
     """
-    # Create an image buffer 
-    output_img = np.full(img.size, 255).reshape(img.shape).astype(np.uint8)
-
-    # For every cell
-    for i in range(points_x.size):
-        x = int(round(points_x[i]))
-        y = int(round(points_y[i]))
-        data = dic[i][:,1:]
-        r = int(img[y,x,0])
-        g = int(img[y,x,1])
-        b = int(img[y,x,2])
-
-        # Copy rbg of the centroidal point to output image
-        output_img[y,x,:] = img[y,x,:]
-        
-        # Copy rbg to other pixels inside the cell
-        for j in range(data[0].size):
-            tx = data[0][j]
-            ty = data[1][j]
-            output_img[ty, tx, :] = img[y,x,:]
-        
-    return output_img
-
-def plot_mosaic_edge(img, points_x, points_y, dic, rgb = [0, 0, 0], bold_edge = False):
-    """Plot edges of every cell
+    colors = centroidal_colors(img, points_x, points_y)
+    return fill_cells(colors, labels, out)
+
+def cell_sums(img, labels, size, table = None):
+    """Count pixels and sum their channels per cell, pixels owned by no seed are left out
+
+    Keyword arguments:
+    img    -- input image
+    labels -- two-dimensions array, index of the seed owning every pixel
+    size   -- seed points size
+    table  -- lookup table applied to pixel values before summing them (default : None)
+
+    Return:
+    counts -- one-dimension array, pixels of every cell
+    sums   -- two-dimensions float64 array, channel sums of every cell
+    """
+    height = labels.shape[0]
+    width = labels.shape[1]
+    counts = np.zeros(size, dtype=np.int64)
+    sums = np.zeros((size, img.shape[2]), dtype=np.float64)
+    # Sum strips of rows, so temporaries stay small whatever the image size
+    rows = max(1, STRIP_ROWS * 1024 // max(1, width))
+    for y0 in range(0, height, rows):
+        flat = np.asarray(labels[y0:y0 + rows]).ravel()
+        owned = None
+        # Leave out pixels owned by no seed
+        if flat.size > 0 and flat.min() < 0:
+            owned = flat >= 0
+            flat = flat[owned]
+        counts += np.bincount(flat, minlength=size)
+        for c in range(img.shape[2]):
+            channel = img[y0:y0 + rows, :, c]
+            if table is not None:
+                channel = cv2.LUT(channel, table)
+            values = channel.ravel()
+            if owned is not None:
+                values = values[owned]
+            sums[:, c] += np.bincount(flat, weights=values, minlength=size)
+    return counts, sums
+
+def average_colors(img, labels, size, table = None):
+    """Get the average color of every cell, black for a cell containing nothing
+
+    Keyword arguments:
+    img    -- input image
+    labels -- two-dimensions array, index of the seed owning every pixel
+    size   -- seed points size
+    table  -- lookup table applied to pixel values before averaging them (default : None)
+
+    Return:
+    colors -- two-dimensions uint8 array, color of every cell
+    """
+    counts, sums = cell_sums(img, labels, size, table)
+    return (sums / np.maximum(counts, 1)[:, np.newaxis]).astype(np.uint8)
+
+def centroidal_colors(img, points_x, points_y, table = None):
+    """Get the color of the pixel under every seed
 
     Keyword arguments:
     img      -- input image
     points_x -- collections of x position of seeds in one-dimension array
     points_y -- collections of y position of seeds in one-dimension array
-    dic      -- a dictionary contaning cell points -> pixel data
-    rgb      -- color of edges (default : rgb(0, 0, 0) black )
+    table    -- lookup table applied to the colors (default : None)
+
+    Return:
+    colors -- two-dimensions uint8 array, color of every cell
+    """
+    x = np.round(points_x).astype(np.int64)
+    y = np.round(points_y).astype(np.int64)
+    colors = img[y, x]
+    if table is not None:
+        colors = table[colors]
+    return colors
+
+def fill_cells(colors, labels, out = None):
+    """Color every pixel with the color of its cell, white if no seed owns it
+
+    Keyword arguments:
+    colors -- two-dimensions uint8 array, color of every cell
+    labels -- two-dimensions array, index of the seed owning every pixel
+    out    -- uint8 image buffer receiving the output (default : None, a new one)
+
+    Return:
+    output_img -- image that has been colored
+
+    Exceptions:
+    ValueError -- if out does not match the label map
+    """
+    shape = labels.shape + (colors.shape[1],)
+    if out is None:
+        out = np.empty(shape, dtype=np.uint8)
+    elif out.shape != shape or out.dtype != np.uint8:
+        raise ValueError('Expect a %s uint8 buffer, got %s %s' %(shape, out.shape, out.dtype) )
+
+    # Label -1 picks the first row
+    table = np.empty((colors.shape[0] + 1, colors.shape[1]), dtype=np.uint8)
+    table[0] = 255
+    table[1:] = colors
+    np.take(table, labels + 1, axis=0, out=out, mode='clip')
+    return out
+
+def plot_mosaic_edge(img, points_x, points_y, labels, rgb = [0, 0, 0], bold_edge = False, edge_width = 1,
+        mask = None, out = None):
+    """Plot edges of every cell
+
+    Keyword arguments:
+    img        -- input image
+    points_x   -- collections of x position of seeds in one-dimension array
+    points_y   -- collections of y position of seeds in one-dimension array
+    labels     -- two-dimensions array, index of the seed owning every pixel
+    rgb        -- color of edges (default : rgb(0, 0, 0) black )
+    bold_edge  -- plot edge with bold line style (default : False)
+    edge_width -- width of edges in pixels (default : 1)
+    mask       -- edge mask computed by edge_mask, to plot the same edges with
+                  other colors (default : None, computed from labels)
+    out        -- uint8 image buffer receiving the output, may be img (default : None, a new one)
 
     Return:
     output_img -- image that has been colored edges
     """
-    # Clone image
-    output_img = np.copy(img)
-
-    # For every cell
-    for i in range(points_x.size):
-        data = dic[i][:,1:]
-        pix_dic = {}
-        
-        # Put pixels which belongs to a cell into dic
-        for j in range(data[0].size):
-            x = data[0][j]
-            y = data[1][j]
-            pix_dic[(y, x)] = True
-
-        # For every pixel, check whether neighbor pixels exist
-        # Plot the edge if the candidate pixel has neighbor pixels (In my way,
-        # check upper pixel, lower pixel, left pixel and right pixel) 
-        # being close to the candidate pixel
-        for j in range(data[0].size): 
-            x = data[0][j]
-            y = data[1][j]
-            if bold_edge is True:
-                is_not_edge = ( 
-                    (y - 1,x) in pix_dic and  
-                    (y,x - 1) in pix_dic and 
-                    (y + 1,x) in pix_dic and 
-                    (y,x + 1) in pix_dic 
-                    )
-            else:
-                is_not_edge = (
-                    (y + 1,x) in pix_dic and 
-                    (y,x + 1) in pix_dic 
-                    )
-
-            # Check edge    
-            if is_not_edge is False:
-                output_img[y,x,:] = np.array(rgb)
-    
-    return output_img
+    if mask is None:
+        mask = edge_mask(labels, bold_edge, edge_width)
+    if out is None:
+        out = np.copy(img)
+    elif out is not img:
+        out[:] = img
+    out[mask] = rgb
+    return out
+
+def edge_mask(labels, bold_edge = False, edge_width = 1):
+    """Find edges of every cell.
+    A pixel is on an edge when its lower or right neighbor, and with bold_edge
+    also its upper or left neighbor, belongs to another cell or lies outside
+    of the image. Pixels owned by no seed are never on an edge.
+
+    Keyword arguments:
+    labels     -- two-dimensions array, index of the seed owning every pixel
+    bold_edge  -- compare the four neighbors instead of two (default : False)
+    edge_width -- width of edges in pixels, edges are dilated by a square of
+                  this side (default : 1)
+
+    Return:
+    mask -- two-dimensions boolean array, True on edges
+    """
+    if edge_width < 1:
+        raise ValueError('Edge width must be positive, got %d' %edge_width )
+
+    # Pixels outside of the image belong to no cell
+    around = np.pad(labels, 1, mode='constant', constant_values=-1)
+    mask = (around[2:, 1:-1] != labels) | (around[1:-1, 2:] != labels)
+    if bold_edge is True:
+        mask |= (around[:-2, 1:-1] != labels) | (around[1:-1, :-2] != labels)
+    mask &= labels >= 0
+
+    if edge_width > 1:
+        kernel = np.ones((edge_width, edge_width), dtype=np.uint8)
+        mask = cv2.dilate(mask.view(np.uint8), kernel).view(bool)
+    return mask
+
+def window_edge_mask(labels, x0, y0, x1, y1, bold_edge = False, edge_width = 1):
+    """Get the edge mask of a rectangle, the same as edge_mask gives for the whole
+    label map. Labels are read with a margin of edge_width pixels, so the false
+    edges along the margin never reach the rectangle.
+
+    Keyword arguments:
+    labels     -- two-dimensions array or memory map, index of the seed owning every pixel
+    x0, y0     -- upper-left corner of the rectangle
+    x1, y1     -- lower-right corner of the rectangle, exclusive
+    bold_edge  -- compare the four neighbors instead of two (default : False)
+    edge_width -- width of edges in pixels (default : 1)
+
+    Return:
+    mask -- two-dimensions boolean array of the rectangle, True on edges
+    """
+    height = labels.shape[0]
+    width = labels.shape[1]
+    mx0 = max(0, x0 - edge_width)
+    my0 = max(0, y0 - edge_width)
+    mx1 = min(width, x1 + edge_width)
+    my1 = min(height, y1 + edge_width)
+    mask = edge_mask(np.asarray(labels[my0:my1, mx0:mx1]), bold_edge, edge_width)
+    return mask[y0 - my0:y1 - my0, x0 - mx0:x1 - mx0]
 
 def adjust_gamma(img, gamma=1.0):
     """gamma adjustment
@@ -176,11 +361,21 @@ def adjust_gamma(img, gamma=1.0):
     References:
     See also https://www.pyimagesearch.com/2015/10/05/opencv-gamma-correction/
     """
-    # build a lookup table mapping the pixel values [0, 255] to
-    # their adjusted gamma values
-    invGamma = 1.0 / gamma
-    table = np.array([((i / 255.0) ** invGamma) * 255
-        for i in np.arange(0, 256)]).astype("uint8")
- 
     # apply gamma correction using the lookup table
-    return cv2.LUT(img, table)
\ No newline at end of file
+    return cv2.LUT(img, gamma_table(gamma))
+
+@functools.lru_cache(maxsize=16)
+def gamma_table(gamma):
+    """Get the lookup table mapping the pixel values [0, 255] to their adjusted
+    gamma values. Tables are cached and read-only.
+
+    Keyword arguments:
+    gamma -- the gamma value
+
+    Return:
+    table -- one-dimension uint8 array of 256 values
+    """
+    invGamma = 1.0 / gamma
+    table = (((np.arange(0, 256) / 255.0) ** invGamma) * 255).astype(np.uint8)
+    table.flags.writeable = False
+    return table
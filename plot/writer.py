@@ -0,0 +1,309 @@
+# -*- coding:utf8 -*-
+'''
+    File name: writer.py
+    Author   : Jim00000
+    Created  : 10/18/2026
+'''
+
+__author__    = "Jim00000"
+__copyright__ = "Copyright 2017, the python-mosaic project"
+__license__   = "GNU General Public License v3.0"
+__version__   = "1.0.0"
+
+import os.path
+import queue
+import struct
+import threading
+import zlib
+import numpy as np
+import cv2
+
+class StripWriter:
+
+    def __init__(self, filename, width, height, bgr = True):
+        """Write an image as horizontal strips, from the top row to the bottom one.
+        Writers are context managers, the file is complete once they are closed.
+
+        Keyword arguments:
+        filename -- the output file
+        width    -- width of the image
+        height   -- height of the image
+        bgr      -- True if strips are given in BGR order, like render gives (default : True)
+        """
+        self.filename = filename
+        self.width = width
+        self.height = height
+        self.bgr = bgr
+        self.row = 0
+
+    def write(self, strip):
+        """Write the next rows
+
+        Keyword arguments:
+        strip -- three-dimensions uint8 array of rows x width x 3
+
+        Exceptions:
+        ValueError -- if the strip does not fit the image
+        """
+        if strip.ndim != 3 or strip.shape[1] != self.width or strip.shape[2] != 3:
+            raise ValueError('Expect a strip of rows x %d x 3, got %s' %(self.width, strip.shape) )
+        if self.row + strip.shape[0] > self.height:
+            raise ValueError('Strip goes beyond the %d rows of the image' %self.height )
+        self.write_rows(self.row, np.ascontiguousarray(strip))
+        self.row += strip.shape[0]
+
+    def write_rows(self, row, strip):
+        """Write rows starting at row, implemented by every writer """
+        raise NotImplementedError
+
+    def close(self):
+        """Complete the file
+
+        Exceptions:
+        ValueError -- if some rows were never written
+        """
+        if self.row != self.height:
+            raise ValueError('Only %d of %d rows were written' %(self.row, self.height) )
+
+    def rgb(self, strip):
+        """Get a strip in RGB order """
+        return strip[:, :, ::-1] if self.bgr is True else strip
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        # Keep the original exception, the file is incomplete anyway
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+        return False
+
+    def abort(self):
+        """Release the file without completing it """
+        pass
+
+class PNGWriter(StripWriter):
+
+    def __init__(self, filename, width, height, bgr = True, level = 6):
+        """Encode a PNG file strip by strip, every strip is compressed as it arrives.
+        Rows use the Sub filter, which turns flat cells into runs of zeros.
+
+        Keyword arguments:
+        filename -- the output file
+        width    -- width of the image
+        height   -- height of the image
+        bgr      -- True if strips are given in BGR order (default : True)
+        level    -- zlib compression level (default : 6)
+        """
+        super().__init__(filename, width, height, bgr)
+        self.file = open(filename, 'wb')
+        self.compressor = zlib.compressobj(level)
+        self.file.write(b'\x89PNG\r\n\x1a\n')
+        # 8 bits per channel, truecolor, no interlace
+        self.__chunk__(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0))
+
+    def write_rows(self, row, strip):
+        rgb = self.rgb(strip).reshape(strip.shape[0], -1)
+        rows = np.empty((rgb.shape[0], rgb.shape[1] + 1), dtype=np.uint8)
+        rows[:, 0] = 1
+        rows[:, 1:4] = rgb[:, :3]
+        np.subtract(rgb[:, 3:], rgb[:, :-3], out=rows[:, 4:])
+        data = self.compressor.compress(rows.tobytes())
+        if len(data) > 0:
+            self.__chunk__(b'IDAT', data)
+
+    def close(self):
+        super().close()
+        self.__chunk__(b'IDAT', self.compressor.flush())
+        self.__chunk__(b'IEND', b'')
+        self.file.close()
+
+    def abort(self):
+        self.file.close()
+
+    def __chunk__(self, kind, data):
+        """Write a chunk : length, type, data and CRC """
+        self.file.write(struct.pack('>I', len(data)))
+        self.file.write(kind)
+        self.file.write(data)
+        self.file.write(struct.pack('>I', zlib.crc32(data, zlib.crc32(kind)) & 0xffffffff))
+
+class PPMWriter(StripWriter):
+
+    def __init__(self, filename, width, height, bgr = True):
+        """Write a binary PPM (P6) file strip by strip
+
+        Keyword arguments:
+        filename -- the output file
+        width    -- width of the image
+        height   -- height of the image
+        bgr      -- True if strips are given in BGR order (default : True)
+        """
+        super().__init__(filename, width, height, bgr)
+        self.file = open(filename, 'wb')
+        self.file.write(b'P6\n%d %d\n255\n' %(width, height))
+
+    def write_rows(self, row, strip):
+        self.file.write(np.ascontiguousarray(self.rgb(strip)).tobytes())
+
+    def close(self):
+        super().close()
+        self.file.close()
+
+    def abort(self):
+        self.file.close()
+
+class NpyWriter(StripWriter):
+
+    def __init__(self, filename, width, height, bgr = True):
+        """Write strips into a memory mapped .npy file (height x width x 3, RGB)
+
+        Keyword arguments:
+        filename -- the output file
+        width    -- width of the image
+        height   -- height of the image
+        bgr      -- True if strips are given in BGR order (default : True)
+        """
+        super().__init__(filename, width, height, bgr)
+        self.output = np.lib.format.open_memmap(filename, mode='w+', dtype=np.uint8, shape=(height, width, 3))
+
+    def write_rows(self, row, strip):
+        self.output[row:row + strip.shape[0]] = self.rgb(strip)
+
+    def close(self):
+        super().close()
+        self.output.flush()
+        del self.output
+
+    def abort(self):
+        del self.output
+
+class ImageWriter(StripWriter):
+
+    def __init__(self, filename, width, height, bgr = True, spill_dir = None):
+        """Gather strips and encode them with OpenCV once closed.
+        OpenCV encoders need the whole image, so formats like JPEG are not
+        streamed, only the buffer is filled strip by strip.
+
+        Keyword arguments:
+        filename  -- the output file
+        width     -- width of the image
+        height    -- height of the image
+        bgr       -- True if strips are given in BGR order (default : True)
+        spill_dir -- directory receiving the buffer as a memory map (default : None, in memory)
+        """
+        super().__init__(filename, width, height, bgr)
+        if spill_dir is None:
+            self.output = np.empty((height, width, 3), dtype=np.uint8)
+        else:
+            self.output = np.lib.format.open_memmap(os.path.join(spill_dir, 'output.npy'), mode='w+',
+                dtype=np.uint8, shape=(height, width, 3))
+
+    def write_rows(self, row, strip):
+        self.output[row:row + strip.shape[0]] = strip if self.bgr is True else strip[:, :, ::-1]
+
+    def close(self):
+        super().close()
+        ok = cv2.imwrite(self.filename, self.output)
+        del self.output
+        if ok is False:
+            raise ValueError('Can not write image \'%s\'' %self.filename )
+
+    def abort(self):
+        del self.output
+
+class BackgroundWriter:
+
+    def __init__(self, writer, depth = 2):
+        """Run a writer in a background thread, so strips are encoded while the
+        next ones are rendered. At most depth strips wait for the writer.
+
+        Keyword arguments:
+        writer -- the StripWriter
+        depth  -- strips waiting for the writer (default : 2)
+        """
+        self.writer = writer
+        self.width = writer.width
+        self.height = writer.height
+        self.queue = queue.Queue(maxsize=depth)
+        self.error = None
+        self.thread = threading.Thread(target=self.__run__, daemon=True)
+        self.thread.start()
+
+    def write(self, strip):
+        """Queue the next rows, raise the error of the writer if it failed """
+        if self.error is not None:
+            raise self.error
+        # Strips are often views of a buffer reused for the next rows
+        self.queue.put(np.array(strip))
+
+    def close(self):
+        """Wait for the writer and complete the file """
+        self.queue.put(None)
+        self.thread.join()
+        if self.error is not None:
+            # Release the file the writer left incomplete
+            self.writer.abort()
+            raise self.error
+        self.writer.close()
+
+    def abort(self):
+        """Stop the writer without completing the file """
+        self.queue.put(None)
+        self.thread.join()
+        self.writer.abort()
+
+    def __run__(self):
+        while True:
+            strip = self.queue.get()
+            if strip is None:
+                return
+            if self.error is None:
+                try:
+                    self.writer.write(strip)
+                except Exception as error:
+                    self.error = error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+        return False
+
+# Writers streaming strips to disk, other formats are encoded by ImageWriter
+WRITERS = {
+    '.png' : PNGWriter,
+    '.ppm' : PPMWriter,
+    '.pnm' : PPMWriter,
+    '.npy' : NpyWriter
+}
+
+def create_writer(filename, width, height, bgr = True, background = True, spill_dir = None):
+    """Create the writer for the extension of a file
+
+    Keyword arguments:
+    filename   -- the output file
+    width      -- width of the image
+    height     -- height of the image
+    bgr        -- True if strips are given in BGR order (default : True)
+    background -- encode strips in a background thread (default : True)
+    spill_dir  -- directory receiving the buffer of formats which are not streamed
+                  (default : None, in memory)
+
+    Return:
+    writer -- a StripWriter, or a BackgroundWriter running one
+    """
+    extension = os.path.splitext(filename)[1].lower()
+    if extension in WRITERS:
+        writer = WRITERS[extension](filename, width, height, bgr)
+    else:
+        writer = ImageWriter(filename, width, height, bgr, spill_dir)
+    if background is True:
+        writer = BackgroundWriter(writer)
+    return writer
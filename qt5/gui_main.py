@@ -6,15 +6,16 @@
 
 import sys
 import os
-import platform
 import _thread
-import shutil
 from PyQt5.QtCore import Qt, QThread, pyqtSlot, pyqtSignal, QObject
 from PyQt5.QtGui import QFont
 from PyQt5.QtWidgets import QApplication, QMainWindow, QWidget, QLabel, QLineEdit, \
                             QPushButton, QGridLayout, QFileDialog, QLCDNumber, \
                             QSlider, QRadioButton, QCheckBox, QMessageBox, QProgressBar, \
                             QVBoxLayout
+from cache.options import DEFAULT_CACHE_DIR
+from cache.cache import StageCache
+from pipeline.pipeline import MosaicPipeline, load_image
 
 class MosaicGUI(QMainWindow):
 
@@ -27,6 +28,11 @@ class MosaicGUI(QMainWindow):
         self.__init_event__()
         self.resize(400, 400)
         self.setWindowTitle('Mosaic convertor')
+        # Seeds and voronoi diagrams are reused when only plot options change
+        self.cache = StageCache()
+        # The quadtree index is kept beside the cache, out of its entries
+        self.index_file = os.path.join(DEFAULT_CACHE_DIR, 'index', 'gui_index.npz')
+        os.makedirs(os.path.dirname(self.index_file), exist_ok=True)
         self.show()
 
     def __init_element__(self):
@@ -134,24 +140,15 @@ class MosaicGUI(QMainWindow):
             msg.setStandardButtons(QMessageBox.Ok)
             msg.exec_()
         elif os.path.exists(path) is True:
-            if platform.system() == 'Linux':    
-                py = 'python3'
-            else:
-                py = 'python'
             err = self.input_err_rate.value()
             min_area = self.input_min_area.intValue()
             it = self.iter_value.intValue()
             is_plot_average = self.plot_average_radbtn.isChecked()
             is_plot_edge = self.plot_edge.isChecked()
-            args = ""
-            if is_plot_average is True:
-                args += " -pa"
-            else:
-                args += " -pc"
-            if is_plot_edge is True:
-                args += " -pme"
-
-            self.qth = ProgressThread(py, path, err, min_area, it, args, self)
+            pipeline = MosaicPipeline(error_rate = err, min_area = min_area, index_file = self.index_file,
+                iteration = it, centroidal = is_plot_average is False, plot_edge = is_plot_edge, cache = self.cache)
+
+            self.qth = ProgressThread(pipeline, path, 'output.jpg', self)
             self.qth.start()
         else:
             msg = QMessageBox()
@@ -174,43 +171,19 @@ class ProgressThread(QThread):
     progress_trigger = pyqtSignal(int, name='progressUpdated')
     generate_btn_trigger = pyqtSignal(bool)
 
-    def __init__(self, py, path, err, min_area, it, args, qobj):
+    def __init__(self, pipeline, path, output, qobj):
         super().__init__()
-        self.py = py
+        self.pipeline = pipeline
         self.path = path
-        self.err = err
-        self.min_area = min_area
-        self.it = it
-        self.args = args
+        self.output = output
         self.progress_trigger.connect(qobj.__progress_updated__)
         self.generate_btn_trigger.connect(qobj.__set_generated_btn__)
 
     def run(self):
-        # Create temporary directory
-        os.makedirs('.mosaic_tmp/')
         self.generate_btn_trigger.emit(False)
         self.progress_trigger.emit(1)
-
-        os.system(
-            "%s seedgen.py %s -e %f -ma %d -o .mosaic_tmp/seed.pickle" 
-            %(self.py, self.path, self.err, self.min_area) 
-        )
-
-        self.progress_trigger.emit(34)
-
-        os.system(
-            "%s voronoigen.py -t %d -input %s -o %s" 
-            %(self.py, self.it, '.mosaic_tmp/seed.pickle', '.mosaic_tmp/vordig.pickle') 
-        )
-        
-        self.progress_trigger.emit(67)
-
-        os.system(
-            "%s mosaicplot.py %s -input %s" 
-            %(self.py, self.args, '.mosaic_tmp/vordig.pickle') 
-        )
-
-        self.progress_trigger.emit(100)
-        self.generate_btn_trigger.emit(True)
-        # Remove temporary directory
-        shutil.rmtree('.mosaic_tmp/')
\ No newline at end of file
+        try:
+            # Every stage runs in this thread, arrays stay in memory
+            self.pipeline.run_to_file(load_image(self.path), self.output, progress = self.progress_trigger.emit)
+        finally:
+            self.generate_btn_trigger.emit(True)
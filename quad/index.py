@@ -0,0 +1,163 @@
+# -*- coding:utf8 -*-
+'''
+    File name: index.py
+    Author   : Jim00000
+    Created  : 10/18/2026
+'''
+
+__author__    = "Jim00000"
+__copyright__ = "Copyright 2017, the python-mosaic project"
+__license__   = "GNU General Public License v3.0"
+__version__   = "1.0.0"
+
+import os.path
+import hashlib
+import numpy as np
+from quad.quadtree import QuadTree
+
+INDEX_VERSION = 1
+
+class QuadIndex:
+
+    def __init__(self, x, y, width, height, parent, error, min_area, digest = '', engine = 'slice'):
+        """Quadtree split down to min_area with the error of every node.
+        A cut of the tree gives the seeds for any error rate and any minimal
+        area not smaller than min_area, without scanning the image again.
+
+        Keyword arguments:
+        x, y          -- the upper-left column and row position of every node
+        width, height -- size of every node
+        parent        -- index of the parent node, -1 for the root
+        error         -- error of every node, nan if it was not tested
+        min_area      -- minimal pixels for each block of the index
+        digest        -- digest of the indexed image (default : '')
+        engine        -- name of the error engine (default : 'slice')
+        """
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+        self.parent = parent
+        self.error = error
+        self.min_area = min_area
+        self.digest = digest
+        self.engine = engine
+        # Nodes are stored level by level, so children of a node are contiguous
+        nodes = np.arange(parent.size)
+        self.child_begin = np.searchsorted(parent, nodes, side='left')
+        self.child_end = np.searchsorted(parent, nodes, side='right')
+
+    def cut(self, error_rate = 0.5, min_area = 64):
+        """Generate seeds of the quadtree for given thresholds.
+        It costs O(leaves) and gives the same seeds as QuadTree does.
+
+        Keyword arguments:
+        error_rate -- maximal error of a leaf (default : 0.5)
+        min_area   -- minimal pixels for each block (default : 64)
+
+        Return:
+        point_x -- collections of x position of seeds in one-dimension array
+        point_y -- collections of y position of seeds in one-dimension array
+
+        Exceptions:
+        ValueError -- if min_area is smaller than the one of the index
+        """
+        if min_area < self.min_area:
+            raise ValueError('Minimal area %d is smaller than the one of the index (%d)' %(min_area, self.min_area) )
+
+        leaves = list()
+        nodes = np.zeros(1, dtype=np.int64)
+        while nodes.size > 0:
+            begin = self.child_begin[nodes]
+            count = self.child_end[nodes] - begin
+            # Nodes without children are at minimal area of the index
+            leaf = ((self.width[nodes] * self.height[nodes] <= min_area) |
+                    (self.error[nodes] <= error_rate) | (count == 0))
+            leaves.append(nodes[leaf])
+            # Visit children of all the non-leaves
+            split = np.logical_not(leaf)
+            begin = begin[split]
+            count = count[split]
+            shift = np.repeat(begin - np.cumsum(count) + count, count)
+            nodes = shift + np.arange(shift.size)
+
+        leaves = np.concatenate(leaves)[::-1]
+        point_x = self.x[leaves] + self.width[leaves] / 2
+        point_y = self.y[leaves] + self.height[leaves] / 2
+        return point_x, point_y
+
+    def save(self, filename):
+        """Dump the index into a file.
+
+        Keyword arguments:
+        filename -- file name that will be saved
+        """
+        # np.savez appends the extension to file names without it
+        with open(filename, 'wb') as f:
+            np.savez(f,
+                version = INDEX_VERSION,
+                x = self.x.astype(np.int32),
+                y = self.y.astype(np.int32),
+                width = self.width.astype(np.int32),
+                height = self.height.astype(np.int32),
+                parent = self.parent.astype(np.int32),
+                error = self.error,
+                min_area = self.min_area,
+                digest = self.digest,
+                engine = self.engine)
+        print("Quadtree index dumped as file \'%s\'" %filename )
+
+def build_index(img, min_area = 4, error_engine = None, engine = 'slice'):
+    """Build the quadtree index of an image
+
+    Keyword arguments:
+    img          -- the input image
+    min_area     -- minimal pixels for each block of the index (default : 4)
+    error_engine -- engine computing errors, created with the same min_area
+                    (default : None, compute the error on the image slice)
+    engine       -- name of the error engine (default : 'slice')
+
+    Return:
+    index -- the quadtree index
+    """
+    tree = QuadTree(img, min_area = min_area, error_rate = None, error_engine = error_engine)
+    return QuadIndex(tree.x, tree.y, tree.width, tree.height, tree.parent, tree.error,
+        min_area, digest = image_digest(img), engine = engine)
+
+def load_index(filename):
+    """Load the quadtree index
+
+    Keyword arguments:
+    filename -- file containing the index
+
+    Return:
+    index -- the quadtree index
+
+    Exceptions:
+    FileNotFoundError -- if argument 'filename' file does not exist
+    ValueError        -- if the file is written by another version
+    """
+    # Check existence of files
+    if os.path.isfile(filename) is False:
+        raise FileNotFoundError('File \'%s\' does not exist' %filename )
+
+    with np.load(filename) as data:
+        if int(data['version']) != INDEX_VERSION:
+            raise ValueError('Unsupported index version %d' %int(data['version']) )
+        return QuadIndex(
+            data['x'].astype(np.int64),
+            data['y'].astype(np.int64),
+            data['width'].astype(np.int64),
+            data['height'].astype(np.int64),
+            data['parent'].astype(np.int64),
+            data['error'],
+            int(data['min_area']),
+            digest = str(data['digest']),
+            engine = str(data['engine']))
+
+def image_digest(img):
+    """Get the digest of an image, used to match an index with its image """
+    h = hashlib.sha1()
+    h.update(str(img.shape).encode())
+    h.update(np.ascontiguousarray(img).data)
+    return h.hexdigest()
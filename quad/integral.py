@@ -0,0 +1,273 @@
+# -*- coding:utf8 -*-
+'''
+    File name: integral.py
+    Author   : Jim00000
+    Created  : 10/18/2026
+'''
+
+__author__    = "Jim00000"
+__copyright__ = "Copyright 2017, the python-mosaic project"
+__license__   = "GNU General Public License v3.0"
+__version__   = "1.0.0"
+
+import numpy as np
+import cv2
+from quad.quad import __error__
+from quad.options import ERROR_ENGINES
+
+
+class IntegralError:
+
+    def __init__(self, img, min_area = 64, exact = False):
+        """Error engine backed by summed-area tables and a min/max pyramid.
+        Every table is built once per image, so the error test of a quadtree
+        node costs O(1) for the sums and O(log n) for the pyramid lookup.
+
+        The max-deviation error of a block is bounded by its per-channel
+        extremes : max((max - avg)^2, (avg - min)^2) summed over channels.
+        The bound never underestimates the error computed on the slice, so
+        a block accepted as a leaf is always a leaf for the slice metric.
+
+        Keyword arguments:
+        img      -- the input image
+        min_area -- minimal pixels for each block (default : 64)
+        exact    -- resolve undecided blocks with the slice metric so that
+                    leaf decisions match it exactly (default : False)
+        """
+        self.img = img
+        self.height = img.shape[0]
+        self.width = img.shape[1]
+        self.min_area = min_area
+        self.exact = exact
+        self.sum, self.sqsum = __summed_area_tables__(img)
+        self.row_starts, self.col_starts = __split_starts__(self.height, self.width, min_area)
+        self.depth = len(self.row_starts)
+        self.lo, self.hi = __minmax_pyramid__(img, self.row_starts, self.col_starts)
+
+    def stats(self, level, row, col, height, width):
+        """Get mean, variance, minimum and maximum of blocks.
+        Positions and sizes may be scalars or one-dimension arrays.
+
+        Keyword arguments:
+        level  -- depth of the blocks in the quadtree
+        row    -- the upper-left row position of the blocks
+        col    -- the upper-left column position of the blocks
+        height -- height of the blocks
+        width  -- width of the blocks
+
+        Return:
+        mean -- average rgb value of every block
+        var  -- variance of rgb values of every block
+        lo   -- minimal rgb value of every block
+        hi   -- maximal rgb value of every block
+        """
+        r0 = np.asarray(row)
+        c0 = np.asarray(col)
+        r1 = r0 + height
+        c1 = c0 + width
+        n = np.asarray(height * width, dtype=np.float64)[..., np.newaxis]
+
+        total = self.sum[r1, c1] - self.sum[r0, c1] - self.sum[r1, c0] + self.sum[r0, c0]
+        sq = self.sqsum[r1, c1] - self.sqsum[r0, c1] - self.sqsum[r1, c0] + self.sqsum[r0, c0]
+        mean = total / n
+        var = np.maximum(sq / n - mean * mean, 0)
+
+        # Blocks at the same level share the row and column partitions
+        i = np.searchsorted(self.row_starts[level], r0, side='right') - 1
+        j = np.searchsorted(self.col_starts[level], c0, side='right') - 1
+        lo = self.lo[level][i, j]
+        hi = self.hi[level][i, j]
+        return mean, var, lo, hi
+
+    def bounds(self, level, row, col, height, width):
+        """Get lower and upper bounds of the max-deviation error of blocks
+
+        Keyword arguments:
+        level  -- depth of the blocks in the quadtree
+        row    -- the upper-left row position of the blocks
+        col    -- the upper-left column position of the blocks
+        height -- height of the blocks
+        width  -- width of the blocks
+
+        Return:
+        lower -- value that the error is never below
+        upper -- value that the error is never above
+        """
+        mean, var, lo, hi = self.stats(level, row, col, height, width)
+        dev = np.maximum(hi - mean, mean - lo) / 255
+        dev = dev * dev
+        upper = np.sum(dev, axis=-1)
+        lower = np.maximum(np.sum(var, axis=-1) / (255 * 255), np.max(dev, axis=-1))
+        return lower, upper
+
+    def error(self, level, row, col, height, width, error_rate):
+        """Get the error of blocks.
+        The upper bound is returned, except in exact mode for blocks which
+        the bounds cannot decide. Comparing the result with error_rate
+        always gives the leaf decision of the engine.
+        With error_rate None, exact mode returns the error of the slice
+        metric for every block, so the result holds for any error rate.
+
+        Keyword arguments:
+        level      -- depth of the blocks in the quadtree
+        row        -- the upper-left row position of the blocks
+        col        -- the upper-left column position of the blocks
+        height     -- height of the blocks
+        width      -- width of the blocks
+        error_rate -- maximal error of a leaf, or None
+
+        Return:
+        err -- error of every block
+        """
+        row, col, height, width = np.broadcast_arrays(*np.atleast_1d(row, col, height, width))
+        # Blocks below the pyramid are single pixels, whose error is zero
+        if level >= self.depth:
+            return np.zeros(row.shape)
+
+        lower, upper = self.bounds(level, row, col, height, width)
+        if self.exact is False:
+            return upper
+
+        # Keep a small margin so rounding never flips a decision
+        eps = 1e-9
+        if error_rate is None:
+            undecided = upper - lower > eps
+        else:
+            undecided = (upper >= error_rate - eps) & (lower <= error_rate + eps)
+        for k in np.flatnonzero(undecided):
+            r = row[k]
+            c = col[k]
+            block = self.img[r:r + height[k], c:c + width[k], :]
+            upper[k] = __error__(block)
+        return upper
+
+    def is_leaf(self, level, row, col, height, width, error_rate):
+        """Check whether blocks are leaves.
+        Caller is responsible for the minimal area test.
+
+        Keyword arguments:
+        level      -- depth of the blocks in the quadtree
+        row        -- the upper-left row position of the blocks
+        col        -- the upper-left column position of the blocks
+        height     -- height of the blocks
+        width      -- width of the blocks
+        error_rate -- maximal error of a leaf
+
+        Return:
+        leaf -- boolean array, True if the block is a leaf
+        """
+        return self.error(level, row, col, height, width, error_rate) <= error_rate
+
+def create_error_engine(name, img, min_area = 64):
+    """Create the error engine used by Quad
+
+    Keyword arguments:
+    name     -- one of ERROR_ENGINES
+    img      -- the input image
+    min_area -- minimal pixels for each block (default : 64)
+
+    Return:
+    engine -- the error engine, or None for the slice metric
+    """
+    if name == 'slice':
+        return None
+    elif name == 'integral':
+        return IntegralError(img, min_area = min_area)
+    elif name == 'integral-exact':
+        return IntegralError(img, min_area = min_area, exact = True)
+    else:
+        raise ValueError('Unknown error engine \'%s\'' %name )
+
+def compare_error_engine(tree):
+    """Check leaf decisions of a quadtree against the slice metric.
+    Every tested node is revisited, so it costs as much as building
+    the tree with the slice metric.
+
+    Keyword arguments:
+    tree -- QuadTree built with an error engine
+
+    Return:
+    report -- a dictionary with the count of tested nodes, of nodes
+              whose decision differs, and of leaves the slice metric
+              would have split
+    """
+    report = {'nodes' : 0, 'mismatches' : 0, 'unsafe' : 0}
+    # Blocks at minimal area are leaves for every metric
+    tested = np.flatnonzero(np.logical_not(np.isnan(tree.error)))
+    for i in tested:
+        x = tree.x[i]
+        y = tree.y[i]
+        block = tree.img[y:y + tree.height[i], x:x + tree.width[i], :]
+        expected = __error__(block) <= tree.error_rate
+        report['nodes'] += 1
+        if tree.leaf[i] != expected:
+            report['mismatches'] += 1
+            if tree.leaf[i]:
+                report['unsafe'] += 1
+    return report
+
+def __summed_area_tables__(img):
+    """Compute summed-area tables of rgb values and squared rgb values.
+    Float64 holds the sums exactly up to 2^53, far beyond any image size.
+    """
+    return cv2.integral2(img, sdepth=cv2.CV_64F, sqdepth=cv2.CV_64F)
+
+def __split_starts__(height, width, min_area):
+    """Compute row and column partitions for every level of the quadtree.
+    Quad splits a block into ceil(size / 2) and the rest, so all the blocks
+    in one level lie on a grid. Interval k of a level has children 2k and
+    2k + 1 in the next level.
+    Levels stop where no block is larger than min_area.
+    """
+    row_starts = list()
+    col_starts = list()
+    rows = np.array([0, height])
+    cols = np.array([0, width])
+    while True:
+        max_h = np.diff(rows).max()
+        max_w = np.diff(cols).max()
+        if max_h * max_w <= min_area or (max_h <= 1 and max_w <= 1):
+            break
+        row_starts.append(rows[:-1])
+        col_starts.append(cols[:-1])
+        rows = __split_edges__(rows)
+        cols = __split_edges__(cols)
+    return row_starts, col_starts
+
+def __split_edges__(edges):
+    """Split every interval in the same way as Quad """
+    starts = edges[:-1]
+    mids = starts + (np.diff(edges) + 1) // 2
+    return np.append(np.vstack((starts, mids)).T.ravel(), edges[-1])
+
+def __minmax_pyramid__(img, row_starts, col_starts):
+    """Compute per-channel minimum and maximum of every block of every level """
+    depth = len(row_starts)
+    lo = [None] * depth
+    hi = [None] * depth
+    if depth == 0:
+        return lo, hi
+
+    height = img.shape[0]
+    width = img.shape[1]
+    # Reduce the image on the finest grid, intervals may be empty there
+    rows = row_starts[-1]
+    cols = col_starts[-1]
+    row_empty = np.diff(np.append(rows, height)) == 0
+    col_empty = np.diff(np.append(cols, width)) == 0
+    ri = np.minimum(rows, height - 1)
+    ci = np.minimum(cols, width - 1)
+    lo[-1] = np.minimum.reduceat(np.minimum.reduceat(img, ri, axis=0), ci, axis=1)
+    hi[-1] = np.maximum.reduceat(np.maximum.reduceat(img, ri, axis=0), ci, axis=1)
+    lo[-1][row_empty, :, :] = 255
+    lo[-1][:, col_empty, :] = 255
+    hi[-1][row_empty, :, :] = 0
+    hi[-1][:, col_empty, :] = 0
+
+    # Merge four children into their parent
+    for d in range(depth - 2, -1, -1):
+        lo[d] = np.minimum(lo[d + 1][0::2], lo[d + 1][1::2])
+        lo[d] = np.minimum(lo[d][:, 0::2], lo[d][:, 1::2])
+        hi[d] = np.maximum(hi[d + 1][0::2], hi[d + 1][1::2])
+        hi[d] = np.maximum(hi[d][:, 0::2], hi[d][:, 1::2])
+    return lo, hi
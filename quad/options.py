@@ -0,0 +1,15 @@
+# -*- coding:utf8 -*-
+'''
+    File name: options.py
+    Author   : Jim00000
+    Created  : 10/18/2026
+'''
+
+__author__    = "Jim00000"
+__copyright__ = "Copyright 2017, the python-mosaic project"
+__license__   = "GNU General Public License v3.0"
+__version__   = "1.0.0"
+
+# Names given to --error-engine, kept apart from the engines so command lines
+# are parsed without loading NumPy and OpenCV
+ERROR_ENGINES = ['slice', 'integral', 'integral-exact']
@@ -17,13 +17,16 @@ import numpy as np
 
 class Quad:
     
-    def __init__(self, img, x = 0, y = 0, min_area = 64, error_rate = 0.5, is_root = False):
+    def __init__(self, img, x = 0, y = 0, min_area = 64, error_rate = 0.5, is_root = False, level = 0, error_engine = None):
         """Quad constructor 
 
         Keyword arguments:
-        img -- the input image
-        x   -- the upper-left x position of this image
-        y   -- the upper-left y position of this image
+        img          -- the input image
+        x            -- the upper-left x position of this image
+        y            -- the upper-left y position of this image
+        level        -- depth of this node in the quadtree (default : 0)
+        error_engine -- engine deciding leaves of the whole image, e.g. IntegralError
+                        (default : None, compute the error on the image slice)
         """
         self.img = img
         self.height = img.shape[0]
@@ -33,6 +36,8 @@ class Quad:
         self.min_area = min_area
         self.error_rate = error_rate
         self.is_root = is_root
+        self.level = level
+        self.error_engine = error_engine
         self.leaf = self.is_leaf() # Show that is this node a leaf
         self.children = None
         # If this node is root then generate the quadtree
@@ -78,34 +83,37 @@ class Quad:
         child_width = math.ceil(self.width / 2)
         child_height = math.ceil(self.height / 2)
         # Generate four sub-quadtree nodes
-        top_left = Quad(self.img[:child_height,:child_width,:], x = self.x, y = self.y, min_area = self.min_area, error_rate = self.error_rate)
-        top_right = Quad(self.img[:child_height,child_width:,:], x = self.x, y = self.y + child_width, min_area = self.min_area, error_rate = self.error_rate)
-        bottom_left = Quad(self.img[child_height:,:child_width,:], x = self.x + child_height, y = self.y, min_area = self.min_area, error_rate = self.error_rate)
-        bottom_right = Quad(self.img[child_height:,child_width:,:], x = self.x + child_height, y = self.y + child_width, min_area = self.min_area, error_rate = self.error_rate)
+        top_left = Quad(self.img[:child_height,:child_width,:], x = self.x, y = self.y, min_area = self.min_area, error_rate = self.error_rate, level = self.level + 1, error_engine = self.error_engine)
+        top_right = Quad(self.img[:child_height,child_width:,:], x = self.x, y = self.y + child_width, min_area = self.min_area, error_rate = self.error_rate, level = self.level + 1, error_engine = self.error_engine)
+        bottom_left = Quad(self.img[child_height:,:child_width,:], x = self.x + child_height, y = self.y, min_area = self.min_area, error_rate = self.error_rate, level = self.level + 1, error_engine = self.error_engine)
+        bottom_right = Quad(self.img[child_height:,child_width:,:], x = self.x + child_height, y = self.y + child_width, min_area = self.min_area, error_rate = self.error_rate, level = self.level + 1, error_engine = self.error_engine)
         # Mark all children
         self.children = [top_left, top_right, bottom_left, bottom_right]
         return top_left, top_right, bottom_left, bottom_right
     
     def is_leaf(self):
         """Check whether this node is a leaf """
-        if self.height * self.width <= self.min_area or __error__(self.img) <= self.error_rate:
+        if self.height * self.width <= self.min_area:
+            return True
+        # Ask the engine instead of scanning the slice
+        if self.error_engine is not None:
+            return bool(self.error_engine.is_leaf(self.level, self.x, self.y, self.height, self.width, self.error_rate)[0])
+        if __error__(self.img) <= self.error_rate:
             return True
         else:
             return False
 
     def generate_seeds(self):
-        """Generate seeds """
-        point_x = np.zeros(len(self.leaves))
-        point_y = np.zeros(len(self.leaves))
+        """Generate seeds at the center of every non-empty leaf """
+        blocks = [block for block in reversed(self.leaves) if block.width * block.height > 0]
+        point_x = np.zeros(len(blocks))
+        point_y = np.zeros(len(blocks))
 
-        for i in range(len(self.leaves)):
-            block = self.leaves.pop()
-            x = block.x
-            y = block.y
-            w = block.width
-            h = block.height
-            point_y[i] = x + w / 2
-            point_x[i] = y + h / 2
+        for i in range(len(blocks)):
+            block = blocks[i]
+            # Note that x is the row and y is the column of the block
+            point_y[i] = block.x + block.height / 2
+            point_x[i] = block.y + block.width / 2
         
         return point_x, point_y
 
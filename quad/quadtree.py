@@ -0,0 +1,134 @@
+# -*- coding:utf8 -*-
+'''
+    File name: quadtree.py
+    Author   : Jim00000
+    Created  : 10/18/2026
+'''
+
+__author__    = "Jim00000"
+__copyright__ = "Copyright 2017, the python-mosaic project"
+__license__   = "GNU General Public License v3.0"
+__version__   = "1.0.0"
+
+import numpy as np
+from quad.quad import __error__
+
+class QuadTree:
+
+    def __init__(self, img, min_area = 64, error_rate = 0.5, error_engine = None):
+        """Quadtree stored as flat arrays, one entry per node.
+        Nodes are built level by level : all the nodes of a level are tested
+        in one pass and the non-leaves are split together. Nodes are kept in
+        the same order as Quad visits them and empty blocks are dropped.
+
+        Keyword arguments:
+        img          -- the input image
+        min_area     -- minimal pixels for each block (default : 64)
+        error_rate   -- maximal error of a leaf, or None to split every block
+                        down to min_area (default : 0.5)
+        error_engine -- engine deciding leaves of the whole image, e.g. IntegralError
+                        (default : None, compute the error on the image slice)
+
+        Attributes:
+        x, y          -- the upper-left column and row position of every node
+        width, height -- size of every node
+        parent        -- index of the parent node, -1 for the root
+        error         -- error of every node, nan if it was not tested
+        leaf          -- True if the node is a leaf
+        """
+        self.img = img
+        self.min_area = min_area
+        self.error_rate = error_rate
+        self.error_engine = error_engine
+        self.generate_tree()
+
+    def generate_tree(self):
+        """Generate the quadtree """
+        xs = list()
+        ys = list()
+        ws = list()
+        hs = list()
+        parents = list()
+        errors = list()
+        leaves = list()
+
+        # Start from the root
+        x = np.zeros(1, dtype=np.int64)
+        y = np.zeros(1, dtype=np.int64)
+        w = np.array([self.img.shape[1]], dtype=np.int64)
+        h = np.array([self.img.shape[0]], dtype=np.int64)
+        parent = np.full(1, -1, dtype=np.int64)
+        offset = 0
+        level = 0
+
+        while x.size > 0:
+            # Test all the nodes in the same level
+            err = np.full(x.size, np.nan)
+            # Single pixels can not be split any further
+            leaf = (w * h <= self.min_area) | ((w == 1) & (h == 1))
+            tested = np.flatnonzero(np.logical_not(leaf))
+            err[tested] = self.__level_error__(level, x[tested], y[tested], w[tested], h[tested])
+            if self.error_rate is not None:
+                leaf[tested] = err[tested] <= self.error_rate
+
+            xs.append(x)
+            ys.append(y)
+            ws.append(w)
+            hs.append(h)
+            parents.append(parent)
+            errors.append(err)
+            leaves.append(leaf)
+
+            # Split all the non-leaves into top-left, top-right, bottom-left and bottom-right
+            split = np.flatnonzero(np.logical_not(leaf))
+            px = x[split]
+            py = y[split]
+            cw = (w[split] + 1) // 2
+            ch = (h[split] + 1) // 2
+            rw = w[split] - cw
+            rh = h[split] - ch
+            x = np.stack((px, px + cw, px, px + cw), axis=1).ravel()
+            y = np.stack((py, py, py + ch, py + ch), axis=1).ravel()
+            w = np.stack((cw, rw, cw, rw), axis=1).ravel()
+            h = np.stack((ch, ch, rh, rh), axis=1).ravel()
+            parent = np.repeat(split + offset, 4)
+
+            # Drop blocks without pixels
+            keep = w * h > 0
+            x = x[keep]
+            y = y[keep]
+            w = w[keep]
+            h = h[keep]
+            parent = parent[keep]
+
+            offset += leaf.size
+            level += 1
+
+        self.x = np.concatenate(xs)
+        self.y = np.concatenate(ys)
+        self.width = np.concatenate(ws)
+        self.height = np.concatenate(hs)
+        self.parent = np.concatenate(parents)
+        self.error = np.concatenate(errors)
+        self.leaf = np.concatenate(leaves)
+
+    def __level_error__(self, level, x, y, w, h):
+        """Compute the error of nodes in the same level """
+        if self.error_engine is not None:
+            return self.error_engine.error(level, y, x, h, w, self.error_rate)
+        err = np.zeros(x.size)
+        for i in range(x.size):
+            err[i] = __error__(self.img[y[i]:y[i] + h[i], x[i]:x[i] + w[i], :])
+        return err
+
+    def generate_seeds(self):
+        """Generate seeds at the center of every leaf, in the same order as Quad
+
+        Return:
+        point_x -- collections of x position of seeds in one-dimension array
+        point_y -- collections of y position of seeds in one-dimension array
+        """
+        leaves = np.flatnonzero(self.leaf)[::-1]
+        point_x = self.x[leaves] + self.width[leaves] / 2
+        point_y = self.y[leaves] + self.height[leaves] / 2
+        return point_x, point_y
@@ -11,34 +11,37 @@ __copyright__ = "Copyright 2017, the python-mosaic project"
 __license__   = "GNU General Public License v3.0"
 __version__   = "1.0.0"
 
-import pickle
 import os.path
 import sys
 import argparse
 import numpy as np
-import matplotlib.pyplot as plt
 import cv2
-from quad.quad import Quad
-
-def save_data(point_x, point_y, filename, img):
-    """Dump the points into a file.
+from quad.quadtree import QuadTree
+from quad.options import ERROR_ENGINES
+from quad.integral import create_error_engine, compare_error_engine
+from quad.index import build_index, load_index, image_digest
+from container.container import save_container, image_reference
+from cache.options import DEFAULT_CACHE_DIR
+from cache.cache import StageCache, cached_seeds
+
+def save_data(point_x, point_y, filename, img, imgfile, gaussian_blur = False):
+    """Dump the points into a container file. The image is not copied, the
+    container refers to the image file and the digest of its pixels.
 
     Keyword arguments:
-    point_x  -- one-dimension array stores seed points x
-    point_y  -- one-dimension array stores seed points y
-    filename -- file name that will be saved
-    img      -- three-dimensions array represents rgb of an image
+    point_x       -- one-dimension array stores seed points x
+    point_y       -- one-dimension array stores seed points y
+    filename      -- file name that will be saved
+    img           -- three-dimensions array represents rgb of an image
+    imgfile       -- the image file img is loaded from
+    gaussian_blur -- True if img is blurred (default : False)
     """
-    seed = {
-        'x' : point_x,
-        'y' : point_y,
-        'img' : img
-    }
-    
     # Store seed
-    with open(filename, 'wb') as f:
-        pickle.dump(seed, f, pickle.HIGHEST_PROTOCOL)
-        print("Seed data dumped as file \'%s\'" %filename )
+    save_container(filename, 'seeds', {
+        'x' : np.asarray(point_x, dtype=np.float32),
+        'y' : np.asarray(point_y, dtype=np.float32)
+    }, meta = {'image' : image_reference(imgfile, img, gaussian_blur)})
+    print("Seed data dumped as file \'%s\'" %filename )
 
 def main(argv):
     """The entry for this program.
@@ -49,13 +52,23 @@ def main(argv):
     # Arguments parsing
     parser = argparse.ArgumentParser(description='mosaic seeds generator')
     parser.add_argument("image", help="input image file", type=str)
-    parser.add_argument("-o", "--output-seed", default='seed.pickle', type=str, help="output seeds pickle file")
+    parser.add_argument("-o", "--output-seed", default='seed.npz', type=str, help="output seeds container file (default : seed.npz)")
     parser.add_argument("-od", "--output-dist", type=str, help="output seeds distribution image")
     parser.add_argument("-ocd", "--output-compsite-dist", type=str, help="output composite image of seeds distribution and input image")
     parser.add_argument("-e", "--error-rate", default=0.5, type=float, help="error rate (default:0.5)")
     parser.add_argument("-ma", "--min-area", default=64, type=int, help="minimal pixels for each block (default:64)")
     parser.add_argument("-gb", "--gaussian-blur" ,default=False, action="store_true", help="Apply Gaussian blur")
+    parser.add_argument("-ee", "--error-engine", default='slice', choices=ERROR_ENGINES, help="engine computing block errors (default:slice)")
+    parser.add_argument("--check-error-engine", default=False, action="store_true", help="Check leaf decisions of the error engine against the slice metric")
+    parser.add_argument("-ix", "--index", type=str, help="quadtree index file, reused by later runs with other thresholds")
+    parser.add_argument("--index-min-area", default=4, type=int, help="minimal pixels for each block of the index (default:4)")
+    parser.add_argument("--no-cache", default=False, action="store_true", help="Always generate seeds, without the stage cache")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, type=str, help="Directory of the stage cache (default:%s)" %DEFAULT_CACHE_DIR)
+    parser.add_argument("--cache-size", default=1024, type=int, help="Size bound of the stage cache in MB (default:1024)")
+    parser.add_argument("--cache-stats", default=False, action="store_true", help="Print stage cache statistics")
     args = parser.parse_args()
+    if args.check_error_engine is True and args.index is not None:
+        parser.error('--check-error-engine can not be used with --index')
 
     # [DEBUG] Show arguments
     print(args)
@@ -68,6 +81,13 @@ def main(argv):
     error_rate = args.error_rate
     min_area = args.min_area
     is_gaussian_blur = args.gaussian_blur
+    error_engine = args.error_engine
+    is_check_error_engine = args.check_error_engine
+    index_filename = args.index
+    index_min_area = min(args.index_min_area, min_area)
+    # Checks of the error engine need the tree, they never use the cache
+    cache = None if (args.no_cache or is_check_error_engine) is True else StageCache(args.cache_dir, args.cache_size << 20)
+    is_cache_stats = args.cache_stats
 
     # Check the existence of the image file
     if os.path.isfile(imgfile) is False:
@@ -81,14 +101,47 @@ def main(argv):
     if is_gaussian_blur is True:
         img = cv2.GaussianBlur(img, (5, 5), 0)
 
-    # Compute regional quadrature tree
-    quad_root = Quad(img, min_area = min_area, error_rate = error_rate, is_root = True)
-
-    # Generate seeds
-    point_x, point_y = quad_root.generate_seeds()
+    def generate():
+        if index_filename is not None:
+            # Reuse the index if it is built from the same image and engine
+            index = None
+            if os.path.isfile(index_filename) is True:
+                index = load_index(index_filename)
+                if (index.digest != image_digest(img) or index.engine != error_engine or 
+                    index.min_area > min_area):
+                    print('Quadtree index \'%s\' does not match, rebuild it' %index_filename )
+                    index = None
+            if index is None:
+                engine = create_error_engine(error_engine, img, min_area = index_min_area)
+                index = build_index(img, min_area = index_min_area, error_engine = engine, engine = error_engine)
+                index.save(index_filename)
+
+            # Generate seeds from the index
+            return index.cut(error_rate = error_rate, min_area = min_area)
+        else:
+            # Compute regional quadrature tree
+            engine = create_error_engine(error_engine, img, min_area = min_area)
+            tree = QuadTree(img, min_area = min_area, error_rate = error_rate, error_engine = engine)
+
+            # Check leaf decisions against the slice metric (if user set flags)
+            if is_check_error_engine is True:
+                report = compare_error_engine(tree)
+                print('Error engine check : %d nodes, %d mismatches, %d unsafe leaves' 
+                    %(report['nodes'], report['mismatches'], report['unsafe']) )
+
+            # Generate seeds
+            return tree.generate_seeds()
+
+    # Generate seeds, or reuse them from the stage cache
+    point_x, point_y = cached_seeds(cache, img, generate, min_area = min_area, error_rate = error_rate,
+        error_engine = error_engine)
 
     # Dump seeds data 
-    save_data(point_x, point_y, seed_filename, img)
+    save_data(point_x, point_y, seed_filename, img, imgfile, is_gaussian_blur)
+
+    # Plotting is loaded only for the optional outputs
+    if output_dist is not None or output_compsite_dist is not None:
+        import matplotlib.pyplot as plt
 
     # Output seeds distribution (if users set flags)
     if output_dist is not None:
@@ -108,6 +161,8 @@ def main(argv):
     # Show Result
     seed_count = point_x.size
     print('Seed count : %d' %seed_count )
+    if cache is not None and is_cache_stats is True:
+        print(cache.statistics())
 
     # Show success message
     print('Done!')
@@ -0,0 +1,442 @@
+# -*- coding:utf8 -*-
+'''
+    File name: service.py
+    Author   : Jim00000
+    Created  : 10/18/2026
+'''
+
+__author__    = "Jim00000"
+__copyright__ = "Copyright 2017, the python-mosaic project"
+__license__   = "GNU General Public License v3.0"
+__version__   = "1.0.0"
+
+import asyncio
+import collections
+import json
+import mimetypes
+import multiprocessing
+import os
+import shlex
+import signal
+import time
+import urllib.parse
+import numpy as np
+import cv2
+from batch.batch import split_cores
+from cache.options import DEFAULT_CACHE_DIR
+from mosaic import build_parser, create_pipeline
+
+# Extensions of the encoded results
+OUTPUT_EXTENSIONS = ['.jpg', '.jpeg', '.png', '.bmp', '.tif', '.tiff', '.webp']
+# Options acting on files of the server, or on other modes than a single image
+SERVER_OPTIONS = ['output_file', 'tile', 'memory_budget', 'tile_halo', 'spill_dir', 'batch', 'output_dir',
+    'output_ext', 'jobs', 'threads', 'report', 'video', 'change_threshold', 'change_block', 'fourcc',
+    'no_cache', 'cache_dir', 'cache_size', 'cache_stats']
+# Size of the chunks the result is streamed in
+CHUNK_SIZE = 1 << 16
+
+REASONS = {200 : 'OK', 400 : 'Bad Request', 404 : 'Not Found', 405 : 'Method Not Allowed',
+    408 : 'Request Timeout', 411 : 'Length Required', 413 : 'Payload Too Large',
+    500 : 'Internal Server Error', 503 : 'Service Unavailable'}
+
+class HttpError(Exception):
+
+    def __init__(self, status, message, headers = None):
+        """Error answered to the client instead of the result
+
+        Keyword arguments:
+        status  -- HTTP status code
+        message -- text of the response
+        headers -- dictionary of extra response headers (default : None)
+        """
+        super().__init__(message)
+        self.status = status
+        self.headers = {} if headers is None else headers
+
+class MosaicService:
+
+    def __init__(self, jobs = None, threads = None, queue_size = 16, max_body = 64 << 20, timeout = 30.0,
+            no_cache = False, cache_dir = DEFAULT_CACHE_DIR, cache_size = 1024, history = 1000):
+        """Mosaic over HTTP, with a pool of worker processes started once.
+        POST /mosaic takes the image bytes as body, the options of mosaic.py in the
+        'args' query parameter and the extension of the result in 'format'. The
+        encoded result is streamed back. Jobs wait in a bounded queue, a request
+        arriving when it is full is answered 503 right away. GET /stats gives the
+        queue depth, job counters and latencies. Workers are restarted when one
+        of them dies.
+
+        Keyword arguments:
+        jobs       -- worker processes, also the number of jobs run at once (default : None, one per core)
+        threads    -- threads of every job (default : None, cores left per worker)
+        queue_size -- jobs waiting for a worker, beyond it requests are refused (default : 16)
+        max_body   -- size bound of an uploaded image in bytes (default : 64 MB)
+        timeout    -- seconds given to a client to send its request (default : 30.0)
+        no_cache   -- compute every stage, without the stage cache (default : False)
+        cache_dir  -- directory of the stage cache (default : DEFAULT_CACHE_DIR)
+        cache_size -- size bound of the stage cache in MB (default : 1024)
+        history    -- number of recent jobs the latencies are computed over (default : 1000)
+        """
+        cores = os.cpu_count() or 1
+        self.jobs, self.threads = split_cores(cores if jobs is None else jobs, jobs, threads, cores)
+        self.queue_size = queue_size
+        self.max_body = max_body
+        self.timeout = timeout
+        self.no_cache = no_cache
+        self.cache_dir = cache_dir
+        self.cache_size = cache_size
+        self.parser = build_parser()
+        self.parser.error = self.__argument_error__
+        self.queue = None
+        self.executor = None
+        self.ready = None
+        self.dispatchers = []
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.dropped = 0
+        self.restarts = 0
+        self.waits = collections.deque(maxlen=history)
+        self.runs = collections.deque(maxlen=history)
+        self.started = time.time()
+
+    async def start(self):
+        """Start the worker processes and wait until they are ready """
+        # OpenMP reads its thread count once loaded, workers inherit it from the environment
+        self.previous_threads = os.environ.get('OMP_NUM_THREADS')
+        os.environ['OMP_NUM_THREADS'] = str(self.threads)
+        self.ready = asyncio.Event()
+        await self.__start_workers__()
+        self.ready.set()
+
+        self.queue = asyncio.Queue(maxsize=self.queue_size)
+        self.dispatchers = [asyncio.ensure_future(self.__dispatch__()) for _ in range(self.jobs)]
+        print('Service : %d workers, %d threads each, queue of %d' %(self.jobs, self.threads, self.queue_size) )
+
+    async def close(self):
+        """Stop the dispatchers and the worker processes """
+        for dispatcher in self.dispatchers:
+            dispatcher.cancel()
+        await asyncio.gather(*self.dispatchers, return_exceptions=True)
+        self.dispatchers = []
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.executor = None
+            if self.previous_threads is None:
+                del os.environ['OMP_NUM_THREADS']
+            else:
+                os.environ['OMP_NUM_THREADS'] = self.previous_threads
+
+    def statistics(self):
+        """Get queue depth, job counters and latencies in seconds
+
+        Return:
+        stats -- dictionary of JSON values
+        """
+        def summary(values):
+            if len(values) == 0:
+                return None
+            values = np.array(values)
+            return {
+                'mean' : float(values.mean()),
+                'p50' : float(np.percentile(values, 50)),
+                'p95' : float(np.percentile(values, 95)),
+                'max' : float(values.max())
+            }
+
+        return {
+            'queue_depth' : 0 if self.queue is None else self.queue.qsize(),
+            'queue_size' : self.queue_size,
+            'workers' : self.jobs,
+            'threads' : self.threads,
+            'running' : self.running,
+            'completed' : self.completed,
+            'failed' : self.failed,
+            'rejected' : self.rejected,
+            'dropped' : self.dropped,
+            'restarts' : self.restarts,
+            'uptime' : time.time() - self.started,
+            'queue_wait' : summary(self.waits),
+            'run' : summary(self.runs),
+            'latency' : summary([wait + run for wait, run in zip(self.waits, self.runs)])
+        }
+
+    async def submit(self, data, argv, extension = '.jpg'):
+        """Queue a job and wait for its result
+
+        Keyword arguments:
+        data      -- bytes of the encoded input image
+        argv      -- list of options of mosaic.py, without filename
+        extension -- extension of the result, it picks the encoder (default : '.jpg')
+
+        Return:
+        result -- bytes of the encoded mosaic
+
+        Exceptions:
+        HttpError  -- if the options are refused (400), or the queue is full (503)
+        ValueError -- if the image can not be decoded
+        """
+        if extension not in OUTPUT_EXTENSIONS:
+            raise HttpError(400, 'format must be one of %s' %', '.join(OUTPUT_EXTENSIONS) )
+        pipeline = self.__pipeline__(argv)
+
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self.queue.put_nowait((pipeline, data, extension, future, time.perf_counter()))
+        except asyncio.QueueFull:
+            self.rejected += 1
+            raise HttpError(503, 'queue is full, retry later', {'Retry-After' : '1'})
+        return await future
+
+    async def serve(self, host = '127.0.0.1', port = 8080, unix_socket = None):
+        """Start the workers and answer requests until cancelled
+
+        Keyword arguments:
+        host        -- address to listen on (default : '127.0.0.1')
+        port        -- TCP port to listen on (default : 8080)
+        unix_socket -- path of a Unix socket to listen on instead of host and port (default : None)
+        """
+        await self.start()
+        try:
+            if unix_socket is not None:
+                server = await asyncio.start_unix_server(self.__handle__, path=unix_socket)
+                print('Service : listening on %s' %unix_socket )
+            else:
+                server = await asyncio.start_server(self.__handle__, host, port)
+                print('Service : listening on http://%s:%d' %(host, port) )
+            async with server:
+                await server.serve_forever()
+        finally:
+            await self.close()
+
+    async def __start_workers__(self):
+        """Start a pool of worker processes and wait until every worker is ready """
+        from concurrent.futures import ProcessPoolExecutor
+
+        # Workers are spawned rather than forked, since the event loop runs threads
+        context = multiprocessing.get_context('spawn')
+        self.executor = ProcessPoolExecutor(max_workers=self.jobs, mp_context=context,
+            initializer=__init_worker__, initargs=(self.threads,))
+        # Every worker pays its imports now rather than on the first request
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*[loop.run_in_executor(self.executor, __warm__) for _ in range(self.jobs)])
+
+    async def __restart__(self, broken):
+        """Replace a pool broken by a dying worker, once for all the jobs lost with it """
+        if self.executor is not broken or self.ready.is_set() is False:
+            return
+        self.ready.clear()
+        print('Service : a worker died, restarting the workers')
+        try:
+            broken.shutdown(wait=False)
+            await self.__start_workers__()
+            self.restarts += 1
+        finally:
+            self.ready.set()
+
+    def __pipeline__(self, argv):
+        """Create the pipeline of the options of a request """
+        try:
+            args = self.parser.parse_args(['-'] + argv)
+        except SystemExit:
+            raise HttpError(400, 'options can not be parsed')
+        for name in SERVER_OPTIONS:
+            if getattr(args, name) != self.parser.get_default(name):
+                raise HttpError(400, 'option %s is not available in the service' %name.replace('_', '-') )
+
+        # The stage cache belongs to the server
+        args.no_cache = self.no_cache
+        args.cache_dir = self.cache_dir
+        args.cache_size = self.cache_size
+        return create_pipeline(args)
+
+    def __argument_error__(self, message):
+        raise HttpError(400, message)
+
+    async def __dispatch__(self):
+        """Hand queued jobs to the workers, one job at a time """
+        from concurrent.futures.process import BrokenProcessPool
+
+        loop = asyncio.get_running_loop()
+        while True:
+            pipeline, data, extension, future, queued = await self.queue.get()
+            # The client closed its connection while the job was waiting
+            if future.cancelled() is True:
+                self.dropped += 1
+                continue
+            # Workers may be restarting
+            await self.ready.wait()
+            executor = self.executor
+            self.running += 1
+            started = time.perf_counter()
+            try:
+                try:
+                    running = loop.run_in_executor(executor, __process__, pipeline, data, extension)
+                except BrokenProcessPool:
+                    # The pool broke while idle, the job did not start and goes to a new pool
+                    await self.__restart__(executor)
+                    await self.ready.wait()
+                    executor = self.executor
+                    running = loop.run_in_executor(executor, __process__, pipeline, data, extension)
+                result = await running
+            except BrokenProcessPool as error:
+                # Jobs running in the pool are lost with it, the next ones go to a new pool
+                self.failed += 1
+                if future.done() is False:
+                    future.set_exception(error)
+                await self.__restart__(executor)
+            except Exception as error:
+                self.failed += 1
+                if future.done() is False:
+                    future.set_exception(error)
+            else:
+                self.completed += 1
+                self.waits.append(started - queued)
+                self.runs.append(time.perf_counter() - started)
+                if future.done() is False:
+                    future.set_result(result)
+            finally:
+                self.running -= 1
+
+    async def __handle__(self, reader, writer):
+        """Answer one request on a connection """
+        try:
+            try:
+                method, target, headers = await asyncio.wait_for(self.__read_head__(reader), self.timeout)
+                url = urllib.parse.urlsplit(target)
+                query = urllib.parse.parse_qs(url.query)
+                if url.path == '/stats':
+                    if method != 'GET':
+                        raise HttpError(405, 'use GET', {'Allow' : 'GET'})
+                    await self.__respond__(writer, 200, json.dumps(self.statistics(), indent=1) + '\n',
+                        'application/json')
+                elif url.path == '/mosaic':
+                    if method != 'POST':
+                        raise HttpError(405, 'use POST', {'Allow' : 'POST'})
+                    data = await asyncio.wait_for(self.__read_body__(reader, headers), self.timeout)
+                    try:
+                        argv = shlex.split(query.get('args', [''])[0])
+                    except ValueError as error:
+                        raise HttpError(400, 'args can not be split : %s' %error )
+                    extension = query.get('format', ['.jpg'])[0].lower()
+                    if extension.startswith('.') is False:
+                        extension = '.' + extension
+                    try:
+                        result = await self.__wait_result__(reader, data, argv, extension)
+                    except ValueError as error:
+                        raise HttpError(400, str(error))
+                    await self.__stream__(writer, result, mimetypes.guess_type('mosaic' + extension)[0])
+                else:
+                    raise HttpError(404, 'unknown path %s' %url.path )
+            except HttpError as error:
+                await self.__respond__(writer, error.status, str(error) + '\n', 'text/plain', error.headers)
+            except asyncio.TimeoutError:
+                await self.__respond__(writer, 408, 'request timed out\n', 'text/plain')
+            except (ConnectionError, asyncio.IncompleteReadError):
+                pass
+            except Exception as error:
+                await self.__respond__(writer, 500, '%s: %s\n' %(type(error).__name__, error), 'text/plain')
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def __wait_result__(self, reader, data, argv, extension):
+        """Submit a job and wait for its result, the job is dropped if the client closes the connection first
+
+        Exceptions:
+        ConnectionResetError -- if the client closed the connection
+        """
+        job = asyncio.ensure_future(self.submit(data, argv, extension))
+        gone = asyncio.ensure_future(self.__wait_eof__(reader))
+        try:
+            await asyncio.wait([job, gone], return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            gone.cancel()
+            # Cancelling the job cancels its future, which the dispatchers skip
+            if job.done() is False:
+                job.cancel()
+        if job.cancelled() is True:
+            raise ConnectionResetError('client closed the connection')
+        return job.result()
+
+    async def __wait_eof__(self, reader):
+        """Wait until the client closes the connection, anything it sends is ignored """
+        while len(await reader.read(CHUNK_SIZE)) > 0:
+            pass
+
+    async def __read_head__(self, reader):
+        """Read the request line and headers """
+        line = (await reader.readline()).decode('latin-1').strip()
+        parts = line.split()
+        if len(parts) != 3 or parts[2].startswith('HTTP/1.') is False:
+            raise HttpError(400, 'malformed request line')
+        headers = {}
+        while True:
+            line = (await reader.readline()).decode('latin-1')
+            if line in ('\r\n', '\n', ''):
+                break
+            name, _, value = line.partition(':')
+            headers[name.strip().lower()] = value.strip()
+        return parts[0], parts[1], headers
+
+    async def __read_body__(self, reader, headers):
+        """Read a body of the announced length, bounded by max_body """
+        if 'content-length' not in headers:
+            raise HttpError(411, 'Content-Length is required')
+        try:
+            length = int(headers['content-length'])
+        except ValueError:
+            raise HttpError(400, 'malformed Content-Length')
+        if length > self.max_body:
+            raise HttpError(413, 'image is larger than %d bytes' %self.max_body )
+        return await reader.readexactly(length)
+
+    async def __respond__(self, writer, status, body, content_type, headers = None):
+        """Write a whole response """
+        body = body.encode('utf8')
+        head = ['HTTP/1.1 %d %s' %(status, REASONS[status]), 'Content-Type: %s' %content_type,
+            'Content-Length: %d' %len(body), 'Connection: close']
+        for name, value in ({} if headers is None else headers).items():
+            head.append('%s: %s' %(name, value))
+        writer.write(('\r\n'.join(head) + '\r\n\r\n').encode('latin-1') + body)
+        await writer.drain()
+
+    async def __stream__(self, writer, data, content_type):
+        """Write a response in chunks, waiting for the client to take each one """
+        head = ['HTTP/1.1 200 OK', 'Content-Type: %s' %content_type, 'Transfer-Encoding: chunked',
+            'Connection: close']
+        writer.write(('\r\n'.join(head) + '\r\n\r\n').encode('latin-1'))
+        view = memoryview(data)
+        for offset in range(0, len(view), CHUNK_SIZE):
+            chunk = view[offset:offset + CHUNK_SIZE]
+            writer.write(b'%x\r\n' %len(chunk))
+            writer.write(chunk)
+            writer.write(b'\r\n')
+            await writer.drain()
+        writer.write(b'0\r\n\r\n')
+        await writer.drain()
+
+def __init_worker__(threads):
+    """Set up a worker : its thread count, and Ctrl-C left to the server which stops the pool """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    cv2.setNumThreads(threads)
+
+def __warm__():
+    """Nothing to do, imports of the worker are done by now """
+    return os.getpid()
+
+def __process__(pipeline, data, extension):
+    """Decode an image, turn it into a mosaic and encode the result
+
+    Exceptions:
+    ValueError -- if the bytes are not an image OpenCV can decode, or can not be encoded
+    """
+    img = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if img is None:
+        raise ValueError('body is not an image OpenCV can decode')
+    output = pipeline.run(cv2.cvtColor(img, cv2.COLOR_BGR2RGB))
+    ok, encoded = cv2.imencode(extension, cv2.cvtColor(output, cv2.COLOR_RGB2BGR))
+    if ok is False:
+        raise ValueError('mosaic can not be encoded as %s' %extension )
+    return encoded.tobytes()
@@ -0,0 +1,791 @@
+# -*- coding:utf8 -*-
+'''
+    File name: tile.py
+    Author   : Jim00000
+    Created  : 10/18/2026
+'''
+
+__author__    = "Jim00000"
+__copyright__ = "Copyright 2017, the python-mosaic project"
+__license__   = "GNU General Public License v3.0"
+__version__   = "1.0.0"
+
+import os.path
+import shutil
+import struct
+import tempfile
+import zlib
+import numpy as np
+import cv2
+from external.progress.bar import FillingSquaresBar
+from quad.quadtree import QuadTree
+from quad.integral import create_error_engine
+from voronoi.options import CONVERGENCE
+from voronoi.voronoi import assign_labels, update_positions
+from voronoi.backend import get_backend, select_backend
+from plot.plot import STRIP_ROWS, cell_sums, gamma_table, paint_strips
+from plot.writer import create_writer
+
+# Estimated working bytes per pixel of a tile window : the image slice, the float64
+# temporaries of the error metric and of the centroid sums, and the label map
+TILE_PIXEL_BYTES = 128
+# Rows converted at once while an image is spilled to disk
+SPILL_ROWS = 256
+# Seeds read at once from the memory maps of per-seed arrays
+SPILL_SEEDS = 1 << 20
+# Pixels read around a tile for the 5x5 gaussian blur
+BLUR_MARGIN = 2
+
+class TileGrid:
+
+    def __init__(self, width, height, size, halo):
+        """Split an image into square tiles.
+        Every tile owns the pixels of its core and is processed over a window,
+        its core grown by a halo, so that cells crossing a seam see the same
+        seeds from both sides. Windows of tiles whose cells reach past the halo
+        are grown by rings of tiles.
+
+        Keyword arguments:
+        width  -- width of input image
+        height -- height of input image
+        size   -- side of the core of a tile in pixels
+        halo   -- pixels added around the core, at most size
+
+        Attributes:
+        rows, cols -- number of tiles along the height and the width
+        """
+        if size < 1:
+            raise ValueError('Tile size must be positive, got %d' %size )
+        if halo < 0 or halo > size:
+            raise ValueError('Tile halo must be in [0, %d], got %d' %(size, halo) )
+        self.width = width
+        self.height = height
+        self.size = size
+        self.halo = halo
+        self.rows = -(-height // size)
+        self.cols = -(-width // size)
+
+    def tiles(self):
+        """Get (row, col) of every tile in row-major order """
+        return [(row, col) for row in range(self.rows) for col in range(self.cols)]
+
+    def core(self, row, col):
+        """Get the core (x0, y0, x1, y1) of a tile, upper bounds are exclusive """
+        x0 = col * self.size
+        y0 = row * self.size
+        return x0, y0, min(self.width, x0 + self.size), min(self.height, y0 + self.size)
+
+    def window(self, row, col, halo = None):
+        """Get the core of a tile grown by halo (default : None, the grid halo), clipped to the image """
+        if halo is None:
+            halo = self.halo
+        x0, y0, x1, y1 = self.core(row, col)
+        return max(0, x0 - halo), max(0, y0 - halo), min(self.width, x1 + halo), min(self.height, y1 + halo)
+
+    def locate(self, point_x, point_y):
+        """Get the flat index (row * cols + col) of the tile owning every seed """
+        col = np.clip(np.floor(point_x) // self.size, 0, self.cols - 1).astype(np.int64)
+        row = np.clip(np.floor(point_y) // self.size, 0, self.rows - 1).astype(np.int64)
+        return row * self.cols + col
+
+def tiled_mosaic(filename, output_file, memory_budget = 512 << 20, halo = 64, spill_dir = None,
+        min_area = 64, error_rate = 0.5, error_engine = 'slice', gaussian_blur = False,
+        iteration = 5, backend = 'auto', tolerance = None, convergence = 'max',
+        centroidal = False, plot_edge = False, rgb = [0, 0, 0], bold_edge = False, edge_width = 1, gamma = None):
+    """Add mosaic effect to an image with a memory bounded working set.
+    The image, the label map, the output and every per-seed array are kept
+    in memory maps and processed tile by tile, so the working memory is the
+    budget plus arrays over the tiles, whatever the image size, unless cells
+    are larger than the halo and windows grow. The input is loaded within the
+    budget too, see load_image_memmap for the formats it can stream.
+    The output is streamed to a writer in strips, formats that can not be
+    streamed are encoded from a memory map at the end. Every tile seeds its own
+    quadtree, from those seeds the cells and their colors are the ones of the
+    whole image, so a single tile gives the output of MosaicPipeline. With more
+    tiles the quadtree splits blocks at the seams the whole image may keep.
+
+    Keyword arguments:
+    filename      -- input image file, a .npy or .ppm file is mapped as is, a .png file is decoded in strips
+    output_file   -- the output file
+    memory_budget -- working memory of a tile in bytes (default : 512 MB)
+    halo          -- pixels added around every tile, windows grow past it when cells do (default : 64)
+    spill_dir     -- directory receiving the memory maps (default : None, a temporary
+                     directory removed at the end)
+    min_area      -- minimal pixels for each block (default : 64)
+    error_rate    -- maximal error of a leaf (default : 0.5)
+    error_engine  -- one of ERROR_ENGINES (default : 'slice')
+    gaussian_blur -- apply the 5x5 gaussian blur (default : False)
+    iteration     -- iteration, the upper bound with a tolerance (default : 5)
+    backend       -- one of BACKENDS, 'auto' picks the fastest exact backend for a tile
+                     window and the seeds around it (default : 'auto')
+    tolerance     -- stop when the displacement measured by convergence is not
+                     above it (default : None, never stop)
+    convergence   -- one of CONVERGENCE (default : 'max')
+    centroidal    -- use the color of the seed instead of the average color (default : False)
+    plot_edge     -- plot edge for all cells (default : False)
+    rgb           -- color of edges (default : rgb(0, 0, 0) black )
+    bold_edge     -- plot edge with bold line style (default : False)
+    edge_width    -- width of edges in pixels (default : 1)
+    gamma         -- gamma value, or None to leave pixels as they are (default : None)
+    """
+    is_temporary = spill_dir is None
+    if is_temporary is True:
+        spill_dir = tempfile.mkdtemp(prefix='mosaic-')
+    try:
+        img = load_image_memmap(filename, spill_dir, memory_budget)
+        height = img.shape[0]
+        width = img.shape[1]
+        grid = TileGrid(width, height, tile_size(memory_budget, halo), halo)
+        print('Tiles : %d x %d of %d pixels, halo %d' %(grid.cols, grid.rows, grid.size, grid.halo) )
+
+        point_x, point_y = tiled_seeds(img, grid, spill_dir, min_area=min_area, error_rate=error_rate,
+            error_engine=error_engine, gaussian_blur=gaussian_blur)
+        if backend == 'auto':
+            side = grid.size + 2 * grid.halo
+            around = min(point_x.size, 9 * point_x.size // (grid.rows * grid.cols) + 1)
+            backend = select_backend(side, side, around).name
+        print('Voronoi backend : %s, %d threads' %(backend, get_backend(backend).thread_count()) )
+        labels = tiled_relaxation(grid, point_x, point_y, spill_dir, iteration=iteration, backend=backend,
+            tolerance=tolerance, convergence=convergence)
+
+        # Strips of the output fit in the budget too
+        strip_rows = max(1, memory_budget // (width * TILE_PIXEL_BYTES))
+        with create_writer(output_file, width, height, spill_dir=spill_dir) as sink:
+            tiled_render(img, grid, point_x, point_y, labels, sink, spill_dir, centroidal=centroidal,
+                plot_edge=plot_edge, rgb=rgb, bold_edge=bold_edge, edge_width=edge_width,
+                gaussian_blur=gaussian_blur, gamma=gamma, strip_rows=strip_rows)
+        del img, point_x, point_y, labels
+    finally:
+        if is_temporary is True:
+            shutil.rmtree(spill_dir, ignore_errors=True)
+
+def tile_size(memory_budget, halo):
+    """Get the largest tile core whose window fits in a memory budget
+
+    Keyword arguments:
+    memory_budget -- working memory of a tile in bytes
+    halo          -- pixels added around the core
+
+    Return:
+    size -- side of the core of a tile, at least halo and at least 1
+    """
+    side = int(np.sqrt(memory_budget / TILE_PIXEL_BYTES))
+    return max(1, halo, side - 2 * halo)
+
+def image_shape(filename):
+    """Read the size of a PNG, JPEG, BMP or PPM image from its header, without decoding it
+
+    Keyword arguments:
+    filename -- image file
+
+    Return:
+    shape -- (height, width), or None for other formats
+    """
+    with open(filename, 'rb') as f:
+        head = f.read(32)
+        if head[:8] == b'\x89PNG\r\n\x1a\n' and head[12:16] == b'IHDR':
+            width, height = struct.unpack('>II', head[16:24])
+            return height, width
+        if head[:2] == b'BM' and len(head) >= 26:
+            width, height = struct.unpack('<ii', head[18:26])
+            return abs(height), width
+        if head[:2] in (b'P3', b'P6'):
+            fields = []
+            for line in (head + f.read(256)).split(b'\n'):
+                fields += line.split(b'#')[0].split()
+                if len(fields) >= 3:
+                    return int(fields[2]), int(fields[1])
+            return None
+        if head[:2] == b'\xff\xd8':
+            f.seek(2)
+            while True:
+                marker = f.read(4)
+                if len(marker) < 4 or marker[0] != 0xff:
+                    return None
+                length = struct.unpack('>H', marker[2:])[0]
+                # Start of frame markers, leaving out DHT, JPG and DAC
+                if 0xc0 <= marker[1] <= 0xcf and marker[1] not in (0xc4, 0xc8, 0xcc):
+                    height, width = struct.unpack('>xHH', f.read(5))
+                    return height, width
+                f.seek(length - 2, os.SEEK_CUR)
+    return None
+
+def load_image_memmap(filename, spill_dir, memory_budget = None):
+    """Get an RGB image as a read-only memory map.
+    A .npy file (height x width x 3, uint8, RGB) and a binary PPM with 8 bit
+    samples are mapped as they are. A non-interlaced PNG of 8 or 16 bit gray,
+    RGB or RGBA samples is decoded in strips of rows spilled to disk. Other
+    files are decoded whole by OpenCV and then spilled to disk, so they are
+    refused when the decoded image is larger than the memory budget.
+
+    Keyword arguments:
+    filename      -- input image file
+    spill_dir     -- directory receiving the spilled image
+    memory_budget -- bytes a strip is decoded within, and above which an image
+                     decoded whole is refused (default : None, no limit)
+
+    Return:
+    img -- three-dimensions uint8 memory map in RGB order
+
+    Exceptions:
+    ValueError -- if the file is not a three channels uint8 image, or if it is
+                  decoded whole and takes more memory than the budget
+    """
+    if filename.endswith('.npy'):
+        img = np.load(filename, mmap_mode='r')
+    else:
+        img = __map_ppm__(filename)
+    if img is None:
+        path = os.path.join(spill_dir, 'image.npy')
+        png = __png_strips__(filename)
+        if png is not None:
+            height, width, decode = png
+            rows = SPILL_ROWS if memory_budget is None else max(1, memory_budget // (width * TILE_PIXEL_BYTES))
+            img = np.lib.format.open_memmap(path, mode='w+', dtype=np.uint8, shape=(height, width, 3))
+            y0 = 0
+            for strip in decode(rows):
+                img[y0:y0 + strip.shape[0]] = strip
+                y0 += strip.shape[0]
+            if y0 != height:
+                raise ValueError('Truncated PNG \'%s\', %d of %d rows' %(filename, y0, height) )
+        else:
+            shape = image_shape(filename) if memory_budget is not None else None
+            if shape is not None:
+                __check_decode__(filename, shape[0] * shape[1] * 3, memory_budget)
+            bgr = cv2.imread(filename)
+            if bgr is None:
+                raise ValueError('Can not decode image \'%s\'' %filename )
+            if memory_budget is not None and shape is None:
+                __check_decode__(filename, bgr.nbytes, memory_budget)
+            img = np.lib.format.open_memmap(path, mode='w+', dtype=np.uint8, shape=bgr.shape)
+            for y0 in range(0, bgr.shape[0], SPILL_ROWS):
+                img[y0:y0 + SPILL_ROWS] = cv2.cvtColor(bgr[y0:y0 + SPILL_ROWS], cv2.COLOR_BGR2RGB)
+            del bgr
+        img.flush()
+        img = np.load(path, mmap_mode='r')
+    if img.ndim != 3 or img.shape[2] != 3 or img.dtype != np.uint8:
+        raise ValueError('Expect a height x width x 3 uint8 image, got %s %s' %(img.shape, img.dtype) )
+    return img
+
+def read_tile(img, x0, y0, x1, y1, gaussian_blur = False):
+    """Read pixels of a rectangle the way the whole image pipeline sees them.
+    The blur reads a margin around the rectangle, so a tile is blurred exactly
+    like the same pixels of the whole image.
+
+    Keyword arguments:
+    img           -- input image, array or memory map
+    x0, y0        -- upper-left corner of the rectangle
+    x1, y1        -- lower-right corner of the rectangle, exclusive
+    gaussian_blur -- apply the 5x5 gaussian blur (default : False)
+
+    Return:
+    pixels -- three-dimensions uint8 array of the rectangle
+    """
+    if gaussian_blur is True:
+        height = img.shape[0]
+        width = img.shape[1]
+        mx0 = max(0, x0 - BLUR_MARGIN)
+        my0 = max(0, y0 - BLUR_MARGIN)
+        mx1 = min(width, x1 + BLUR_MARGIN)
+        my1 = min(height, y1 + BLUR_MARGIN)
+        pixels = cv2.GaussianBlur(np.ascontiguousarray(img[my0:my1, mx0:mx1]), (5, 5), 0)
+        pixels = pixels[y0 - my0:y1 - my0, x0 - mx0:x1 - mx0]
+    else:
+        pixels = img[y0:y1, x0:x1]
+    return np.ascontiguousarray(pixels)
+
+def tiled_seeds(img, grid, spill_dir, min_area = 64, error_rate = 0.5, error_engine = 'slice', gaussian_blur = False):
+    """Generate seeds tile by tile.
+    Every tile core gets its own quadtree, so blocks never cross a seam.
+
+    Keyword arguments:
+    img           -- input image, array or memory map
+    grid          -- the TileGrid
+    spill_dir     -- directory receiving the seeds
+    min_area      -- minimal pixels for each block (default : 64)
+    error_rate    -- maximal error of a leaf (default : 0.5)
+    error_engine  -- one of ERROR_ENGINES (default : 'slice')
+    gaussian_blur -- apply the 5x5 gaussian blur (default : False)
+
+    Return:
+    point_x -- collections of x position of seeds in one-dimension memory map
+    point_y -- collections of y position of seeds in one-dimension memory map
+    """
+    bar = FillingSquaresBar('Seeding', max=grid.rows * grid.cols)
+    path = os.path.join(spill_dir, 'seeds.bin')
+    with open(path, 'wb') as f:
+        for row, col in grid.tiles():
+            bar.next()
+            x0, y0, x1, y1 = grid.core(row, col)
+            pixels = read_tile(img, x0, y0, x1, y1, gaussian_blur)
+            engine = create_error_engine(error_engine, pixels, min_area=min_area)
+            points_x, points_y = QuadTree(pixels, min_area=min_area,
+                error_rate=error_rate, error_engine=engine).generate_seeds()
+            np.column_stack((points_x + x0, points_y + y0)).astype(np.float64).tofile(f)
+    bar.finish()
+
+    points = np.memmap(path, dtype=np.float64, mode='r').reshape(-1, 2)
+    return __spill__(spill_dir, 'point_x.bin', points[:, 0]), __spill__(spill_dir, 'point_y.bin', points[:, 1])
+
+def tiled_relaxation(grid, point_x, point_y, spill_dir, iteration = 3, backend = 'kdtree', tolerance = None,
+        convergence = 'max', displacements = None):
+    """Implement of Lloyd’s algorithm tile by tile.
+    Each seed is owned by the tile containing it and is moved to the centroid
+    of its cell, labelled over the window of that tile with the seeds of the
+    tiles around it. A window is grown by a ring of tiles until its labels are
+    the ones of the whole image, so the seeds and the labels are exactly the
+    ones generate_voronoi_diagram gives for the same seeds. All the seeds move
+    at once per iteration, the moved seeds are kept in memory maps of the
+    spill directory.
+
+    Keyword arguments:
+    grid          -- the TileGrid
+    point_x       -- collections of x position of seeds in one-dimension array, updated in place
+    point_y       -- collections of y position of seeds in one-dimension array, updated in place
+    spill_dir     -- directory receiving the label map, the moved seeds and the seeds sorted by tile
+    iteration     -- iteration, the upper bound with a tolerance (default : 3)
+    backend       -- one of BACKENDS except 'auto' (default : 'kdtree')
+    tolerance     -- stop when the displacement measured by convergence is not
+                     above it (default : None, never stop)
+    convergence   -- one of CONVERGENCE (default : 'max')
+    displacements -- list receiving (max, mean, moved) of every iteration (default : None)
+
+    Return:
+    labels -- two-dimensions int32 memory map, index of the seed owning every pixel
+              before the last move, as generate_voronoi_diagram returns it
+    """
+    if convergence not in CONVERGENCE:
+        raise ValueError('Unknown convergence criterion \'%s\'' %convergence )
+    if iteration < 1:
+        return tiled_labels(grid, point_x, point_y, spill_dir, backend=backend)
+
+    labels = np.lib.format.open_memmap(os.path.join(spill_dir, 'labels.npy'), mode='w+',
+        dtype=np.int32, shape=(grid.height, grid.width))
+    new_x = __spill__(spill_dir, 'next_x.bin', point_x)
+    new_y = __spill__(spill_dir, 'next_y.bin', point_y)
+    bar = FillingSquaresBar('Processing', max=iteration)
+    for i in range(iteration):
+        bar.next()
+        buckets = __buckets__(grid, point_x, point_y, spill_dir)
+        largest = 0.0
+        total = 0.0
+        moved = 0
+        for row, col in grid.tiles():
+            owned, index, window, local_labels = __window_labels__(grid, buckets, point_x, point_y,
+                row, col, backend, cells=True)
+            x0, y0, x1, y1 = window
+            cx0, cy0, cx1, cy1 = grid.core(row, col)
+            labels[cy0:cy1, cx0:cx1] = index[local_labels[cy0 - y0:cy1 - y0, cx0 - x0:cx1 - x0]]
+            if owned.size == 0:
+                continue
+            # Centroids in image coordinates round the way they do on the whole image
+            near_x = point_x[index]
+            near_y = point_y[index]
+            update_positions(local_labels, near_x, near_y, origin=(x0, y0))
+            # Keep the moves of the seeds of the tile only
+            where = np.searchsorted(index, owned)
+            moved_x = near_x[where]
+            moved_y = near_y[where]
+            shift = np.hypot(moved_x - point_x[owned], moved_y - point_y[owned])
+            new_x[owned] = moved_x
+            new_y[owned] = moved_y
+            largest = max(largest, float(shift.max()))
+            total += float(shift.sum())
+            moved += int(np.count_nonzero(shift))
+
+        point_x[:] = new_x
+        point_y[:] = new_y
+        measure = {
+            'max' : largest,
+            'mean' : total / point_x.size if point_x.size > 0 else 0.0,
+            'moved' : moved
+        }
+        if displacements is not None:
+            displacements.append((measure['max'], measure['mean'], measure['moved']))
+        if tolerance is not None:
+            print('\nIteration %d : max displacement %.3f, mean displacement %.3f, %d seeds moved'
+                %(i + 1, measure['max'], measure['mean'], measure['moved']) )
+            if measure[convergence] <= tolerance:
+                break
+    bar.finish()
+    labels.flush()
+    return labels
+
+def tiled_labels(grid, point_x, point_y, spill_dir, backend = 'kdtree'):
+    """Label every pixel with its nearest seed tile by tile
+
+    Keyword arguments:
+    grid      -- the TileGrid
+    point_x   -- collections of x position of seeds in one-dimension array
+    point_y   -- collections of y position of seeds in one-dimension array
+    spill_dir -- directory receiving the label map and the seeds sorted by tile
+    backend   -- one of BACKENDS except 'auto' (default : 'kdtree')
+
+    Return:
+    labels -- two-dimensions int32 memory map, index of the seed owning every pixel
+    """
+    labels = np.lib.format.open_memmap(os.path.join(spill_dir, 'labels.npy'), mode='w+',
+        dtype=np.int32, shape=(grid.height, grid.width))
+    buckets = __buckets__(grid, point_x, point_y, spill_dir)
+    for row, col in grid.tiles():
+        owned, index, window, local_labels = __window_labels__(grid, buckets, point_x, point_y, row, col, backend)
+        x0, y0, x1, y1 = window
+        cx0, cy0, cx1, cy1 = grid.core(row, col)
+        labels[cy0:cy1, cx0:cx1] = index[local_labels[cy0 - y0:cy1 - y0, cx0 - x0:cx1 - x0]]
+    labels.flush()
+    return labels
+
+def tiled_render(img, grid, point_x, point_y, labels, sink, spill_dir, centroidal = False, plot_edge = False,
+        rgb = [0, 0, 0], bold_edge = False, edge_width = 1, gaussian_blur = False, gamma = None,
+        strip_rows = STRIP_ROWS):
+    """Color every cell and stream the output to a writer.
+    A first pass gathers the color of every cell tile by tile, a second pass
+    paints strips of rows as BGR. Sums, counts and colors of the cells are
+    memory maps of the spill directory, a tile updates the cells it covers.
+    Colors are the ones render gives, gamma is applied to cell colors.
+
+    Keyword arguments:
+    img           -- input image, array or memory map
+    grid          -- the TileGrid
+    point_x       -- collections of x position of seeds in one-dimension array
+    point_y       -- collections of y position of seeds in one-dimension array
+    labels        -- two-dimensions array, index of the seed owning every pixel
+    sink          -- writer receiving BGR strips, e.g. from create_writer
+    spill_dir     -- directory receiving the colors of the cells
+    centroidal    -- use the color of the seed instead of the average color (default : False)
+    plot_edge     -- plot edge for all cells (default : False)
+    rgb           -- color of edges (default : rgb(0, 0, 0) black )
+    bold_edge     -- plot edge with bold line style (default : False)
+    edge_width    -- width of edges in pixels (default : 1)
+    gaussian_blur -- apply the 5x5 gaussian blur (default : False)
+    gamma         -- gamma value, or None to leave pixels as they are (default : None)
+    strip_rows    -- rows of every strip (default : STRIP_ROWS)
+    """
+    size = point_x.size
+    colors = np.memmap(os.path.join(spill_dir, 'colors.bin'), dtype=np.uint8, mode='w+', shape=(size, 3))
+    table = None if gamma is None else gamma_table(gamma)
+
+    bar = FillingSquaresBar('Plotting', max=grid.rows * grid.cols)
+    if centroidal is True:
+        order, begin = __buckets__(grid, point_x, point_y, spill_dir)
+        for row, col in grid.tiles():
+            bar.next()
+            t = row * grid.cols + col
+            seeds = order[begin[t]:begin[t + 1]]
+            # A seed rounds at most one pixel past the core of its tile
+            x0, y0, x1, y1 = grid.window(row, col, 1)
+            pixels = read_tile(img, x0, y0, x1, y1, gaussian_blur)
+            seed_color = pixels[np.round(point_y[seeds]).astype(np.int64) - y0,
+                np.round(point_x[seeds]).astype(np.int64) - x0]
+            colors[seeds] = (seed_color if table is None else table[seed_color])[:, ::-1]
+    else:
+        # New files are zero filled
+        sums = np.memmap(os.path.join(spill_dir, 'sums.bin'), dtype=np.float64, mode='w+', shape=(size, 3))
+        counts = np.memmap(os.path.join(spill_dir, 'counts.bin'), dtype=np.int64, mode='w+', shape=(size,))
+        for row, col in grid.tiles():
+            bar.next()
+            x0, y0, x1, y1 = grid.core(row, col)
+            pixels = read_tile(img, x0, y0, x1, y1, gaussian_blur)
+            tile_labels = np.asarray(labels[y0:y1, x0:x1])
+            # Number the cells of the tile from 0, so sums stay as small as the tile
+            cells, local = np.unique(tile_labels, return_inverse=True)
+            tile_counts, tile_sums = cell_sums(pixels, local.reshape(tile_labels.shape), cells.size, table)
+            counts[cells] += tile_counts
+            sums[cells] += tile_sums
+        for i0 in range(0, size, SPILL_SEEDS):
+            i1 = min(size, i0 + SPILL_SEEDS)
+            colors[i0:i1] = (sums[i0:i1] / np.maximum(counts[i0:i1], 1)[:, np.newaxis]).astype(np.uint8)[:, ::-1]
+        del sums, counts
+    bar.finish()
+
+    paint_strips(colors, labels, sink, plot_edge, rgb[::-1], bold_edge, edge_width, strip_rows)
+
+def __buckets__(grid, point_x, point_y, spill_dir):
+    """Sort seeds by the tile owning them into a memory map of the spill directory.
+    Seeds of the tile t are order[begin[t]:begin[t + 1]], in increasing index.
+    Seeds are read in chunks, so only arrays over the tiles stay in memory.
+    """
+    size = point_x.size
+    tiles = grid.rows * grid.cols
+    counts = np.zeros(tiles, dtype=np.int64)
+    for i0 in range(0, size, SPILL_SEEDS):
+        counts += np.bincount(grid.locate(point_x[i0:i0 + SPILL_SEEDS], point_y[i0:i0 + SPILL_SEEDS]),
+            minlength=tiles)
+    begin = np.zeros(tiles + 1, dtype=np.int64)
+    np.cumsum(counts, out=begin[1:])
+
+    order = np.memmap(os.path.join(spill_dir, 'order.bin'), dtype=np.int64, mode='w+', shape=(size,))
+    filled = begin[:-1].copy()
+    for i0 in range(0, size, SPILL_SEEDS):
+        tile = grid.locate(point_x[i0:i0 + SPILL_SEEDS], point_y[i0:i0 + SPILL_SEEDS])
+        chunk = np.argsort(tile, kind='stable')
+        tile = tile[chunk]
+        # Rank of every seed among the seeds of its tile in the chunk
+        rank = np.arange(tile.size) - np.searchsorted(tile, tile)
+        order[filled[tile] + rank] = chunk + i0
+        filled += np.bincount(tile, minlength=tiles)
+    return order, begin
+
+def __window_labels__(grid, buckets, point_x, point_y, row, col, backend, cells = False):
+    """Label the window of a tile with the seeds of the tiles around it.
+    The window starts as the core grown by the halo with the seeds of the tile
+    and its eight neighbors, and grows by a ring of tiles until the labels of
+    the core, and with cells the whole cells of the seeds of the tile, are the
+    ones of the whole image.
+
+    Return:
+    owned  -- seeds owned by the tile
+    index  -- sorted seeds labelling the window
+    window -- (x0, y0, x1, y1) of the window
+    labels -- two-dimensions int32 array over the window, position of the owner in index
+    """
+    order, begin = buckets
+    t = row * grid.cols + col
+    owned = np.asarray(order[begin[t]:begin[t + 1]])
+    ring = 1
+    while True:
+        r0, r1 = max(0, row - ring), min(grid.rows, row + ring + 1)
+        c0, c1 = max(0, col - ring), min(grid.cols, col + ring + 1)
+        # Tiles of a row are contiguous in order
+        index = np.sort(np.concatenate([order[begin[r * grid.cols + c0]:begin[r * grid.cols + c1]]
+            for r in range(r0, r1)]))
+        window = grid.window(row, col, grid.halo + (ring - 1) * grid.size)
+        if index.size > 0:
+            x0, y0, x1, y1 = window
+            local_x = point_x[index] - x0
+            local_y = point_y[index] - y0
+            labels = assign_labels(backend, x1 - x0, y1 - y0, local_x, local_y)
+            # Every seed left out lies past the tiles of the ring
+            region = (c0 * grid.size, r0 * grid.size, min(grid.width, c1 * grid.size),
+                min(grid.height, r1 * grid.size))
+            mine = np.isin(index, owned) if cells is True else None
+            if __is_exact__(grid, grid.core(row, col), window, region, labels, local_x, local_y, mine) is True:
+                return owned, index, window, labels
+        ring += 1
+
+def __is_exact__(grid, core, window, region, labels, point_x, point_y, mine = None):
+    """Check that labels of a window are the ones of the whole image.
+    A pixel keeps its owner if it is closer to it than to the sides of the
+    region holding the seeds of the window, every seed left out lies past them.
+    Pixels of the core are checked, and with mine, a boolean array over the
+    seeds, the pixels of their cells too. Those cells, bounded by the bisectors
+    with the cells next to them, must not reach a side of the window either, a
+    cell is convex so no pixel past the window belongs to it. Seeds are given
+    in window coordinates.
+    """
+    x0, y0, x1, y1 = window
+    rx0, ry0, rx1, ry1 = region
+    height, width = labels.shape
+
+    # Distance from every column and every row to the sides of the region inside the image
+    xs = np.arange(x0, x1, dtype=np.float64)
+    ys = np.arange(y0, y1, dtype=np.float64)
+    margin_x = np.full(width, np.inf)
+    margin_y = np.full(height, np.inf)
+    if rx0 > 0:
+        margin_x = np.minimum(margin_x, xs - rx0)
+    if rx1 < grid.width:
+        margin_x = np.minimum(margin_x, rx1 - xs)
+    if ry0 > 0:
+        margin_y = np.minimum(margin_y, ys - ry0)
+    if ry1 < grid.height:
+        margin_y = np.minimum(margin_y, ry1 - ys)
+    if np.isfinite(margin_x).any() or np.isfinite(margin_y).any():
+        checked = np.zeros(labels.shape, dtype=bool) if mine is None else mine[labels]
+        cx0, cy0, cx1, cy1 = core
+        checked[cy0 - y0:cy1 - y0, cx0 - x0:cx1 - x0] = True
+        dx = (xs - x0)[np.newaxis, :] - point_x[labels]
+        dy = (ys - y0)[:, np.newaxis] - point_y[labels]
+        margin = np.minimum(margin_x[np.newaxis, :], margin_y[:, np.newaxis])
+        if np.any(checked & (dx * dx + dy * dy >= margin * margin)):
+            return False
+    if mine is None:
+        return True
+
+    # Sides of the window which are not sides of the image, as (axis, position)
+    sides = list()
+    if x0 > 0:
+        sides.append((0, -0.5))
+    if x1 < grid.width:
+        sides.append((0, width - 0.5))
+    if y0 > 0:
+        sides.append((1, -0.5))
+    if y1 < grid.height:
+        sides.append((1, height - 0.5))
+    if len(sides) == 0:
+        return True
+
+    # Cells next to each other, from pixels next to each other
+    across = labels[:, :-1] != labels[:, 1:]
+    down = labels[:-1] != labels[1:]
+    first = np.concatenate((labels[:, :-1][across], labels[:, 1:][across], labels[:-1][down], labels[1:][down]))
+    second = np.concatenate((labels[:, 1:][across], labels[:, :-1][across], labels[1:][down], labels[:-1][down]))
+    keep = mine[first]
+    size = point_x.size
+    pairs = np.unique(first[keep].astype(np.int64) * size + second[keep])
+    first = pairs // size
+    second = pairs % size
+
+    # A seed sharing the position of a seed with a smaller index owns nothing
+    checked = mine.copy()
+    empty = np.bincount(labels.ravel(), minlength=size) == 0
+    if np.any(mine & empty):
+        _, where, inverse = np.unique(np.column_stack((point_x, point_y)), axis=0,
+            return_index=True, return_inverse=True)
+        checked &= ~(empty & (where[inverse.ravel()] < np.arange(size)))
+
+    for axis, position in sides:
+        su, sv = (point_x, point_y) if axis == 0 else (point_y, point_x)
+        # Range of the other coordinate inside the image
+        lo, hi = (-y0, grid.height - 1 - y0) if axis == 0 else (-x0, grid.width - 1 - x0)
+        reach = __reaches__(position, su, sv, first, second, lo, hi)
+        if np.any(reach & checked):
+            return False
+    return True
+
+def __reaches__(position, su, sv, first, second, lo, hi):
+    """Check which cells, bounded by the bisectors with their neighbors, reach the
+    line u = position between v = lo and v = hi. A point q of the cell of s is
+    not closer to a neighbor t, that is 2 q . (t - s) <= |t|^2 - |s|^2.
+    """
+    a = 2 * (sv[second] - sv[first])
+    b = (su[second] ** 2 + sv[second] ** 2 - su[first] ** 2 - sv[first] ** 2 -
+        2 * position * (su[second] - su[first]))
+    low = np.full(su.size, float(lo))
+    high = np.full(su.size, float(hi))
+    upper = a > 0
+    np.minimum.at(high, first[upper], b[upper] / a[upper])
+    lower = a < 0
+    np.maximum.at(low, first[lower], b[lower] / a[lower])
+    high[first[(a == 0) & (b < 0)]] = -np.inf
+    # Rounding errors only make a cell reach the line
+    return low <= high + 1e-6
+
+def __check_decode__(filename, size, memory_budget):
+    """Refuse to decode an image whole when it takes more memory than the budget """
+    if size > memory_budget:
+        raise ValueError('Decoding \'%s\' takes %.1f MB, above the memory budget of %.1f MB, convert it to '
+            '.npy, .ppm or a non-interlaced .png to load it within the budget'
+            %(filename, size / (1 << 20), memory_budget / (1 << 20)) )
+
+def __map_ppm__(filename):
+    """Map the samples of a binary PPM with 8 bit samples, or get None for other files """
+    with open(filename, 'rb') as f:
+        head = f.read(512)
+    if head[:2] != b'P6':
+        return None
+    # Magic number, width, height and maxval, separated by blanks and comments
+    fields = list()
+    offset = 2
+    while len(fields) < 3:
+        while offset < len(head) and head[offset:offset + 1] in b' \t\r\n#':
+            if head[offset:offset + 1] == b'#':
+                offset = head.find(b'\n', offset)
+                if offset < 0:
+                    return None
+            offset += 1
+        end = offset
+        while end < len(head) and head[end:end + 1].isdigit() is True:
+            end += 1
+        if end == offset:
+            return None
+        fields.append(int(head[offset:end]))
+        offset = end
+    width, height, maxval = fields
+    if maxval != 255:
+        return None
+    # A single blank ends the header
+    return np.memmap(filename, dtype=np.uint8, mode='r', offset=offset + 1, shape=(height, width, 3))
+
+def __png_strips__(filename):
+    """Get (height, width, decode) of a non-interlaced PNG of 8 or 16 bit gray, RGB or
+    RGBA samples, or None for other files. decode(rows) yields RGB strips of rows.
+    The compressed rows are inflated strip by strip, and every strip is decoded by
+    OpenCV as a PNG of its own, led by the last row of the previous strip which
+    its filters refer to, so strips are the rows of the whole image decoded.
+    """
+    signature = b'\x89PNG\r\n\x1a\n'
+    with open(filename, 'rb') as f:
+        head = f.read(33)
+    if head[:8] != signature or head[12:16] != b'IHDR':
+        return None
+    width, height, depth, color, _, _, interlace = struct.unpack('>IIBBBBB', head[16:29])
+    if depth not in (8, 16) or color not in (0, 2, 6) or interlace != 0:
+        return None
+    channels = {0 : 1, 2 : 3, 6 : 4}[color]
+    stride = width * channels * depth // 8 + 1
+
+    def compressed():
+        # IDAT chunks read in pieces, a chunk may hold the whole image
+        with open(filename, 'rb') as f:
+            f.seek(8)
+            while True:
+                header = f.read(8)
+                if len(header) < 8:
+                    return
+                length, kind = struct.unpack('>I4s', header)
+                if kind == b'IEND':
+                    return
+                if kind != b'IDAT':
+                    f.seek(length + 4, os.SEEK_CUR)
+                    continue
+                while length > 0:
+                    piece = f.read(min(length, 1 << 20))
+                    if len(piece) == 0:
+                        return
+                    length -= len(piece)
+                    yield piece
+                f.seek(4, os.SEEK_CUR)
+
+    def strip_png(rows, data):
+        def chunk(kind, content):
+            return (struct.pack('>I', len(content)) + kind + content +
+                struct.pack('>I', zlib.crc32(content, zlib.crc32(kind)) & 0xffffffff))
+        return np.frombuffer(signature + chunk(b'IHDR', struct.pack('>IIBBBBB', width, rows, depth, color, 0, 0, 0)) +
+            chunk(b'IDAT', zlib.compress(data, 0)) + chunk(b'IEND', b''), dtype=np.uint8)
+
+    def strip(data, previous):
+        # Rows of data unfiltered as RGB, and the last row as stored
+        count = len(data) // stride
+        if previous is not None:
+            # The previous row, unfiltered, leads since filters of the first row refer to it
+            data = b'\x00' + previous + data
+        pixels = cv2.imdecode(strip_png(count + (previous is not None), data), cv2.IMREAD_UNCHANGED)
+        if pixels is None:
+            raise ValueError('Can not decode image \'%s\'' %filename )
+        pixels = pixels[-count:]
+        if pixels.ndim == 2:
+            pixels = pixels[:, :, np.newaxis]
+        # OpenCV gives BGR or BGRA samples in native order
+        last = pixels[-1] if channels == 1 else pixels[-1][:, [2, 1, 0, 3][:channels]]
+        last = last.astype('>u2' if depth == 16 else np.uint8).tobytes()
+        if depth == 16:
+            pixels = (pixels >> 8).astype(np.uint8)
+        return (np.repeat(pixels, 3, axis=2) if channels == 1 else pixels[:, :, 2::-1]), last
+
+    def decode(rows):
+        inflater = zlib.decompressobj()
+        pending = bytearray()
+        previous = None
+        size = rows * stride
+        for piece in compressed():
+            while len(piece) > 0:
+                # Inflate at most a strip, pending stays within it
+                pending += inflater.decompress(piece, size - len(pending))
+                piece = inflater.unconsumed_tail
+                if len(pending) == size:
+                    pixels, previous = strip(bytes(pending), previous)
+                    del pending[:]
+                    yield pixels
+        pending += inflater.flush()
+        if len(pending) >= stride:
+            pixels, previous = strip(bytes(pending[:len(pending) // stride * stride]), previous)
+            yield pixels
+
+    return height, width, decode
+
+def __spill__(spill_dir, name, data):
+    """Copy an array to a writable memory map in the spill directory """
+    out = np.memmap(os.path.join(spill_dir, name), dtype=data.dtype, mode='w+', shape=data.shape)
+    out[:] = data
+    return out
@@ -0,0 +1,233 @@
+# -*- coding:utf8 -*-
+'''
+    File name: video.py
+    Author   : Jim00000
+    Created  : 10/18/2026
+'''
+
+__author__    = "Jim00000"
+__copyright__ = "Copyright 2017, the python-mosaic project"
+__license__   = "GNU General Public License v3.0"
+__version__   = "1.0.0"
+
+import time
+import numpy as np
+import cv2
+from quad.quadtree import QuadTree
+from quad.integral import create_error_engine
+from voronoi.voronoi import generate_voronoi_diagram
+from voronoi.kdtree import kdtree_nearest
+from voronoi.delaunay import delaunay_voronoi_diagram
+from tile.tile import TileGrid
+from plot.plot import render
+
+class SequenceMosaic:
+
+    def __init__(self, pipeline, block = 64, change_threshold = 8.0, tolerance = 1.0, convergence = 'mean'):
+        """Mosaic of a sequence of frames, warm-started from the previous frame.
+        Frames are split into blocks, and seeds are rebuilt with a quadtree only
+        in blocks whose content changed since their seeds were built. Only seeds
+        of changed blocks and of the blocks around them are relaxed, starting
+        from where the previous frame left them. Other seeds keep their place,
+        so cells do not flicker where the picture is still, and a frame without
+        changes reuses the label map of the previous one.
+
+        Keyword arguments:
+        pipeline         -- the MosaicPipeline giving the options of every stage
+        block            -- side of the blocks compared between frames in pixels (default : 64)
+        change_threshold -- mean absolute difference of a block, over 0-255 channels,
+                            above which its seeds are rebuilt (default : 8.0)
+        tolerance        -- stop iterating once the seed displacement is not above it, the
+                            iteration of the pipeline is the upper bound (default : 1.0)
+        convergence      -- one of CONVERGENCE, the displacement compared with the tolerance.
+                            Seeds are rounded to pixels, so some always move by a pixel and
+                            the mean settles first (default : 'mean')
+        """
+        self.pipeline = pipeline
+        self.block = block
+        self.change_threshold = change_threshold
+        self.tolerance = tolerance
+        self.convergence = convergence
+        self.grid = None
+        self.reference = None
+        self.point_x = None
+        self.point_y = None
+        self.labels = None
+        self.labelled_x = None
+        self.labelled_y = None
+
+    def frame(self, img):
+        """Turn the next frame into a mosaic
+
+        Keyword arguments:
+        img -- three-dimensions array represents rgb of the frame
+
+        Return:
+        output -- three-dimensions uint8 array represents bgr of the mosaic
+        stats  -- dictionary of reseeded blocks, blocks, seeds and iterations
+        """
+        pipeline = self.pipeline
+        img = pipeline.prepare(img)
+        height = img.shape[0]
+        width = img.shape[1]
+
+        # Start over on the first frame, or when the frame size changes
+        if self.grid is None or self.grid.width != width or self.grid.height != height:
+            self.grid = TileGrid(width, height, self.block, 0)
+            self.reference = img.copy()
+            self.point_x = np.empty(0, dtype=np.float64)
+            self.point_y = np.empty(0, dtype=np.float64)
+            self.labels = None
+            changed = np.ones((self.grid.rows, self.grid.cols), dtype=bool)
+        else:
+            changed = self.__changed_blocks__(img)
+
+        displacements = list()
+        # Seeds every iteration labelled pixels for, the last labels belong to the last but one
+        history = list()
+
+        def on_iteration(i, point_x, point_y, labels, measure):
+            history.append((point_x.copy(), point_y.copy()))
+
+        if self.labels is None:
+            self.__reseed__(img, changed)
+            history.append((self.point_x.copy(), self.point_y.copy()))
+            self.labels = generate_voronoi_diagram(width, height, self.point_x, self.point_y,
+                iteration = pipeline.iteration, backend = pipeline.backend, report_jfa = pipeline.report_jfa,
+                tolerance = self.tolerance, convergence = self.convergence, displacements = displacements,
+                incremental = pipeline.incremental, revisit_moved = pipeline.revisit_moved,
+                coarse_scale = pipeline.coarse_scale, fine_iteration = pipeline.fine_iteration,
+                on_iteration = on_iteration, report_backend = pipeline.report_backend)
+        elif bool(changed.any()) is True:
+            warm = self.__reseed__(img, changed)
+            history.append((self.point_x.copy(), self.point_y.copy()))
+            # Cells of changed blocks reach into the neighboring blocks
+            active = cv2.dilate(changed.astype(np.uint8), np.ones((3, 3), dtype=np.uint8)) > 0
+            fixed = ~active.ravel()[self.grid.locate(self.point_x, self.point_y)]
+            # Only pixels near seeds that moved are reassigned
+            self.labels = generate_voronoi_diagram(width, height, self.point_x, self.point_y,
+                iteration = pipeline.iteration, backend = pipeline.backend, tolerance = self.tolerance,
+                convergence = self.convergence, displacements = displacements, incremental = True,
+                revisit_moved = True, fixed = fixed, labels = warm, on_iteration = on_iteration)
+        if len(history) > 0:
+            self.labelled_x, self.labelled_y = history[max(0, len(history) - 2)]
+        labels = self.labels
+
+        output = render(img, self.point_x, self.point_y, labels, centroidal = pipeline.centroidal,
+            gamma = pipeline.gamma, plot_edge = pipeline.plot_edge, rgb = pipeline.rgb,
+            bold_edge = pipeline.bold_edge, edge_width = pipeline.edge_width)
+        stats = {
+            'reseeded' : int(np.count_nonzero(changed)),
+            'blocks' : int(changed.size),
+            'seeds' : int(self.point_x.size),
+            'iterations' : len(displacements)
+        }
+        return output, stats
+
+    def __changed_blocks__(self, img):
+        """Get blocks whose mean absolute difference with the reference is above the threshold """
+        diff = cv2.absdiff(img, self.reference).astype(np.float32).sum(axis=2)
+        rows = np.arange(0, self.grid.height, self.block)
+        cols = np.arange(0, self.grid.width, self.block)
+        sums = np.add.reduceat(np.add.reduceat(diff, rows, axis=0), cols, axis=1)
+        counts = np.outer(np.diff(np.append(rows, self.grid.height)), np.diff(np.append(cols, self.grid.width)))
+        return sums / (counts * img.shape[2]) > self.change_threshold
+
+    def __reseed__(self, img, changed):
+        """Replace seeds of changed blocks with the quadtree seeds of their new content.
+        Kept seeds come first, in their order, then the new ones.
+
+        Return:
+        labels -- owner of every pixel for the new seeds, None on the first frame
+        """
+        pipeline = self.pipeline
+        keep = ~changed.ravel()[self.grid.locate(self.point_x, self.point_y)]
+        previous_x = self.point_x
+        previous_y = self.point_y
+        xs = [self.point_x[keep]]
+        ys = [self.point_y[keep]]
+        for row, col in zip(*np.nonzero(changed)):
+            x0, y0, x1, y1 = self.grid.core(row, col)
+            pixels = np.ascontiguousarray(img[y0:y1, x0:x1])
+            engine = create_error_engine(pipeline.error_engine, pixels, min_area = pipeline.min_area)
+            points_x, points_y = QuadTree(pixels, min_area = pipeline.min_area,
+                error_rate = pipeline.error_rate, error_engine = engine).generate_seeds()
+            xs.append(points_x + x0)
+            ys.append(points_y + y0)
+            self.reference[y0:y1, x0:x1] = pixels
+        self.point_x = np.concatenate(xs).astype(np.float64)
+        self.point_y = np.concatenate(ys).astype(np.float64)
+        if self.labels is None:
+            return None
+
+        # Kept seeds keep their pixels, pixels of removed seeds go to their nearest seed
+        index = np.full(keep.size, -1, dtype=np.int32)
+        index[keep] = np.arange(np.count_nonzero(keep), dtype=np.int32)
+        labels = index[self.labels]
+        orphans = np.flatnonzero(labels < 0)
+        # Seeds moved since the labels were computed, or new, have to be revisited
+        moved = np.ones(self.point_x.size, dtype=bool)
+        moved[:np.count_nonzero(keep)] = ((self.labelled_x != previous_x) | (self.labelled_y != previous_y))[keep]
+        if orphans.size > 0:
+            from scipy.spatial import cKDTree
+            tree = cKDTree(np.column_stack((self.point_x, self.point_y)))
+            ys, xs = np.divmod(orphans, labels.shape[1])
+            owners = kdtree_nearest(tree, xs, ys)
+            labels.ravel()[orphans] = owners
+            moved[owners] = True
+        # New seeds take pixels from their Delaunay neighbors only
+        return delaunay_voronoi_diagram(labels, self.point_x, self.point_y, moved = moved)
+
+def video_mosaic(input_file, output_file, pipeline, block = 64, change_threshold = 8.0, tolerance = 1.0,
+        convergence = 'mean', fourcc = 'mp4v'):
+    """Turn a video, or an image sequence OpenCV can read, into a mosaic video
+
+    Keyword arguments:
+    input_file       -- input video file, or pattern like frames/%04d.png
+    output_file      -- output video file
+    pipeline         -- the MosaicPipeline giving the options of every stage
+    block            -- side of the blocks compared between frames in pixels (default : 64)
+    change_threshold -- mean absolute difference of a block above which its seeds are rebuilt (default : 8.0)
+    tolerance        -- seed displacement at which a frame stops iterating (default : 1.0)
+    convergence      -- one of CONVERGENCE, the displacement compared with the tolerance (default : 'mean')
+    fourcc           -- four character code of the output codec (default : 'mp4v')
+
+    Return:
+    count -- number of frames written
+
+    Exceptions:
+    ValueError -- if the input can not be opened, or the output can not be written
+    """
+    capture = cv2.VideoCapture(input_file)
+    if capture.isOpened() is False:
+        raise ValueError('Can not open video \'%s\'' %input_file )
+    fps = capture.get(cv2.CAP_PROP_FPS)
+    if fps <= 0:
+        fps = 25.0
+
+    sequence = SequenceMosaic(pipeline, block = block, change_threshold = change_threshold, tolerance = tolerance,
+        convergence = convergence)
+    writer = None
+    count = 0
+    try:
+        while True:
+            ok, frame = capture.read()
+            if ok is False:
+                break
+            start = time.perf_counter()
+            output, stats = sequence.frame(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+            if writer is None:
+                writer = cv2.VideoWriter(output_file, cv2.VideoWriter_fourcc(*fourcc), fps,
+                    (output.shape[1], output.shape[0]))
+                if writer.isOpened() is False:
+                    raise ValueError('Can not write video \'%s\' with codec \'%s\'' %(output_file, fourcc) )
+            writer.write(output)
+            count += 1
+            print('Frame %d : %d of %d blocks reseeded, %d seeds, %d iterations, %.2fs'
+                %(count, stats['reseeded'], stats['blocks'], stats['seeds'], stats['iterations'],
+                time.perf_counter() - start) )
+    finally:
+        capture.release()
+        if writer is not None:
+            writer.release()
+    return count
@@ -0,0 +1,169 @@
+# -*- coding:utf8 -*-
+'''
+    File name: backend.py
+    Author   : Jim00000
+    Created  : 10/18/2026
+'''
+
+__author__    = "Jim00000"
+__copyright__ = "Copyright 2017, the python-mosaic project"
+__license__   = "GNU General Public License v3.0"
+__version__   = "1.0.0"
+
+import math
+import os
+
+class VoronoiBackend:
+
+    def __init__(self, name, assign, cost, threads = None, exact = True, error = None, probe = None):
+        """An engine labelling every pixel with its nearest seed.
+        Implementations are imported when the backend is first used, so picking
+        one does not load the others.
+
+        Keyword arguments:
+        name    -- name given to --voronoi-backend
+        assign  -- function (width, height, point_x, point_y) -> labels
+        cost    -- function (width, height, size) -> estimated seconds on one thread
+        threads -- function () -> number of threads (default : None, one thread)
+        exact   -- True if it always finds the nearest seed, only exact backends
+                   are picked automatically (default : True)
+        error   -- why the backend can not be used, None if it is available (default : None)
+        probe   -- function () raising ImportError if the backend can not be used, called
+                   once on the first availability check (default : None)
+        """
+        self.name = name
+        self.assign = assign
+        self.cost = cost
+        self.threads = threads
+        self.exact = exact
+        self.error = error
+        self.probe = probe
+
+    def is_available(self):
+        """Check whether the backend can be used """
+        if self.probe is not None:
+            try:
+                self.probe()
+            except ImportError as error:
+                self.error = error
+            self.probe = None
+        return self.error is None
+
+    def thread_count(self):
+        """Get the number of threads the backend runs on """
+        return 1 if self.threads is None else self.threads()
+
+    def estimate(self, width, height, size):
+        """Get the estimated seconds to label an image """
+        return self.cost(width, height, size) / self.thread_count()
+
+# Registered backends, in the order they are listed
+REGISTRY = dict()
+
+def register_backend(backend):
+    """Add a backend to the registry, replacing the one with the same name
+
+    Keyword arguments:
+    backend -- the VoronoiBackend
+    """
+    REGISTRY[backend.name] = backend
+
+def available_backends():
+    """Get names of the backends that can be used """
+    return [name for name in REGISTRY if REGISTRY[name].is_available() is True]
+
+def get_backend(name):
+    """Get a registered backend
+
+    Keyword arguments:
+    name -- name of the backend
+
+    Return:
+    backend -- the VoronoiBackend
+
+    Exceptions:
+    ValueError -- if the backend is unknown or can not be used
+    """
+    if name not in REGISTRY:
+        raise ValueError('Unknown voronoi backend \'%s\'' %name )
+    backend = REGISTRY[name]
+    if backend.is_available() is False:
+        raise ValueError('Voronoi backend \'%s\' is not available : %s' %(name, backend.error) )
+    return backend
+
+def select_backend(width, height, size):
+    """Pick the exact backend with the smallest estimated time
+
+    Keyword arguments:
+    width  -- width of input image
+    height -- height of input image
+    size   -- seed points size
+
+    Return:
+    backend -- the VoronoiBackend
+    """
+    candidates = [REGISTRY[name] for name in available_backends() if REGISTRY[name].exact is True]
+    return min(candidates, key=lambda backend: backend.estimate(width, height, size))
+
+def __python_assign__(width, height, point_x, point_y):
+    """Label pixels with the pure python loop """
+    # Avoid a circular import, voronoi.voronoi imports this module
+    from voronoi.voronoi import voronoi_diagram
+    from voronoi.labels import new_labels
+    labels = new_labels(width, height)
+    voronoi_diagram(width, height, point_x, point_y, labels)
+    return labels
+
+def __numpy_assign__(width, height, point_x, point_y):
+    """Label pixels with NumPy broadcasting """
+    from voronoi.brute import brute_voronoi_diagram
+    return brute_voronoi_diagram(width, height, point_x, point_y)
+
+def __cpp_assign__(width, height, point_x, point_y):
+    """Label pixels with the OpenMP extension """
+    from cppvoronoi.cvoronoi import cpp_voronoi_labels
+    from voronoi.labels import new_labels
+    labels = new_labels(width, height)
+    cpp_voronoi_labels(width, height, point_x, point_y, labels)
+    return labels
+
+def __cpp_probe__():
+    """Import the OpenMP extension, it is built by compile.sh """
+    import cppvoronoi.cvoronoi
+
+def __cpp_threads__():
+    """Get the number of threads of the OpenMP extension """
+    from cppvoronoi.cvoronoi import cpp_thread_count
+    return cpp_thread_count()
+
+def __kdtree_assign__(width, height, point_x, point_y):
+    """Label pixels with a k-d tree over the seeds """
+    from voronoi.kdtree import kdtree_voronoi_diagram
+    return kdtree_voronoi_diagram(width, height, point_x, point_y)
+
+def __jfa_assign__(width, height, point_x, point_y):
+    """Label pixels with the jump flooding algorithm """
+    from voronoi.jfa import jfa_voronoi_diagram
+    return jfa_voronoi_diagram(width, height, point_x, point_y)
+
+def __cpu_count__():
+    """Get the number of cores k-d tree queries run on, OMP_NUM_THREADS bounds it like OpenMP """
+    threads = os.environ.get('OMP_NUM_THREADS', '')
+    if threads.isdigit() is True and int(threads) > 0:
+        return int(threads)
+    return os.cpu_count() or 1
+
+# Costs are nanoseconds per pixel measured on one core
+register_backend(VoronoiBackend('python', __python_assign__,
+    lambda width, height, size: width * height * (15000 + 60 * size) * 1e-9))
+register_backend(VoronoiBackend('numpy', __numpy_assign__,
+    lambda width, height, size: width * height * (50 + 8 * size) * 1e-9))
+register_backend(VoronoiBackend('cpp', __cpp_assign__,
+    lambda width, height, size: width * height * (20 + 2.5 * size) * 1e-9,
+    threads=__cpp_threads__, probe=__cpp_probe__))
+register_backend(VoronoiBackend('kdtree', __kdtree_assign__,
+    lambda width, height, size: width * height * (800 + 40 * math.log2(size + 1)) * 1e-9,
+    threads=__cpu_count__))
+register_backend(VoronoiBackend('jfa', __jfa_assign__,
+    lambda width, height, size: width * height * 150 * math.log2(max(width, height, 2)) * 1e-9,
+    exact=False))
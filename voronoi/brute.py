@@ -0,0 +1,52 @@
+# -*- coding:utf8 -*-
+'''
+    File name: brute.py
+    Author   : Jim00000
+    Created  : 10/18/2026
+'''
+
+__author__    = "Jim00000"
+__copyright__ = "Copyright 2017, the python-mosaic project"
+__license__   = "GNU General Public License v3.0"
+__version__   = "1.0.0"
+
+import numpy as np
+
+# Pixel-seed distances computed at once, bounds the memory of a chunk
+CHUNK_DISTANCES = 1 << 22
+
+def brute_voronoi_diagram(width, height, point_x, point_y):
+    """Compute voronoi diagram by comparing every pixel with every seed.
+    It is the pure python loop vectorized over chunks of rows, so it costs
+    O(pixels * seeds) too, but it is the fastest exact way for a few seeds.
+    A pixel at the same distance of several seeds goes to the seed with the
+    smallest index.
+
+    Keyword arguments:
+    width   -- width of input image
+    height  -- height of input image
+    point_x -- collections of x position of seeds in one-dimension array
+    point_y -- collections of y position of seeds in one-dimension array
+
+    Return:
+    labels -- two-dimensions int32 array, index of the seed owning every pixel
+    """
+    labels = np.empty((height, width), dtype=np.int32)
+    size = point_x.size
+    if size == 0:
+        labels[:] = -1
+        return labels
+
+    rows = max(1, CHUNK_DISTANCES // max(1, width * size))
+    point_x = np.asarray(point_x, dtype=np.float64)[:, np.newaxis, np.newaxis]
+    point_y = np.asarray(point_y, dtype=np.float64)[:, np.newaxis, np.newaxis]
+    xs = np.arange(width, dtype=np.float64)[np.newaxis, np.newaxis, :]
+
+    for y0 in range(0, height, rows):
+        y1 = min(height, y0 + rows)
+        ys = np.arange(y0, y1, dtype=np.float64)[np.newaxis, :, np.newaxis]
+        dist = (point_x - xs) ** 2 + (point_y - ys) ** 2
+        # argmin takes the first, that is the smallest index, among ties
+        labels[y0:y1] = np.argmin(dist, axis=0)
+
+    return labels
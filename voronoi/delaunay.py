@@ -0,0 +1,97 @@
+# -*- coding:utf8 -*-
+'''
+    File name: delaunay.py
+    Author   : Jim00000
+    Created  : 10/18/2026
+'''
+
+__author__    = "Jim00000"
+__copyright__ = "Copyright 2017, the python-mosaic project"
+__license__   = "GNU General Public License v3.0"
+__version__   = "1.0.0"
+
+import numpy as np
+from voronoi.kdtree import kdtree_voronoi_diagram
+
+# Pixels reassigned at once, bounds the memory of the candidate distances
+CHUNK_PIXELS = 1 << 18
+
+def delaunay_neighbors(point_x, point_y):
+    """Get every seed and its Delaunay neighbors.
+    Rows are padded with the seed itself and sorted, so the first nearest
+    candidate of a row is the one with the smallest index.
+
+    Keyword arguments:
+    point_x -- collections of x position of seeds in one-dimension array
+    point_y -- collections of y position of seeds in one-dimension array
+
+    Return:
+    table -- two-dimensions array, row i holds seed i and its neighbors
+    """
+    size = point_x.size
+    # A few seeds are all neighbors of each other
+    if size <= 4:
+        return np.tile(np.arange(size), (size, 1))
+
+    # SciPy is loaded by the first triangulation rather than on import
+    from scipy.spatial import Delaunay
+    # Joggle the input so that every seed, even a duplicated one, is a vertex
+    tri = Delaunay(np.column_stack((point_x, point_y)), qhull_options='QJ')
+    indptr, indices = tri.vertex_neighbor_vertices
+    degree = np.diff(indptr)
+    table = np.repeat(np.arange(size)[:, np.newaxis], degree.max() + 1, axis=1)
+    rows = np.repeat(np.arange(size), degree)
+    cols = np.arange(indices.size) - np.repeat(indptr[:-1], degree) + 1
+    table[rows, cols] = indices
+    table.sort(axis=1)
+    return table
+
+def delaunay_voronoi_diagram(labels, point_x, point_y, moved = None):
+    """Reassign pixels after seeds moved a little.
+    Every pixel only compares its owner and the Delaunay neighbors of that
+    owner, so a pass costs O(pixels * degree) instead of O(pixels * seeds).
+    A seed which is not the nearest one to a pixel always has a Delaunay
+    neighbor nearer to it, so passes over the pixels whose owner changed are
+    repeated until no owner changes, which gives the nearest seed.
+    With moved, only pixels whose owner or a neighbor of the owner moved are
+    revisited, others can not change their owner.
+
+    Keyword arguments:
+    labels  -- two-dimensions array, owner of every pixel before seeds moved
+    point_x -- collections of x position of seeds in one-dimension array
+    point_y -- collections of y position of seeds in one-dimension array
+    moved   -- one-dimension boolean array, True if the seed moved (default : None, all moved)
+
+    Return:
+    labels -- two-dimensions int32 array, index of the seed owning every pixel
+    """
+    height = labels.shape[0]
+    width = labels.shape[1]
+    # Pixels owned by no seed have no candidates
+    if labels.size == 0 or labels.min() < 0:
+        return kdtree_voronoi_diagram(width, height, point_x, point_y)
+
+    table = delaunay_neighbors(point_x, point_y)
+    out = labels.astype(np.int32).ravel()
+    if moved is None:
+        revisit = np.arange(out.size)
+    else:
+        dirty = moved[table].any(axis=1)
+        revisit = np.flatnonzero(dirty[out])
+
+    while revisit.size > 0:
+        changed = list()
+        for begin in range(0, revisit.size, CHUNK_PIXELS):
+            pix = revisit[begin:begin + CHUNK_PIXELS]
+            ys, xs = np.divmod(pix, width)
+            cand = table[out[pix]]
+            dx = point_x[cand] - xs[:, np.newaxis]
+            dy = point_y[cand] - ys[:, np.newaxis]
+            dist = dx * dx + dy * dy
+            owner = cand[np.arange(pix.size), np.argmin(dist, axis=1)]
+            update = owner != out[pix]
+            out[pix[update]] = owner[update]
+            changed.append(pix[update])
+        revisit = np.concatenate(changed)
+
+    return out.reshape(height, width)
@@ -0,0 +1,108 @@
+# -*- coding:utf8 -*-
+'''
+    File name: jfa.py
+    Author   : Jim00000
+    Created  : 10/18/2026
+'''
+
+__author__    = "Jim00000"
+__copyright__ = "Copyright 2017, the python-mosaic project"
+__license__   = "GNU General Public License v3.0"
+__version__   = "1.0.0"
+
+import numpy as np
+from voronoi.kdtree import kdtree_voronoi_diagram
+
+# Neighbors visited at every step
+OFFSETS = [(dy, dx) for dy in (-1, 0, 1) for dx in (-1, 0, 1) if (dy, dx) != (0, 0)]
+
+def jfa_voronoi_diagram(width, height, point_x, point_y):
+    """Compute an approximate voronoi diagram with the Jump Flooding Algorithm.
+    Every seed is planted at its pixel, then each pixel looks at the owners of
+    its eight neighbors at distance k, for k = n/2, n/4, ..., 1, and keeps the
+    nearest seed. One more pass with k = 1 (JFA+1) fixes most of the remaining
+    errors. It costs O(pixels * log(max(width, height))) whatever the seed count.
+
+    Keyword arguments:
+    width   -- width of input image
+    height  -- height of input image
+    point_x -- collections of x position of seeds in one-dimension array
+    point_y -- collections of y position of seeds in one-dimension array
+
+    Return:
+    labels -- two-dimensions int32 array, index of the seed owning every pixel
+    """
+    size = point_x.size
+    owner = np.full((height, width), -1, dtype=np.int32)
+    # Plant seeds, the smallest index wins a pixel shared by several seeds
+    sx = np.clip(np.round(point_x).astype(np.int64), 0, width - 1)
+    sy = np.clip(np.round(point_y).astype(np.int64), 0, height - 1)
+    order = np.arange(size, dtype=np.int32)[::-1]
+    owner[sy[order], sx[order]] = order
+
+    # Single precision halves the memory traffic of every pass
+    point_x = np.asarray(point_x, dtype=np.float32)
+    point_y = np.asarray(point_y, dtype=np.float32)
+    xs = np.arange(width, dtype=np.float32)[np.newaxis, :]
+    ys = np.arange(height, dtype=np.float32)[:, np.newaxis]
+    dist = __distance__(owner, point_x, point_y, xs, ys)
+
+    step = 1
+    while step * 2 < max(width, height):
+        step *= 2
+    steps = list()
+    while step >= 1:
+        steps.append(step)
+        step //= 2
+    steps.append(1)
+
+    for step in steps:
+        for dy, dx in OFFSETS:
+            cand = __shift__(owner, dy * step, dx * step)
+            cand_dist = __distance__(cand, point_x, point_y, xs, ys)
+            better = (cand_dist < dist) | ((cand_dist == dist) & (cand >= 0) & (cand < owner))
+            owner[better] = cand[better]
+            dist[better] = cand_dist[better]
+
+    return owner
+
+def jfa_disagreement(labels, point_x, point_y):
+    """Count pixels where the jump flooding result is not the nearest seed.
+    Pixels at the same distance of another seed are not counted.
+
+    Keyword arguments:
+    labels  -- two-dimensions array computed by jfa_voronoi_diagram
+    point_x -- collections of x position of seeds in one-dimension array
+    point_y -- collections of y position of seeds in one-dimension array
+
+    Return:
+    count -- number of pixels owned by a seed farther than the nearest one
+    """
+    height = labels.shape[0]
+    width = labels.shape[1]
+    exact = kdtree_voronoi_diagram(width, height, point_x, point_y)
+    xs = np.arange(width, dtype=np.float64)[np.newaxis, :]
+    ys = np.arange(height, dtype=np.float64)[:, np.newaxis]
+    dist = __distance__(labels, point_x, point_y, xs, ys)
+    exact_dist = __distance__(exact, point_x, point_y, xs, ys)
+    return int(np.count_nonzero(dist > exact_dist))
+
+def __shift__(grid, dy, dx):
+    """Get grid[y + dy, x + dx] for every pixel, -1 outside of the grid """
+    height = grid.shape[0]
+    width = grid.shape[1]
+    out = np.full(grid.shape, -1, dtype=grid.dtype)
+    if abs(dy) >= height or abs(dx) >= width:
+        return out
+    out[max(0, -dy):height - max(0, dy), max(0, -dx):width - max(0, dx)] = \
+        grid[max(0, dy):height - max(0, -dy), max(0, dx):width - max(0, -dx)]
+    return out
+
+def __distance__(owner, point_x, point_y, xs, ys):
+    """Squared distance between every pixel and its owner, inf without owner """
+    index = np.maximum(owner, 0)
+    dx = point_x[index] - xs
+    dy = point_y[index] - ys
+    dist = dx * dx + dy * dy
+    dist[owner < 0] = np.inf
+    return dist
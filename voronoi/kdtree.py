@@ -0,0 +1,66 @@
+# -*- coding:utf8 -*-
+'''
+    File name: kdtree.py
+    Author   : Jim00000
+    Created  : 10/18/2026
+'''
+
+__author__    = "Jim00000"
+__copyright__ = "Copyright 2017, the python-mosaic project"
+__license__   = "GNU General Public License v3.0"
+__version__   = "1.0.0"
+
+import numpy as np
+
+# Pixels queried at once, bounds the memory of the pixel grid
+CHUNK_PIXELS = 1 << 20
+# Nearest seeds compared to break ties
+TIES = 4
+
+def kdtree_voronoi_diagram(width, height, point_x, point_y, workers = -1):
+    """Compute voronoi diagram with a k-d tree over the seeds.
+    The pixel grid is queried in chunks of rows, every query is spread over
+    worker threads. Each chunk costs O(pixels * log(seeds)).
+    Like the pure python loop, a pixel at the same distance of several seeds
+    goes to the seed with the smallest index.
+
+    Keyword arguments:
+    width   -- width of input image
+    height  -- height of input image
+    point_x -- collections of x position of seeds in one-dimension array
+    point_y -- collections of y position of seeds in one-dimension array
+    workers -- number of worker threads, -1 for all cores (default : -1)
+
+    Return:
+    labels -- two-dimensions int32 array, index of the seed owning every pixel
+    """
+    # SciPy is loaded by the first query rather than on import
+    from scipy.spatial import cKDTree
+    tree = cKDTree(np.column_stack((point_x, point_y)))
+    labels = np.empty((height, width), dtype=np.int32)
+    rows = max(1, CHUNK_PIXELS // width)
+    xs = np.arange(width)
+
+    for y0 in range(0, height, rows):
+        y1 = min(height, y0 + rows)
+        index = kdtree_nearest(tree, np.tile(xs, y1 - y0), np.repeat(np.arange(y0, y1), width), workers)
+        labels[y0:y1] = index.reshape(y1 - y0, width)
+
+    return labels
+
+def kdtree_nearest(tree, xs, ys, workers = -1):
+    """Find the nearest seed of pixels, the smallest index among seeds at the same distance
+
+    Keyword arguments:
+    tree    -- cKDTree over the seeds
+    xs      -- x position of pixels in one-dimension array
+    ys      -- y position of pixels in one-dimension array
+    workers -- number of worker threads, -1 for all cores (default : -1)
+
+    Return:
+    index -- one-dimension array, index of the nearest seed of every pixel
+    """
+    k = min(TIES, tree.n)
+    dist, index = tree.query(np.column_stack((xs, ys)), k=[i + 1 for i in range(k)], workers=workers)
+    # Take the smallest index among the nearest seeds
+    return np.where(dist == dist[:, :1], index, tree.n).min(axis=1)
@@ -0,0 +1,79 @@
+# -*- coding:utf8 -*-
+'''
+    File name: labels.py
+    Author   : Jim00000
+    Created  : 10/18/2026
+'''
+
+__author__    = "Jim00000"
+__copyright__ = "Copyright 2017, the python-mosaic project"
+__license__   = "GNU General Public License v3.0"
+__version__   = "1.0.0"
+
+import numpy as np
+
+def new_labels(width, height):
+    """Create a label map, every pixel is owned by no seed (-1)
+
+    Keyword arguments:
+    width  -- width of input image
+    height -- height of input image
+
+    Return:
+    labels -- two-dimensions int32 array, index of the seed owning every pixel
+    """
+    return np.full((height, width), -1, dtype=np.int32)
+
+def labels_to_csr(labels, size):
+    """Group pixels by the seed owning them (compressed sparse row view).
+    Pixels of cell i are pixels[offsets[i]:offsets[i + 1]], as flat indices
+    in row-major order. Pixels owned by no seed are left out.
+
+    Keyword arguments:
+    labels -- two-dimensions array, index of the seed owning every pixel
+    size   -- seed points size
+
+    Return:
+    offsets -- one-dimension array of size + 1 offsets into pixels
+    pixels  -- one-dimension array of flat pixel indices sorted by label
+    """
+    flat = labels.ravel()
+    counts = np.bincount(flat[flat >= 0], minlength=size)
+    offsets = np.zeros(size + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    pixels = np.argsort(flat, kind='stable')[flat.size - offsets[-1]:]
+    return offsets, pixels
+
+def cell_pixels(offsets, pixels, width, i):
+    """Get pixels of a cell from the compressed sparse row view
+
+    Keyword arguments:
+    offsets -- offsets computed by labels_to_csr
+    pixels  -- pixels computed by labels_to_csr
+    width   -- width of input image
+    i       -- index of the cell
+
+    Return:
+    data -- two-dimensions array, x positions in data[0] and y positions in data[1]
+    """
+    y, x = np.divmod(pixels[offsets[i]:offsets[i + 1]], width)
+    return np.vstack((x, y))
+
+def dic_to_labels(dic, width, height):
+    """Convert a dictionary contaning cell points -> pixel data, as written by
+    former versions, into a label map.
+
+    Keyword arguments:
+    dic    -- a dictionary contaning cell points -> pixel data
+    width  -- width of input image
+    height -- height of input image
+
+    Return:
+    labels -- two-dimensions int32 array, index of the seed owning every pixel
+    """
+    labels = new_labels(width, height)
+    for i in dic:
+        # Remove first dummy data pair (-1, -1)
+        data = dic[i][:, 1:]
+        labels[data[1], data[0]] = i
+    return labels
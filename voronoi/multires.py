@@ -0,0 +1,88 @@
+# -*- coding:utf8 -*-
+'''
+    File name: multires.py
+    Author   : Jim00000
+    Created  : 10/18/2026
+'''
+
+__author__    = "Jim00000"
+__copyright__ = "Copyright 2017, the python-mosaic project"
+__license__   = "GNU General Public License v3.0"
+__version__   = "1.0.0"
+
+import numpy as np
+from voronoi.kdtree import kdtree_nearest
+
+def coarse_relaxation(width, height, point_x, point_y, scale, iteration, assign):
+    """Run Lloyd's algorithm on a grid downsampled by scale.
+    Seeds are moved to the coarse grid, relaxed there without rounding,
+    and moved back to the image, in place.
+
+    Keyword arguments:
+    width     -- width of input image
+    height    -- height of input image
+    point_x   -- collections of x position of seeds in one-dimension array
+    point_y   -- collections of y position of seeds in one-dimension array
+    scale     -- downsampling factor
+    iteration -- iteration on the coarse grid
+    assign    -- function (width, height, point_x, point_y) -> labels
+    """
+    # Avoid a circular import, voronoi.voronoi imports this module
+    from voronoi.voronoi import update_positions
+
+    coarse_width = -(-width // scale)
+    coarse_height = -(-height // scale)
+    # Coarse pixel j covers the pixels [j * scale, (j + 1) * scale)
+    offset = (scale - 1) / 2
+    coarse_x = (point_x - offset) / scale
+    coarse_y = (point_y - offset) / scale
+
+    for i in range(iteration):
+        labels = assign(coarse_width, coarse_height, coarse_x, coarse_y)
+        update_positions(labels, coarse_x, coarse_y, rounding = False)
+
+    point_x[:] = np.clip(coarse_x * scale + offset, 0, width - 1)
+    point_y[:] = np.clip(coarse_y * scale + offset, 0, height - 1)
+
+def multires_labels(width, height, point_x, point_y, scale):
+    """Label pixels on a grid downsampled by scale, then refine cell boundaries.
+    A coarse pixel gives its nearest seed to all the pixels it covers when
+    the second nearest seed of its center is farther by more than the
+    diameter of the coarse pixel, no pixel of it can be closer to another
+    seed then. Pixels of the other coarse pixels are assigned to their
+    nearest seed, so labels are the ones of the kdtree backend.
+
+    Keyword arguments:
+    width   -- width of input image
+    height  -- height of input image
+    point_x -- collections of x position of seeds in one-dimension array
+    point_y -- collections of y position of seeds in one-dimension array
+    scale   -- downsampling factor
+
+    Return:
+    labels -- two-dimensions int32 array, index of the seed owning every pixel
+    """
+    from scipy.spatial import cKDTree
+
+    coarse_width = -(-width // scale)
+    coarse_height = -(-height // scale)
+    # Coarse pixel j covers the pixels [j * scale, (j + 1) * scale)
+    offset = (scale - 1) / 2
+    center_x, center_y = np.meshgrid(np.arange(coarse_width) * scale + offset,
+        np.arange(coarse_height) * scale + offset)
+    tree = cKDTree(np.column_stack((point_x, point_y)))
+    # The second distance is infinite with a single seed
+    dist, index = tree.query(np.column_stack((center_x.ravel(), center_y.ravel())), k=[1, 2], workers=-1)
+    coarse = index[:, 0].astype(np.int32).reshape(coarse_height, coarse_width)
+    # Pixels are at most radius away from the center of their coarse pixel, so the
+    # nearest seed of the center stays the nearest of all of them with a larger margin
+    radius = offset * np.sqrt(2)
+    border = (dist[:, 1] - dist[:, 0] <= 2 * radius + 1e-6).reshape(coarse_height, coarse_width)
+
+    labels = np.repeat(np.repeat(coarse, scale, axis=0), scale, axis=1)[:height, :width]
+    labels = np.ascontiguousarray(labels, dtype=np.int32)
+    refine = np.repeat(np.repeat(border, scale, axis=0), scale, axis=1)[:height, :width]
+    ys, xs = np.nonzero(refine)
+    if xs.size > 0:
+        labels[ys, xs] = kdtree_nearest(tree, xs, ys)
+    return labels
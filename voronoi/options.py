@@ -0,0 +1,18 @@
+# -*- coding:utf8 -*-
+'''
+    File name: options.py
+    Author   : Jim00000
+    Created  : 10/18/2026
+'''
+
+__author__    = "Jim00000"
+__copyright__ = "Copyright 2017, the python-mosaic project"
+__license__   = "GNU General Public License v3.0"
+__version__   = "1.0.0"
+
+from voronoi.backend import REGISTRY
+
+# Names given to --voronoi-backend and --convergence, kept apart from Lloyd's
+# algorithm so command lines are parsed without loading NumPy
+BACKENDS = ['auto'] + list(REGISTRY)
+CONVERGENCE = ['max', 'mean', 'moved']
@@ -11,111 +11,196 @@ __copyright__ = "Copyright 2017, the python-mosaic project"
 __license__   = "GNU General Public License v3.0"
 __version__   = "1.0.0"
 
-import argparse
-import sys
-import platform
-import time
-import os.path
-import pickle
 import numpy as np
-import matplotlib.pyplot as plt
-import cv2
 from external.progress.bar import FillingSquaresBar
-from scipy.spatial import Voronoi, voronoi_plot_2d
-
-os_name = platform.system()
-optimized = False
-
-# Check whether this program can be optimized
-if os_name == 'Linux' and os.path.exists('cppvoronoi/voronoi.cpp') is True:
-    from cppvoronoi.voronoi import cpp_voronoi_diagram
-    optimized = True
-
-def generate_voronoi_diagram(width, height, point_x, point_y, iteration = 3):
+from voronoi.jfa import jfa_disagreement
+from voronoi.delaunay import delaunay_voronoi_diagram
+from voronoi.multires import coarse_relaxation, multires_labels
+from voronoi.backend import get_backend, select_backend
+from voronoi.options import BACKENDS, CONVERGENCE
+
+def generate_voronoi_diagram(width, height, point_x, point_y, iteration = 3, backend = 'auto', report_jfa = False,
+        tolerance = None, convergence = 'max', displacements = None, incremental = False, revisit_moved = False,
+        coarse_scale = 1, fine_iteration = 1, on_iteration = None, fixed = None, labels = None, report_backend = False):
     """Implement of Lloyd’s algorithm.
     We use this algorithm to get centroidal Voronoi diagrams.
     For more information, please refer to Simple Adaptive Mosaic Effects paper.
+    With a tolerance, iterations stop as soon as the seeds settle down.
 
     Keyword arguments:
-    width     -- width of input image
-    height    -- height of input image
-    point_x   -- collections of x position of seeds in one-dimension array
-    point_y   -- collections of y position of seeds in one-dimension array
-    iteration -- iteration (default : 3)
+    width          -- width of input image
+    height         -- height of input image
+    point_x        -- collections of x position of seeds in one-dimension array
+    point_y        -- collections of y position of seeds in one-dimension array
+    iteration      -- iteration, the upper bound with a tolerance (default : 3)
+    backend        -- one of BACKENDS, 'auto' picks the fastest exact backend for the
+                      image and seed count (default : 'auto')
+    report_jfa     -- print how many pixels the jfa backend assigns to a seed other
+                      than the nearest one, every iteration (default : False)
+    tolerance      -- stop when the displacement measured by convergence is not
+                      above it, and print every displacement (default : None, never stop)
+    convergence    -- one of CONVERGENCE : maximal or mean seed displacement in pixels,
+                      or count of seeds that moved (default : 'max')
+    displacements  -- list receiving (max, mean, moved) of every iteration (default : None)
+    incremental    -- after the first iteration, reassign pixels among the previous owner
+                      and its Delaunay neighbors only (default : False)
+    revisit_moved  -- with incremental, revisit only pixels near seeds that moved (default : False)
+    coarse_scale   -- run the first iterations on the image downsampled by this factor, and
+                      label full resolution passes from it, refined along cell boundaries
+                      (default : 1, full resolution only)
+    fine_iteration -- with coarse_scale, iterations at full resolution (default : 1)
+    on_iteration   -- function (iteration, point_x, point_y, labels, displacement) called
+                      after every full resolution iteration, where displacement is a
+                      dictionary of max, mean and moved (default : None)
+    fixed          -- one-dimension boolean array, True for seeds which keep their position
+                      in full resolution iterations (default : None, all seeds move)
+    labels         -- owner of every pixel for the given seeds, the first iteration takes
+                      it instead of labelling pixels (default : None)
+    report_backend -- print the backend labelling pixels and its threads (default : False)
 
     Return:
-    dic -- a dictionary contaning cell points -> pixel data 
+    labels -- two-dimensions int32 array, index of the seed owning every pixel
     """
+    if backend == 'auto':
+        backend = select_backend(width, height, point_x.size).name
+    if report_backend is True:
+        print('Voronoi backend : %s, %d threads' %(backend, get_backend(backend).thread_count()) )
+
+    if convergence not in CONVERGENCE:
+        raise ValueError('Unknown convergence criterion \'%s\'' %convergence )
 
-    if optimized is True:
-        print('This program will process with openMP supported')
+    def assign(width, height, point_x, point_y):
+        return assign_labels(backend, width, height, point_x, point_y)
+
+    # Move seeds roughly into place on the downsampled image
+    if coarse_scale > 1:
+        coarse_relaxation(width, height, point_x, point_y, coarse_scale, 
+            max(0, iteration - fine_iteration), assign)
+        iteration = min(iteration, max(1, fine_iteration))
 
     bar = FillingSquaresBar('Processing', max=iteration * 3)
-    
+
+    shift = None
     for i in range(iteration):
-        dic = initialize_dic(point_x.size)
         bar.next()
-        if optimized is False:
-            voronoi_diagram(width, height, point_x, point_y, dic)
+        if i == 0 and labels is not None:
+            # Owners of the given seeds are known already
+            pass
+        elif incremental is True and labels is not None:
+            moved = shift > 0 if revisit_moved is True else None
+            labels = delaunay_voronoi_diagram(labels, point_x, point_y, moved = moved)
+        elif coarse_scale > 1:
+            labels = multires_labels(width, height, point_x, point_y, coarse_scale)
         else:
-            dic = cpp_voronoi_diagram(width, height, point_x, point_y, dic)
+            labels = assign(width, height, point_x, point_y)
+            if backend == 'jfa' and report_jfa is True:
+                count = jfa_disagreement(labels, point_x, point_y)
+                print('\nIteration %d : jfa disagrees with exact assignment on %d pixels (%.4f%%)' 
+                    %(i + 1, count, 100 * count / labels.size) )
         bar.next()
-        update_positions(dic, point_x, point_y)
+        old_x = point_x.copy()
+        old_y = point_y.copy()
+        update_positions(labels, point_x, point_y)
+        if fixed is not None:
+            point_x[fixed] = old_x[fixed]
+            point_y[fixed] = old_y[fixed]
         bar.next()
 
+        # Measure how far the seeds moved
+        shift = np.hypot(point_x - old_x, point_y - old_y)
+        # Fixed seeds do not take part in the mean
+        free = shift if fixed is None else shift[~fixed]
+        measure = {
+            'max' : float(free.max()) if free.size > 0 else 0.0,
+            'mean' : float(free.mean()) if free.size > 0 else 0.0,
+            'moved' : int(np.count_nonzero(free))
+        }
+        if displacements is not None:
+            displacements.append((measure['max'], measure['mean'], measure['moved']))
+        if on_iteration is not None:
+            on_iteration(i, point_x, point_y, labels, measure)
+        if tolerance is not None:
+            print('\nIteration %d : max displacement %.3f, mean displacement %.3f, %d seeds moved' 
+                %(i + 1, measure['max'], measure['mean'], measure['moved']) )
+            if measure[convergence] <= tolerance:
+                break
+
     
     bar.finish()
-    return dic
+    return labels
 
-def initialize_dic(size):
-    """Initialize a dictionary containing every pixel belonging to which points 
-    That is, every key in the dictionary has the pixel list belonging to the point (or cell)
-    We use points to represent cells
+def assign_labels(backend, width, height, point_x, point_y):
+    """Label every pixel with its nearest seed using a backend
 
     Keyword arguments:
-    size -- seed points size
+    backend -- name of a registered backend, one of BACKENDS except 'auto'
+    width   -- width of input image
+    height  -- height of input image
+    point_x -- collections of x position of seeds in one-dimension array
+    point_y -- collections of y position of seeds in one-dimension array
 
     Return:
-    dic -- a dictionary contaning cell points -> pixel data 
+    labels -- two-dimensions int32 array, index of the seed owning every pixel
+
+    Exceptions:
+    ValueError -- if the backend is unknown or can not be used
     """
-    dic = {}
-    for i in range(size):
-        # We push data pair (-1, -1) into dic for every point
-        # It will be removed while processing something
-        dic[i] = np.array([[-1], [-1]])
-    return dic
-
-def update_positions(dic, point_x, point_y):
+    return get_backend(backend).assign(width, height, point_x, point_y)
+
+def update_positions(labels, point_x, point_y, rounding = True, origin = (0, 0)):
     """Update every points position by averaging all the positions of pixels in the region 
     dominated by this point(or cell). 
     That is, new point position = average(positions of pixels belongs to this points).
+    All the cells are updated at once with pixel counts and coordinate sums per label.
+    Cells containing nothing keep their previous position.
 
     Keyword arguments:
-    dic     -- a dictionary contaning cell points -> pixel data
-    point_x -- collections of x position of seeds in one-dimension array
-    point_y -- collections of y position of seeds in one-dimension array
+    labels   -- two-dimensions array, index of the seed owning every pixel
+    point_x  -- collections of x position of seeds in one-dimension array
+    point_y  -- collections of y position of seeds in one-dimension array
+    rounding -- round new positions to pixels (default : True)
+    origin   -- (x, y) of the upper-left pixel of labels, seeds are in the same
+                coordinates (default : (0, 0))
     """
-    for i in range(point_x.size):
-        # Get all the pixels belongs to the cell and remove first dummy data pair (-1, -1)
-        data = dic[i][:,1:]
-        # Avoid that cells contain nothing but still process
-        if(data.size > 0):
-            new_px = round(np.average(data[0]))
-            new_py = round(np.average(data[1]))
-            point_x[i] = new_px
-            point_y[i] = new_py
-
-def voronoi_diagram(width, height, point_x, point_y, dic):
+    height = labels.shape[0]
+    width = labels.shape[1]
+    size = point_x.size
+    flat = labels.ravel()
+    xs = np.tile(np.arange(origin[0], origin[0] + width, dtype=np.float64), height)
+    ys = np.repeat(np.arange(origin[1], origin[1] + height, dtype=np.float64), width)
+
+    # Leave out pixels owned by no seed
+    if flat.size > 0 and flat.min() < 0:
+        owned = flat >= 0
+        flat = flat[owned]
+        xs = xs[owned]
+        ys = ys[owned]
+
+    count = np.bincount(flat, minlength=size)
+    sum_x = np.bincount(flat, weights=xs, minlength=size)
+    sum_y = np.bincount(flat, weights=ys, minlength=size)
+
+    # Avoid that cells contain nothing but still process
+    filled = count > 0
+    new_px = sum_x[filled] / count[filled]
+    new_py = sum_y[filled] / count[filled]
+    if rounding is True:
+        new_px = np.round(new_px)
+        new_py = np.round(new_py)
+    point_x[filled] = new_px
+    point_y[filled] = new_py
+
+def voronoi_diagram(width, height, point_x, point_y, labels):
     """Compute voronoi diagram.
     For each piexl, calculate distance between this pixel and all points
-    And put the pixel inside the dictionary whose key is the point that has the minimal distance
+    And label the pixel with the point that has the minimal distance
 
     Keyword arguments:
     width   -- width of input image
     height  -- height of input image
     point_x -- collections of x position of seeds in one-dimension array
     point_y -- collections of y position of seeds in one-dimension array
-    dic     -- a dictionary contaning cell points -> pixel data
+    labels  -- two-dimensions array, index of the seed owning every pixel
     """
     # For each pixel
     for y in range(height):
@@ -127,7 +212,5 @@ def voronoi_diagram(width, height, point_x, point_y, dic):
             # Find the smallest index inside the numpy array.
             # That is, the index stands for the cell (or point)
             index = np.argmin(dist)
-            # Make new data pair
-            coord = np.array([[x],[y]])
-            # Put the new data pair inside the dictionary with its key is the point
-            dic[index] = np.hstack((dic[index],coord))
\ No newline at end of file
+            # Label the pixel with the point
+            labels[y, x] = index
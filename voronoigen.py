@@ -14,61 +14,70 @@ __version__   = "1.0.0"
 import argparse
 import sys
 import os.path
-import pickle
 import numpy as np
-import matplotlib.pyplot as plt
-from voronoi.voronoi import generate_voronoi_diagram
-from scipy.spatial import Voronoi, voronoi_plot_2d
+from voronoi.options import BACKENDS, CONVERGENCE
+from container.container import Container, save_container, is_container, load_pickle
+from cache.options import DEFAULT_CACHE_DIR
+from cache.cache import StageCache, cached_voronoi_diagram
 
-def load_seed(filename):
+def load_seed(filename, allow_pickle = False):
     """Load seeds data 
 
     Keyword arguments:
-    filename -- pickle file containing seeds data
+    filename     -- container file containing seeds data
+    allow_pickle -- load pickle files of former versions, only for trusted files (default : False)
 
     Return:
-    img     -- raw input image
+    image   -- reference of the input image, or the image itself for pickle files
     point_x -- collections of x position of seeds in one-dimension array
     point_y -- collections of y position of seeds in one-dimension array
 
     Exceptions:
     FileNotFoundError -- if argument 'filename' file does not exist 
+    ValueError        -- if the file is a pickle and argument 'allow_pickle' is False
     """
     # Check existence of files
     if os.path.isfile(filename) is False:
         raise FileNotFoundError('File \'%s\' does not exist' %filename )
 
-    # Load seeds data
-    with open(filename, 'rb') as f:
-        seeds = pickle.load(f)
-        
-    point_x = seeds['x']
-    point_y = seeds['y']
-    img = seeds['img']
+    # Files written by former versions are pickles storing the image
+    if is_container(filename) is False:
+        seeds = load_pickle(filename, allow_pickle)
+        return seeds['img'], seeds['x'], seeds['y']
+
+    # Load seeds data, seeds are relaxed in place so they are copied
+    with Container(filename) as container:
+        point_x = np.array(container.array('x'), dtype=np.float64)
+        point_y = np.array(container.array('y'), dtype=np.float64)
+        image = container.meta['image']
 
-    return img, point_x, point_y
+    return image, point_x, point_y
 
-def save_data(img, points_x, points_y, dic, filename = "vordig.pickle"):
-    """Dump dictionary, points_x, points_y, image into a pickle file.
+def save_data(image, points_x, points_y, labels, filename = "vordig.npz"):
+    """Dump label map, points_x, points_y and the reference of the image into a container file.
 
     Keyword arguments:
-    img      -- raw input image
+    image    -- reference of the input image, or the image itself
     point_x  -- one-dimension array stores seed points x
     point_y  -- one-dimension array stores seed points y
-    dic      -- a dictionary contaning cell points -> pixel data 
-    filename -- file name that will be saved (default : 'vordig.pickle')
+    labels   -- two-dimensions array, index of the seed owning every pixel
+    filename -- file name that will be saved (default : 'vordig.npz')
     """
-    data = {
-        'x' : points_x,
-        'y' : points_y,
-        'img' : img,
-        'dict' : dic
+    arrays = {
+        'x' : np.asarray(points_x, dtype=np.float32),
+        'y' : np.asarray(points_y, dtype=np.float32),
+        'labels' : np.asarray(labels, dtype=np.int32)
     }
+    meta = dict()
+    # Images of pickle files have no reference, keep a compressed copy
+    if isinstance(image, dict) is True:
+        meta['image'] = image
+    else:
+        arrays['img'] = image
     
     # Store data
-    with open(filename, 'wb') as f:
-        pickle.dump(data, f, pickle.HIGHEST_PROTOCOL)
-        print("Data dumped as file \'%s\'" %filename )
+    save_container(filename, 'vordig', arrays, meta = meta, compressed = ('labels', 'img'))
+    print("Data dumped as file \'%s\'" %filename )
 
 
 def preview_voronoi_diagram(points_x, points_y, filename = 'preview.jpg'):
@@ -78,6 +87,9 @@ def preview_voronoi_diagram(points_x, points_y, filename = 'preview.jpg'):
     points_x -- collections of x position of seeds in one-dimension array
     points_y -- collections of y position of seeds in one-dimension array
     """
+    # Plotting is loaded only for previews
+    import matplotlib.pyplot as plt
+    from scipy.spatial import Voronoi, voronoi_plot_2d
     points_xy = np.vstack((points_x, -points_y)).T
     vor = Voronoi(points_xy)
     voronoi_plot_2d(vor, show_points = False, show_vertices = False)
@@ -93,9 +105,22 @@ def main(argv):
     """
     # Arguments parsing
     parser = argparse.ArgumentParser(description='Voronoi diagram generator')
-    parser.add_argument("-input", "--input-seed-file", default='seed.pickle', type=str, help="input seed pickle file")
-    parser.add_argument("-o", "--output-file", default='vordig.pickle', type=str, help="output voronoi diagram pickle file")
+    parser.add_argument("-input", "--input-seed-file", default='seed.npz', type=str, help="input seed container file (default : seed.npz)")
+    parser.add_argument("-o", "--output-file", default='vordig.npz', type=str, help="output voronoi diagram container file (default : vordig.npz)")
+    parser.add_argument("--allow-pickle", action="store_true", help="Load a seed pickle file of a former version, only for trusted files")
     parser.add_argument("-t", "--iter", default=5, type=int, help="Iteration time for Lloyd’s algorithm")
+    parser.add_argument("--tolerance", type=float, help="Stop iterating once the seed displacement is not above it, -t is the upper bound")
+    parser.add_argument("--convergence", default='max', choices=CONVERGENCE, help="Seed displacement compared with the tolerance (default : max)")
+    parser.add_argument("--incremental", action="store_true", help="After the first iteration, reassign pixels among the previous owner and its Delaunay neighbors only")
+    parser.add_argument("--revisit-moved", action="store_true", help="With --incremental, revisit only pixels near seeds that moved")
+    parser.add_argument("--coarse-scale", default=1, type=int, help="Run the first iterations on the image downsampled by this factor (default : 1)")
+    parser.add_argument("--fine-iter", default=1, type=int, help="Iterations at full resolution with --coarse-scale (default : 1)")
+    parser.add_argument("--voronoi-backend", default='auto', choices=BACKENDS, help="Engine assigning pixels to seeds (default : auto)")
+    parser.add_argument("--report-jfa", action="store_true", help="Report pixels the jfa backend assigns to a seed other than the nearest one")
+    parser.add_argument("--no-cache", default=False, action="store_true", help="Always generate the voronoi diagram, without the stage cache")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, type=str, help="Directory of the stage cache (default : %s)" %DEFAULT_CACHE_DIR)
+    parser.add_argument("--cache-size", default=1024, type=int, help="Size bound of the stage cache in MB (default : 1024)")
+    parser.add_argument("--cache-stats", default=False, action="store_true", help="Print stage cache statistics")
     parser.add_argument("--enable-preview", action="store_true", help="Enable Voronoi diagram preview")
     parser.add_argument("--preview-filename", default="preview.jpg", type=str, help="Voronoi diagram preview image file")
     args = parser.parse_args()
@@ -109,21 +134,39 @@ def main(argv):
     preview_img = args.preview_filename
     iteration = args.iter
     outputfile = args.output_file
+    backend = args.voronoi_backend
+    is_report_jfa = args.report_jfa
+    tolerance = args.tolerance
+    convergence = args.convergence
+    is_incremental = args.incremental
+    is_revisit_moved = args.revisit_moved
+    coarse_scale = args.coarse_scale
+    fine_iteration = args.fine_iter
+    is_allow_pickle = args.allow_pickle
+    cache = None if args.no_cache is True else StageCache(args.cache_dir, args.cache_size << 20)
+    is_cache_stats = args.cache_stats
 
     # Load seeds data
-    img, points_x, points_y = load_seed(seedfile)
-    height = img.shape[0] 
-    width = img.shape[1]
+    image, points_x, points_y = load_seed(seedfile, is_allow_pickle)
+    shape = image['shape'] if isinstance(image, dict) is True else image.shape
+    height = shape[0] 
+    width = shape[1]
 
-    # Generate voronoi diagram
-    dic = generate_voronoi_diagram(width, height, points_x, points_y, iteration = iteration)
+    # Generate voronoi diagram, or reuse iterations from the stage cache
+    labels = cached_voronoi_diagram(cache, width, height, points_x, points_y, iteration = iteration, backend = backend, report_jfa = is_report_jfa,
+        tolerance = tolerance, convergence = convergence,
+        incremental = is_incremental, revisit_moved = is_revisit_moved,
+        coarse_scale = coarse_scale, fine_iteration = fine_iteration, report_backend = True)
 
     # Preview voronoi diagram
     if is_preview is True:
         preview_voronoi_diagram(points_x, points_y, preview_img)
 
     # Dump voronoi diagram data
-    save_data(img, points_x, points_y, dic, filename=outputfile)
+    save_data(image, points_x, points_y, labels, filename=outputfile)
+
+    if cache is not None and is_cache_stats is True:
+        print(cache.statistics())
 
     # Print down message
     print('Done!')